@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+
+
+# Estimator defaults
+SAMPLE_RATE = 30.0       # Hz; wrist samples are resampled onto this fixed grid
+WINDOW_SECONDS = 4.0     # Time constant of the exponentially decaying autocorrelation
+DETREND_SECONDS = 1.0    # Time constant of the moving mean removed from the signal
+MIN_BPM = 40.0
+MAX_BPM = 200.0
+MIN_CONFIDENCE = 0.35    # Normalized autocorrelation at the chosen lag
+MIN_VARIANCE = 50.0      # px^2; smaller movements are not treated as conducting
+OCTAVE_TOLERANCE = 0.9   # Prefer the shortest lag within this fraction of the best peak
+
+
+class TempoEstimator:
+    """Streaming beat-tempo estimate from the vertical motion of one wrist.
+
+    Samples are resampled to a fixed rate, detrended with a moving mean and fed
+    into an exponentially decaying autocorrelation over the lags covering
+    ``MIN_BPM``..``MAX_BPM``. Each sample costs one vectorized multiply-add
+    over ~50 lags, so it is cheap enough to run every frame.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, window=WINDOW_SECONDS, min_bpm=MIN_BPM,
+                 max_bpm=MAX_BPM, min_confidence=MIN_CONFIDENCE, min_variance=MIN_VARIANCE):
+        self.sample_rate = sample_rate
+        self.min_lag = max(1, int(math.floor(60.0 * sample_rate / max_bpm)))
+        self.max_lag = int(math.ceil(60.0 * sample_rate / min_bpm))
+        self.decay = math.exp(-1.0 / (sample_rate * window))
+        self.mean_alpha = 1.0 - math.exp(-1.0 / (sample_rate * DETREND_SECONDS))
+        self.min_confidence = min_confidence
+        self.min_variance = min_variance
+
+        # Lagged samples live twice in a doubled buffer so that x[n-k] for all
+        # k is always one contiguous (reversed) slice.
+        self._size = self.max_lag + 1
+        self._history = np.zeros(2 * self._size)
+        self._head = 0
+        self.acf = np.zeros(self._size)
+        self.reset()
+
+    def reset(self):
+        self._history.fill(0.0)
+        self.acf.fill(0.0)
+        self._head = 0
+        self._mean = None
+        self._last_t = None
+        self._last_y = None
+        self._next_tick = None
+
+    def update(self, t, y):
+        """Adds one wrist observation (time in seconds, y in pixels)."""
+        if self._last_t is None or t - self._last_t > 0.5:
+            # First sample or the hand was lost for a while: start over.
+            if self._last_t is not None:
+                self.reset()
+            self._last_t, self._last_y = t, y
+            self._next_tick = t
+            self._mean = y
+            return
+        if t <= self._last_t:
+            return
+
+        step = 1.0 / self.sample_rate
+        while self._next_tick <= t:
+            frac = (self._next_tick - self._last_t) / (t - self._last_t)
+            self._push(self._last_y + frac * (y - self._last_y))
+            self._next_tick += step
+        self._last_t, self._last_y = t, y
+
+    def _push(self, value):
+        self._mean += self.mean_alpha * (value - self._mean)
+        x = value - self._mean
+        self._head = (self._head + 1) % self._size
+        self._history[self._head] = x
+        self._history[self._head + self._size] = x
+        lagged = self._history[self._head + 1:self._head + self._size + 1][::-1]
+        self.acf *= self.decay
+        self.acf += x * lagged
+
+    def estimate(self):
+        """Returns ``(bpm, confidence)`` or None when there is no clear beat."""
+        energy = self.acf[0]
+        if energy * (1.0 - self.decay) < self.min_variance:
+            return None
+
+        norm = self.acf[self.min_lag:] / energy
+        best = float(norm.max())
+        if best < self.min_confidence:
+            return None
+        # Multiples of the beat period score almost as well; take the first
+        # local peak that is close to the best one.
+        inner = norm[1:-1]
+        peaks = np.flatnonzero((inner >= norm[:-2]) & (inner >= norm[2:])
+                               & (inner >= best * OCTAVE_TOLERANCE)) + 1
+        k = int(peaks[0]) if len(peaks) else int(np.argmax(norm))
+        lag = float(k + self.min_lag)
+
+        # Parabolic interpolation around the peak for sub-sample precision
+        if 0 < k < len(norm) - 1:
+            left, mid, right = norm[k - 1], norm[k], norm[k + 1]
+            denom = left - 2 * mid + right
+            if denom < 0:
+                lag += 0.5 * (left - right) / denom
+        return float(60.0 * self.sample_rate / lag), float(norm[k])
@@ -0,0 +1,1459 @@
+import os
+import sys
+import heapq
+import itertools
+import subprocess
+import time
+import signal
+import threading
+import traceback
+from collections import deque
+
+from gesture_rules import RuleSet
+from track_analysis import TrackAnalysisCache
+from seek_index import SeekIndexCache, seek
+from flight_recorder import FlightRecorder, clip_text, find_dumps
+from sync_playback import SyncMaster, SyncedPlayer, DEFAULT_LEAD
+from dsp_audio import VlcAudioTap, SoundDeviceSink
+from profiling import Profiler, profile_arg, parse_env_spec, DEFAULT_MODE, DEFAULT_SECONDS
+from event_log import get_log, LEVELS, LOG_LEVEL_ENV
+
+try:
+    import vlc
+except Exception:
+    print("!!! need 'python-vlc'. 'pip install python-vlc' !!!")
+    raise
+
+log = get_log('controller')
+
+
+def find_default_mp3():
+    """Finds the first .mp3 file in the script directory."""
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    mp3s = [f for f in os.listdir(script_dir) if f.endswith('.mp3')]
+    return os.path.join(script_dir, mp3s[0]) if mp3s else None
+
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg', '.m4a')
+
+
+def list_tracks(folder):
+    """Returns the audio files in a folder, sorted by name."""
+    try:
+        names = sorted(f for f in os.listdir(folder) if f.lower().endswith(AUDIO_EXTENSIONS))
+    except OSError:
+        return []
+    return [os.path.join(folder, f) for f in names]
+
+
+def _gesture_key(line: str):
+    """Returns the discrete part of a tracker line (gestures and motions, no positions)."""
+    if '_Gesture:' not in line:
+        return line
+    return tuple(part for part in line.split('|') if '_Gesture:' in part or '_Motion:' in part)
+
+
+def _performer_of(line: str) -> int:
+    """Returns the performer number from a "P:<n>|" prefix (0 when absent)."""
+    if not line.startswith('P:'):
+        return 0
+    try:
+        return int(line[2:line.find('|')])
+    except ValueError:
+        return 0
+
+
+class GestureMailbox:
+    """Bounded, coalescing transport between the reader thread and the control loop.
+
+    Continuous state (hand positions under an unchanged gesture) only keeps the
+    latest line per performer; lines that change a gesture are kept in order
+    as edge events, so play/pause transitions survive coalescing. If the
+    consumer stalls, the backlog is bounded by ``max_events``: past that the
+    oldest edges are dropped (and counted in ``dropped``), and outdated
+    positions are never replayed.
+    """
+
+    def __init__(self, max_events=32):
+        self._lock = threading.Lock()
+        self._events = deque()
+        self._max_events = max_events
+        self._latest = {}
+        self._last_keys = {}
+        self.coalesced = 0
+        self.dropped = 0
+
+    def put(self, line: str):
+        """Called from the reader thread for every tracker line."""
+        key = _gesture_key(line)
+        performer = _performer_of(line)
+        with self._lock:
+            if key != self._last_keys.get(performer):
+                self._last_keys[performer] = key
+                # The edge carries a full, newer snapshot; any pending state is stale.
+                if self._latest.pop(performer, None) is not None:
+                    self.coalesced += 1
+                if len(self._events) >= self._max_events:
+                    self._events.popleft()
+                    self.dropped += 1
+                self._events.append(line)
+            else:
+                if performer in self._latest:
+                    self.coalesced += 1
+                self._latest[performer] = line
+
+    def drain(self):
+        """Returns pending edge events in order, followed by the latest states."""
+        with self._lock:
+            lines = list(self._events)
+            self._events.clear()
+            if self._latest:
+                lines.extend(self._latest[p] for p in sorted(self._latest))
+                self._latest.clear()
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._latest.clear()
+            self._last_keys.clear()
+
+    def depth(self):
+        with self._lock:
+            return len(self._events) + len(self._latest)
+
+    def stats(self):
+        with self._lock:
+            return {'coalesced': self.coalesced, 'dropped': self.dropped}
+
+
+class LoopScheduler:
+    """Timer loop with Tk's ``after``/``after_cancel`` interface, for running without a display.
+
+    ``run`` executes callbacks on the calling thread until ``stop``; ``after``
+    and ``stop`` may be called from any thread or a signal handler. Callback
+    errors go to ``report_callback_exception`` like they do in Tk.
+    """
+
+    def __init__(self):
+        self._timers = []
+        self._pending = set()
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()   # RLock inside: stop() may run in a signal handler
+        self._running = False
+
+    def after(self, ms, func, *args):
+        with self._cond:
+            timer_id = next(self._ids)
+            heapq.heappush(self._timers, (time.monotonic() + ms / 1000.0, timer_id, func, args))
+            self._pending.add(timer_id)
+            self._cond.notify()
+        return timer_id
+
+    def after_cancel(self, timer_id):
+        with self._cond:
+            self._pending.discard(timer_id)
+
+    def run(self):
+        with self._cond:
+            self._running = True
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._timers:
+                        self._cond.wait()
+                        continue
+                    wait = self._timers[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if not self._running:
+                    return
+                _, timer_id, func, args = heapq.heappop(self._timers)
+                if timer_id not in self._pending:
+                    continue
+                self._pending.discard(timer_id)
+            try:
+                func(*args)
+            except Exception:
+                self.report_callback_exception(*sys.exc_info())
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def report_callback_exception(self, exc_type, exc, tb):
+        traceback.print_exception(exc_type, exc, tb)
+
+
+class HeadlessView:
+    """Keeps the latest properties of each status display when there is no GUI.
+
+    Same ``set``/``cancel`` interface as the Tk ViewModel; ``text`` returns what
+    a label would show.
+    """
+
+    def __init__(self):
+        self.state = {}
+
+    def set(self, name, **props):
+        self.state.setdefault(name, {}).update(props)
+
+    def text(self, name):
+        return self.state.get(name, {}).get('text', '')
+
+    def cancel(self):
+        pass
+
+
+class MaestroController:
+    """Gesture-to-playback logic: tracker process, watchdog, actions, fades and smoothing.
+
+    Runs on any ``scheduler`` with Tk's ``after``/``after_cancel`` interface (a
+    Tk root or a LoopScheduler) and reports its state through ``view.set``.
+    Front ends attach through the view and the ``on_error`` callback. The
+    upper-case class attributes are defaults; ``settings`` (a dict such as
+    ``configure_controller`` builds) overrides them for one instance.
+    """
+
+    # Tracker watchdog settings; the budget can be overridden with $MAESTRO_WATCHDOG_MS
+    WATCHDOG_BUDGET_MS = int(os.environ.get('MAESTRO_WATCHDOG_MS', 500))
+    TRACKER_MAX_HANDS = 2           # Hands the tracker follows (two per performer)
+    SYNC_PORT = None                # UDP port for player nodes (synchronized playback off when None)
+    SYNC_LEAD = DEFAULT_LEAD
+    DSP_AUDIO = False               # Route audio through the NumPy DSP path (sample-accurate fades)
+    FADE_SECONDS = 0.5
+    LOG_LEVEL = 'INFO'              # Event log level, passed on to the tracker
+    PREVIEW_FPS = 0                 # Landmark lines per second for an embedded preview (0 = tracker window)
+    TRACKER_WINDOW = True           # Let the tracker open its OpenCV window (needs a display)
+    TRACKER_BACKEND = 'legacy'      # Tracker hand detector: legacy or tasks (asynchronous HandLandmarker)
+    TRACKER_COMMAND = None          # Replaces the tracker command line (soak_test.py runs a synthetic one)
+    TRACKER_CAMERA = None           # Camera device index for the tracker (None = first one that works)
+    WATCHDOG_INTERVAL_MS = 100
+    WATCHDOG_STARTUP_GRACE = 20.0   # Seconds allowed for camera + model startup
+    WATCHDOG_BACKOFF_MIN = 0.5
+    WATCHDOG_BACKOFF_MAX = 10.0
+    WATCHDOG_STABLE_AFTER = 10.0    # Seconds of health before the backoff resets
+    TRACKER_STOP_TIMEOUT = 1.0      # Seconds a stopping tracker gets before it is killed
+    TRACKER_DUMP_TIMEOUT = 1.0      # Seconds a stalled tracker gets to dump its flight recorder
+
+    # Speculative control: reversible actions start on a confident candidate gesture
+    SPECULATIVE = False
+    SPECULATIVE_MIN_CONFIDENCE = 0.6
+    SPECULATIVE_CONFIRM_FRAMES = 3  # Frames the tracker needs before it confirms a gesture
+    SPECULATION_WINDOW_MS = 700     # Roll back if not confirmed within this time
+    SPECULATIVE_OPS = ('set_volume', 'set_rate', 'fade_pause')
+
+    MODES = ('static', 'slider', 'conduct', 'scrub')
+    SCRUB_MS_PER_PIXEL = 100        # Seek distance per pixel of hand movement while scrubbing
+
+    def __init__(self, scheduler, view, instance=None, settings=None):
+        for name, value in (settings or {}).items():
+            if not name.isupper() or not hasattr(MaestroController, name):
+                raise TypeError(f"unknown controller setting {name!r}")
+            setattr(self, name, value)
+        self.scheduler = scheduler
+        self.view = view
+        self.on_error = None        # Front-end hook: on_error(title, message)
+        self.running = False
+
+        # VLC player initialization; ``instance`` can be anything with the same interface (e.g. a stub)
+        self.instance = instance or vlc.Instance('--audio-filter=scaletempo', '--quiet')
+        self.player = self.instance.media_player_new()
+
+        # Optional DSP audio path: VLC hands decoded PCM to NumPy gain ramps and the sound device
+        self.dsp = None
+        if self.DSP_AUDIO:
+            try:
+                self.dsp = VlcAudioTap(vlc, self.player, SoundDeviceSink())
+            except Exception as e:
+                log.error(f"DSP audio path unavailable, using VLC output: {e}")
+
+        # Synchronized playback: the player proxy mirrors every change to the nodes
+        self.sync_master = None
+        if self.SYNC_PORT:
+            self.sync_master = SyncMaster(self.SYNC_PORT, lead=self.SYNC_LEAD)
+            self.player = SyncedPlayer(self.player, self.sync_master)
+            log.info(f"Player nodes can follow this controller on UDP port {self.SYNC_PORT}")
+
+        # State variables
+        self.current_file = None
+        self.is_playing = False
+        self.is_paused = False
+        self.camera_on = False
+        self.volume = 60
+        self.playback_rate = 1.0
+        self.target_volume = 60
+        self.target_rate = 1.0
+        self.loop_enabled = False
+        self.player.audio_set_volume(self.volume)
+
+        # Fading state
+        self.is_fading = False
+        self.original_volume_on_fade = 60
+        self._fade_after_id = None
+
+        # Speculative action waiting for its gesture to be confirmed
+        self.speculation = None
+        self._speculation_after_id = None
+
+        # Control mode state
+        self.control_mode = "static"
+        self.slider_state = {}   # performer -> {'R_X', 'R_Y'} slider anchor
+        self.SLIDER_DEADZONE_X = 15
+        self.SLIDER_DEADZONE_Y = 10
+
+        # Conducting state: the tempo that maps to rate 1.0
+        self.track_bpm = None
+        self.conduct_reference_bpm = None
+
+        # Background tempo/beat analysis of the music library
+        self.analysis = TrackAnalysisCache()
+        self.analysis.submit(list_tracks(os.path.dirname(os.path.realpath(__file__))))
+
+        # Frame-accurate seek indexes, built when a compressed track is first loaded
+        self.seek_index = SeekIndexCache(self.analysis.cache_dir)
+
+        # Gesture vocabulary and (left, right, mode) -> action table
+        self.rules = RuleSet()
+        self._action_handlers = {
+            'play': self._act_play,
+            'fade_pause': self._act_fade_pause,
+            'set_volume': self._act_set_volume,
+            'set_rate': self._act_set_rate,
+            'rate_slider': self._act_rate_slider,
+            'volume_slider': self._act_volume_slider,
+            'next_track': self._act_next_track,
+            'previous_track': self._act_previous_track,
+            'toggle_loop': self._act_toggle_loop,
+            'follow_tempo': self._act_follow_tempo,
+            'scrub': self._act_scrub,
+        }
+
+        # Profiling hooks (no-ops until started)
+        self.profiler = Profiler('controller')
+
+        # Flight recorder: the last seconds of input, commands and player state
+        self.recorder = FlightRecorder('controller')
+        self.lines = self.recorder.add('lines', 30, performer=('i1', ()), left=('U32', ()), right=('U32', ()),
+                                       L_X=('i4', ()), L_Y=('i4', ()), R_X=('i4', ()), R_Y=('i4', ()),
+                                       tempo=('f4', ()))
+        self.recorder.add('commands', 30, performer=('i1', ()), op=('U16', ()), value=('f4', ()))
+        self.recorder.add('events', 2, kind=('U16', ()), detail=('U64', ()))
+        self.recorder.add('player', 20, volume=('i2', ()), rate=('f4', ()), playing=('?', ()),
+                          paused=('?', ()))
+        self.recorder.install(scheduler)
+
+        # Smoothing loop tracking
+        self._smooth_update_id = None
+        self._last_state_update = 0
+        self._loop_restart_pending = False
+        self.STATE_UPDATE_INTERVAL = 0.1  # Update state label every 100ms
+
+        # Threading components
+        self.mailbox = GestureMailbox()
+
+        # Tracker watchdog
+        self.metrics = {'tracker_restarts': 0, 'tracker_failures': 0, 'missed_heartbeats': 0,
+                        'speculations': 0, 'rollbacks': 0}
+        self.tracker_fps = 0.0
+        self.tracker_latency_ms = None
+        self.camera_status = None   # Latest "Camera:" line fields, e.g. {'Camera': 'lost', 'Retry': '1.0'}
+        self.tracker_started_at = time.monotonic()
+        self.last_tracker_rx = None
+        self._restart_at = None
+        self._restart_reason = ''
+        self._restart_backoff = self.WATCHDOG_BACKOFF_MIN
+        self._watchdog_after_id = None
+        self._tracker_error_shown = False   # Start failures are shown once per failure streak
+        self.subproc = None
+        self.reader_thread = None
+        self.reading = False
+        self._poll_after_id = None
+        self.landmarks = None       # Latest "Landmarks:" line; only the newest one matters
+
+    def start(self, camera=True):
+        """Starts the tracker (unless ``camera`` is False) and the control loops."""
+        self.running = True
+        if camera:
+            self.toggle_camera()
+        else:
+            self.view.set('camera', text='Turn Camera ON')
+            self.view.set('action', text='Action: Camera OFF')
+        self._poll_after_id = self.scheduler.after(50, self._poll_queue)
+        self._smooth_update_id = self.scheduler.after(50, self._smooth_update_loop)
+        self._watchdog_after_id = self.scheduler.after(self.WATCHDOG_INTERVAL_MS, self._watchdog_loop)
+
+    def report_error(self, title, message):
+        log.error(f"{title}: {message}")
+        if self.on_error:
+            self.on_error(title, message)
+
+    def set_mode(self, mode):
+        """Switches between static, slider and conducting control."""
+        self.control_mode = mode if mode in self.MODES else "static"
+        self.conduct_reference_bpm = None
+        self.target_volume = self.volume
+        self.target_rate = self.playback_rate
+        self.slider_state.clear()
+        log.info(f"Control mode changed to: {self.control_mode}", mode=self.control_mode)
+
+    def toggle_profiling(self):
+        """Starts a time-boxed profile of the controller, or stops the running one."""
+        if self.profiler.active:
+            self._on_profile_written(self.profiler.stop())
+            return
+        mode, seconds = parse_env_spec(log) or (DEFAULT_MODE, DEFAULT_SECONDS)
+        self.start_profile(mode, seconds)
+
+    def start_profile(self, mode, seconds):
+        self.profiler.start(mode, seconds)
+        self.view.set('profile', text='Stop Profiling')
+        log.info(f"Profiling controller ({mode}) for {seconds:.0f}s")
+
+    def _on_profile_written(self, files):
+        self.view.set('profile', text='Profile 30s')
+        if files:
+            log.info(f"Profile written to {', '.join(files)}")
+
+    def force_crash(self):
+        """Forces application crash for testing error handling."""
+        log.info("Stopping camera before crashing...")
+        self.stop_hand_tracking_subprocess(wait=True)
+        log.info("Crashing as requested!")
+        # The scheduler's exception hook dumps the flight recorder with this event as its last entry
+        self.recorder.record('events', time.time(), kind='crash', detail='force_crash')
+        raise Exception("Forced crash.")
+
+    def dump_recorder(self):
+        """Writes the flight recorder now; on POSIX the tracker is asked to dump too."""
+        self.recorder.record('events', time.time(), kind='dump', detail='on demand')
+        self.recorder.dump_safely('on demand')
+        sub = self.subproc
+        if sub is not None and sub.poll() is None and hasattr(signal, 'SIGUSR1'):
+            try:
+                os.kill(sub.pid, signal.SIGUSR1)
+            except OSError as e:
+                log.error(f"Could not signal hand tracker: {e}")
+
+    def toggle_camera(self):
+        """Toggles camera on/off for hand tracking."""
+        self._restart_at = None
+        self._restart_backoff = self.WATCHDOG_BACKOFF_MIN
+        self._tracker_error_shown = False
+        if self.camera_on:
+            self.stop_hand_tracking_subprocess()
+            self.camera_on = False
+            self.view.set('camera', text='Turn Camera ON')
+            self.view.set('action', text='Action: Camera OFF')
+        else:
+            self.start_hand_tracking_subprocess()
+            if self.subproc:
+                self.camera_on = True
+                self.view.set('camera', text='Turn Camera OFF')
+                self.view.set('action', text='Action: (waiting)')
+            else:
+                self.camera_on = False
+                self.view.set('camera', text='Turn Camera ON')
+                self.view.set('action', text='Action: Start Failed')
+
+    def load_media(self, path):
+        """Sets the current file on the player without starting playback."""
+        self.current_file = str(path)
+        self.conduct_reference_bpm = None
+        self.analysis.submit([self.current_file])
+        self.seek_index.submit([self.current_file])
+        info = self.analysis.lookup(self.current_file)
+        self.track_bpm = info['bpm'] if info else None
+        bpm_str = f' ({self.track_bpm:.0f} BPM)' if self.track_bpm else ''
+        self.view.set('file', text=f'File: {os.path.basename(self.current_file)}{bpm_str}')
+        media = self.instance.media_new(self.current_file)
+        self.player.set_media(media)
+
+    def play_manual(self):
+        """Starts or resumes playback."""
+        if self.is_fading:
+            return
+
+        try:
+            player_state = self.player.get_state()
+            if player_state == vlc.State.Playing:
+                return
+        except Exception:
+            pass
+
+        if not self.current_file:
+            default = find_default_mp3()
+            if default:
+                self.load_media(default)
+            else:
+                return
+
+        success = self.player.play()
+        if success == 0:
+            self.is_playing = True
+            self.is_paused = False
+            self.volume = self.target_volume
+            self.playback_rate = self.target_rate
+            self.player.audio_set_volume(self.volume)
+            self.player.set_rate(self.playback_rate)
+            self._update_state_label()
+
+    def pause_manual(self):
+        """Pauses playback immediately."""
+        if self.is_fading:
+            return
+
+        try:
+            player_state = self.player.get_state()
+            if player_state != vlc.State.Playing:
+                return
+        except Exception:
+            pass
+
+        self.player.pause()
+        self.is_paused = True
+        self.is_playing = False
+        self._update_state_label()
+
+    def stop_manual(self):
+        """Stops playback and resets to initial state."""
+        if self.is_fading:
+            if self._fade_after_id:
+                try:
+                    self.scheduler.after_cancel(self._fade_after_id)
+                except Exception:
+                    pass
+            self._fade_after_id = None
+            self.is_fading = False
+
+        self.player.stop()
+        self.is_playing = False
+        self.is_paused = False
+        self.volume = 60
+        self.target_volume = 60
+        self.playback_rate = 1.0
+        self.target_rate = 1.0
+        self.player.audio_set_volume(self.volume)
+        self.player.set_rate(self.playback_rate)
+        if self.dsp:
+            self.dsp.gain.set(self.volume / 100.0)
+        self._update_state_label()
+
+    def fade_and_pause(self):
+        """Gradually fades volume to zero then pauses."""
+        try:
+            player_state = self.player.get_state()
+            if player_state != vlc.State.Playing or self.is_fading:
+                return
+        except Exception:
+            return
+
+        self.is_fading = True
+        self.original_volume_on_fade = self.player.audio_get_volume()
+        if self._fade_after_id:
+            try:
+                self.scheduler.after_cancel(self._fade_after_id)
+            except Exception:
+                pass
+        if self.dsp:
+            # Sample-accurate ramp in the DSP path; the timer only pauses at the end
+            self.dsp.gain.ramp_to(0.0, self.FADE_SECONDS)
+            self._fade_after_id = self.scheduler.after(int(self.FADE_SECONDS * 1000), self._finish_fade_pause)
+        elif self.sync_master:
+            # One envelope for every node; the pause sent at its end runs as it reaches zero
+            self.player.ramp('volume', 0, self.FADE_SECONDS)
+            self._fade_after_id = self.scheduler.after(int(self.FADE_SECONDS * 1000), self._finish_fade_pause)
+        else:
+            self._fade_after_id = self.scheduler.after(50, self._fade_loop_pause)
+
+    def _fade_loop_pause(self):
+        """Recursive loop for fade effect."""
+        self._fade_after_id = None
+
+        if not self.is_fading or not self.running:
+            if not self.is_fading:
+                try:
+                    if self.player.is_playing():
+                        self.player.audio_set_volume(self.original_volume_on_fade)
+                except Exception:
+                    pass
+            return
+
+        current_vol = self.player.audio_get_volume()
+        step_down = max(1, self.original_volume_on_fade // 10 if self.original_volume_on_fade > 0 else 1)
+        new_vol = max(0, current_vol - step_down)
+        self.player.audio_set_volume(new_vol)
+
+        if new_vol > 0:
+            self._fade_after_id = self.scheduler.after(50, self._fade_loop_pause)
+        else:
+            self._finish_fade_pause()
+
+    def _finish_fade_pause(self):
+        """Pauses at the end of a fade and restores the volume for the next play."""
+        self._fade_after_id = None
+        if not self.is_fading:
+            return
+        if self.speculation is not None and self.speculation['fade']:
+            # Not confirmed yet: stay silent until it is confirmed or rolled back
+            self.speculation['fade_done'] = True
+            return
+        self.player.pause()
+        try:
+            self.player.audio_set_volume(self.original_volume_on_fade)
+        except Exception:
+            pass
+        if self.dsp:
+            # VLC's volume never changed during the ramp, so no volume callback follows
+            self.dsp.gain.set(self.original_volume_on_fade / 100.0)
+        self.is_paused = True
+        self.is_playing = False
+        self.is_fading = False
+        self._update_state_label()
+
+    def _cancel_fade(self):
+        """Stops a fade before it pauses and brings the volume back smoothly."""
+        if self._fade_after_id:
+            try:
+                self.scheduler.after_cancel(self._fade_after_id)
+            except Exception:
+                pass
+        self._fade_after_id = None
+        self.is_fading = False
+        if self.dsp:
+            self.dsp.gain.ramp_to(self.original_volume_on_fade / 100.0, self.FADE_SECONDS)
+        elif self.sync_master:
+            # The new ramp starts from wherever the fade envelope has got to
+            self.player.ramp('volume', self.original_volume_on_fade, self.FADE_SECONDS)
+            self.volume = self.target_volume = self.original_volume_on_fade
+        else:
+            # The smoothing loop ramps back up from wherever the fade got to
+            self.volume = self.player.audio_get_volume()
+            self.target_volume = self.original_volume_on_fade
+
+    def start_hand_tracking_subprocess(self):
+        """Launches the hand tracking subprocess."""
+        if self.subproc and self.subproc.poll() is None:
+            return
+
+        if self.TRACKER_COMMAND:
+            cmd = list(self.TRACKER_COMMAND)
+        else:
+            script_dir = os.path.dirname(os.path.realpath(__file__))
+            script_path = os.path.join(script_dir, 'hand-tracker.py')
+
+            if not os.path.exists(script_path):
+                self._report_tracker_error('Missing Script', f'hand-tracker.py not found at {script_path}')
+                return
+
+            heartbeat_ms = max(50, min(200, self.WATCHDOG_BUDGET_MS // 3))
+            cmd = [sys.executable, '-u', str(script_path), '--gestures', self.rules.path,
+                   '--heartbeat-ms', str(heartbeat_ms), '--max-hands', str(self.TRACKER_MAX_HANDS),
+                   '--log-level', self.LOG_LEVEL, '--backend', self.TRACKER_BACKEND]
+            if self.TRACKER_CAMERA is not None:
+                cmd += ['--camera', str(self.TRACKER_CAMERA)]
+            if self.SPECULATIVE:
+                cmd += ['--candidates', '--confirm-frames', str(self.SPECULATIVE_CONFIRM_FRAMES)]
+            if self.PREVIEW_FPS > 0:
+                cmd += ['--landmarks', '--landmark-fps', str(self.PREVIEW_FPS)]
+            if self.PREVIEW_FPS > 0 or not self.TRACKER_WINDOW:
+                cmd.append('--no-window')
+        # No console window for the tracker on Windows; the flag does not exist elsewhere
+        creationflags = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        try:
+            log.info("Starting hand-tracking subprocess...")
+            self.subproc = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, bufsize=1, creationflags=creationflags,
+                encoding='utf-8', errors='ignore'
+            )
+        except Exception as e:
+            self._report_tracker_error('Subprocess error', f'Failed to start hand-tracker.py: {e}')
+            self.subproc = None
+            return
+
+        self.tracker_started_at = time.monotonic()
+        self.last_tracker_rx = None
+        self.camera_status = None
+        self.reading = True
+        self.reader_thread = threading.Thread(target=self._reader_loop, args=(self.subproc,), daemon=True)
+        self.reader_thread.start()
+        log.info("Hand tracking subprocess started.")
+
+    def _report_tracker_error(self, title, message):
+        """Shows a tracker start failure once; the watchdog's later attempts only log it."""
+        if self._tracker_error_shown:
+            log.error(f"{title}: {message}")
+        else:
+            self._tracker_error_shown = True
+            self.report_error(title, message)
+
+    def stop_hand_tracking_subprocess(self, wait=False, dump=False):
+        """Stops the hand tracking subprocess.
+
+        The process is terminated and reaped on a background thread, so the
+        GUI does not freeze while it exits; ``wait`` does it right here
+        (on shutdown). With ``dump``, the tracker is first asked to write
+        its flight recorder (POSIX only).
+        """
+        log.info("Stopping hand tracking...")
+        self.reading = False
+        sub, reader = self.subproc, self.reader_thread
+        self.subproc = None
+        self.reader_thread = None
+        self.mailbox.clear()
+        self.landmarks = None
+
+        if sub is not None or reader is not None:
+            if wait:
+                self._reap_tracker(sub, reader, dump)
+            else:
+                threading.Thread(target=self._reap_tracker, args=(sub, reader, dump),
+                                 name='tracker-reaper', daemon=True).start()
+
+        stats = self.mailbox.stats()
+        log.info(f"Hand tracking stopped. (coalesced: {stats['coalesced']}, dropped: {stats['dropped']})")
+
+    def _reap_tracker(self, sub, reader, dump=False):
+        """Terminates a tracker process (killing it if it does not exit) and joins its reader."""
+        if dump and sub is not None and sub.poll() is None and hasattr(signal, 'SIGUSR1'):
+            self._dump_tracker(sub)
+        if sub is not None and sub.poll() is None:
+            try:
+                sub.terminate()
+                try:
+                    sub.wait(timeout=self.TRACKER_STOP_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    sub.kill()
+                    sub.wait(timeout=self.TRACKER_STOP_TIMEOUT)
+            except Exception as e:
+                log.error(f"Error terminating subprocess: {e}")
+                if sub.poll() is None:
+                    try:
+                        sub.kill()
+                    except Exception as kill_e:
+                        log.error(f"Error killing subprocess: {kill_e}")
+        if reader is not None and reader.is_alive():
+            reader.join(timeout=self.TRACKER_STOP_TIMEOUT)
+
+    def _dump_tracker(self, sub):
+        """Asks a tracker for its flight recorder and waits briefly for the file.
+
+        A tracker stuck inside a native call cannot run its signal handler;
+        it is terminated without a dump after ``TRACKER_DUMP_TIMEOUT``.
+        """
+        try:
+            os.kill(sub.pid, signal.SIGUSR1)
+        except OSError as e:
+            log.error(f"Could not signal hand tracker: {e}")
+            return
+        deadline = time.monotonic() + self.TRACKER_DUMP_TIMEOUT
+        while time.monotonic() < deadline and sub.poll() is None:
+            dumps = find_dumps('tracker', sub.pid, 'SIGUSR1')
+            if dumps:
+                log.info(f"Hand tracker flight recorder written to {dumps[0]}")
+                return
+            time.sleep(0.05)
+        log.error("Hand tracker did not write its flight recorder before it was stopped")
+
+    def _reader_loop(self, sub):
+        """Background thread that reads from one tracker process's stdout."""
+        while self.reading and self.subproc is sub:
+            if not sub.stdout or sub.stdout.closed:
+                break
+            try:
+                raw = sub.stdout.readline()
+                if self.subproc is not sub:
+                    # Stopped while waiting; the lines of a replaced tracker are stale
+                    break
+                if raw:
+                    line = raw.strip()
+                    self.last_tracker_rx = time.monotonic()
+                    if line.startswith('Heartbeat:'):
+                        self._on_heartbeat(line)
+                    elif line.startswith('Landmarks:'):
+                        self.landmarks = line
+                    elif line.startswith('Camera:'):
+                        self._on_camera_status(line)
+                    elif line:
+                        self.mailbox.put(line)
+                else:
+                    break
+            except ValueError:
+                break
+            except Exception as e:
+                if self.reading:
+                    log.error(f"Exception in reader loop: {e}. Exiting.")
+                break
+
+    def _on_heartbeat(self, line: str):
+        """Called on the reader thread; only records the tracker's frame rate and detection latency."""
+        for part in line.split('|'):
+            try:
+                if part.startswith('FPS:'):
+                    self.tracker_fps = float(part[4:])
+                elif part.startswith('Latency:'):
+                    self.tracker_latency_ms = float(part[8:])
+            except ValueError:
+                pass
+
+    def _on_camera_status(self, line: str):
+        """Called on the reader thread when the tracker's camera connects, is lost or stays unavailable."""
+        status = dict(part.split(':', 1) for part in line.split('|') if ':' in part)
+        self.camera_status = status
+        if status.get('Camera') == 'ok':
+            log.info(f"Tracker camera {status.get('Device', '?')} ready ({status.get('Mode', 'unknown mode')})")
+        elif status.get('Camera') != 'connecting':
+            log.error(f"Tracker camera {status.get('Camera')}, retrying in {status.get('Retry', '?')}s")
+
+    def _watchdog_loop(self):
+        """Restarts a dead or stalled tracker with exponential backoff."""
+        try:
+            now = time.monotonic()
+            if not self.camera_on:
+                self._restart_at = None
+                self.view.set('health', text='Tracker: off')
+            elif self._restart_at is not None:
+                if now >= self._restart_at:
+                    self._restart_at = None
+                    self.metrics['tracker_restarts'] += 1
+                    self.start_hand_tracking_subprocess()
+                else:
+                    self.view.set('health', text=f'Tracker: {self._restart_reason}, restarting in '
+                                                 f'{self._restart_at - now:.1f}s')
+            else:
+                sub = self.subproc
+                last_rx = self.last_tracker_rx
+                if sub is None or sub.poll() is not None:
+                    self._schedule_tracker_restart('exited', now)
+                elif last_rx is None:
+                    if (now - self.tracker_started_at) > self.WATCHDOG_STARTUP_GRACE:
+                        self._schedule_tracker_restart('no heartbeat', now)
+                    else:
+                        self.view.set('health', text='Tracker: starting...')
+                elif (now - last_rx) * 1000 > self.WATCHDOG_BUDGET_MS:
+                    self.metrics['missed_heartbeats'] += 1
+                    self._schedule_tracker_restart('stalled', now)
+                else:
+                    if (now - self.tracker_started_at) > self.WATCHDOG_STABLE_AFTER:
+                        self._restart_backoff = self.WATCHDOG_BACKOFF_MIN
+                    self._tracker_error_shown = False
+                    stats = self.mailbox.stats()
+                    latency = self.tracker_latency_ms
+                    camera = self.camera_status or {}
+                    if camera.get('Camera', 'ok') != 'ok':
+                        # The tracker keeps its heartbeats going while it reconnects the camera
+                        retry = f", retrying in {camera['Retry']}s" if 'Retry' in camera else ''
+                        self.view.set('health', text=f"Tracker: ok | camera {camera['Camera']}{retry}"
+                                                     f' | restarts: {self.metrics["tracker_restarts"]}')
+                    else:
+                        self.view.set('health', text=(
+                            f'Tracker: ok | {self.tracker_fps:.0f} fps'
+                            + (f' | {latency:.0f} ms' if latency is not None else '')
+                            + f' | restarts: {self.metrics["tracker_restarts"]}'
+                            f' | coalesced: {stats["coalesced"]} | dropped: {stats["dropped"]}'))
+        except Exception as e:
+            log.error(f"Error in tracker watchdog: {e}")
+        finally:
+            if self.running:
+                self._watchdog_after_id = self.scheduler.after(self.WATCHDOG_INTERVAL_MS, self._watchdog_loop)
+
+    def _schedule_tracker_restart(self, reason, now):
+        log.error(f"Hand tracker {reason}; restarting in {self._restart_backoff:.1f}s", reason=reason,
+                  failures=self.metrics['tracker_failures'] + 1)
+        self.metrics['tracker_failures'] += 1
+        self.recorder.record('events', time.time(), kind='watchdog', detail=reason)
+        self.recorder.dump_safely(f"watchdog {reason}")
+        # The tracker's own frames show what it was doing when it went quiet
+        self.stop_hand_tracking_subprocess(dump=True)
+        self._restart_reason = reason
+        self._restart_at = now + self._restart_backoff
+        self._restart_backoff = min(self.WATCHDOG_BACKOFF_MAX, self._restart_backoff * 2)
+        self.view.set('health', text=f'Tracker: {reason}, restarting in {self._restart_at - now:.1f}s')
+
+    def _poll_queue(self):
+        """Applies pending edge events and the latest hand state from the mailbox."""
+        try:
+            if self.rules.maybe_reload():
+                log.info(f"Reloaded gesture rules from {self.rules.path}")
+            elif self.rules.last_error:
+                log.error(f"Could not load gesture rules: {self.rules.last_error}")
+                self.rules.last_error = None
+            written = self.profiler.poll()
+            if written:
+                self._on_profile_written(written)
+            with self.profiler.stage('dispatch'):
+                for line in self.mailbox.drain():
+                    self._handle_line(line)
+        except Exception as e:
+            log.error(f"Error processing queue: {e}")
+        finally:
+            if self.running:
+                self._poll_after_id = self.scheduler.after(50, self._poll_queue)
+
+    def _smooth_update_loop(self):
+        """Smoothly interpolates volume and playback rate changes."""
+        if not self.running:
+            return
+
+        vol_changed = False
+        rate_changed = False
+
+        try:
+            with self.profiler.stage('smoothing'):
+                current_vlc_vol = self.player.audio_get_volume()
+                current_vlc_rate = self.player.get_rate()
+
+                # Restart the track when looping is on. The restart may run a sync
+                # lead later, so the player reports Ended for a few more ticks.
+                if self.player.get_state() != vlc.State.Ended:
+                    self._loop_restart_pending = False
+                elif self.loop_enabled and not self._loop_restart_pending:
+                    self._loop_restart_pending = True
+                    self.player.stop()
+                    self.player.play()
+
+                if self.sync_master:
+                    # One envelope per change of target rather than a command per step
+                    vol_changed, rate_changed = self._ramp_to_targets()
+
+                # Smooth volume transitions
+                elif not self.is_fading and abs(self.target_volume - self.volume) > 1:
+                    step = 2 if self.target_volume > self.volume else -2
+                    self.volume = max(0, min(100, self.volume + step))
+                    if self.volume != current_vlc_vol:
+                        self.player.audio_set_volume(self.volume)
+                        vol_changed = True
+
+                # Smooth rate transitions
+                if not self.sync_master and abs(self.target_rate - self.playback_rate) > 0.02:
+                    step = 0.05 if self.target_rate > self.playback_rate else -0.05
+                    self.playback_rate = max(0.25, min(3.0, self.playback_rate + step))
+                    if abs(self.playback_rate - current_vlc_rate) > 0.01:
+                        self.player.set_rate(self.playback_rate)
+                        rate_changed = True
+
+                # Label text follows every change; the player state query is throttled
+                current_time = time.time()
+                self.recorder.record('player', current_time, volume=self.volume, rate=self.playback_rate,
+                                     playing=self.is_playing, paused=self.is_paused)
+                refresh = (current_time - self._last_state_update) > self.STATE_UPDATE_INTERVAL
+                if vol_changed or rate_changed or refresh:
+                    self._update_state_label(refresh_player=refresh)
+                    if refresh:
+                        self._last_state_update = current_time
+
+        except Exception as e:
+            log.error(f"Error in smooth update loop accessing player: {e}")
+        finally:
+            if self.running:
+                self._smooth_update_id = self.scheduler.after(50, self._smooth_update_loop)
+
+    def _ramp_to_targets(self):
+        """Sends the synchronized player volume/rate ramps toward the targets.
+
+        The ramps take as long as the smoothing steps would: 2 volume points
+        per 50 ms tick, and 0.05x rate per tick (1x per second). Returns
+        (volume_changed, rate_changed).
+        """
+        vol_changed = rate_changed = False
+        if not self.is_fading and abs(self.target_volume - self.volume) > 1:
+            target = max(0, min(100, self.target_volume))
+            self.player.ramp('volume', target, abs(target - self.volume) / 2 * 0.05)
+            self.volume = target
+            vol_changed = True
+        if abs(self.target_rate - self.playback_rate) > 0.02:
+            target = max(0.25, min(3.0, self.target_rate))
+            self.player.ramp('rate', target, abs(target - self.playback_rate))
+            self.playback_rate = target
+            rate_changed = True
+        return vol_changed, rate_changed
+
+    def _parse_tracker_data(self, line: str) -> dict | None:
+        """Parses hand tracking data from subprocess output."""
+        if not line or '|' not in line or ':' not in line or "_Gesture:" not in line:
+            return None
+
+        data = {}
+        try:
+            parts = line.split('|')
+            valid_keys = {"P", "L_Gesture", "L_X", "L_Y", "R_Gesture", "R_X", "R_Y", "L_Motion", "R_Motion",
+                          "R_Tempo", "L_Cand", "R_Cand", "L_Conf", "R_Conf"}
+            has_hand = False
+
+            for part in parts:
+                split_part = part.split(':', 1)
+                if len(split_part) == 2:
+                    key, val = split_part[0].strip(), split_part[1].strip()
+                    if key in valid_keys:
+                        if key == "P":
+                            data[key] = int(val)
+                        elif '_X' in key or '_Y' in key:
+                            data[key] = int(val) if val != 'None' else None
+                        elif key.endswith('_Tempo') or key.endswith('_Conf'):
+                            data[key] = float(val)
+                        elif key.endswith('_Cand'):
+                            data[key] = val
+                        else:
+                            data[key] = val
+                            has_hand |= (val != "No Hand")
+
+            if not has_hand:
+                return None
+
+            data.setdefault("P", 0)
+            data.setdefault("L_Gesture", "No Hand")
+            data.setdefault("L_X", None)
+            data.setdefault("L_Y", None)
+            data.setdefault("R_Gesture", "No Hand")
+            data.setdefault("R_X", None)
+            data.setdefault("R_Y", None)
+
+            return data
+        except (ValueError, Exception):
+            return None
+
+    def _record_line(self, now, data, lg, rg):
+        """Writes one tracker line into the preallocated 'lines' ring, column by column."""
+        columns = self.lines.columns
+        with self.recorder.lock:
+            slot = self.lines.claim(now)
+            columns['performer'][slot] = data['P']
+            columns['left'][slot] = clip_text(lg, columns['left'].dtype)
+            columns['right'][slot] = clip_text(rg, columns['right'].dtype)
+            for key in ('L_X', 'L_Y', 'R_X', 'R_Y'):
+                columns[key][slot] = -1 if data[key] is None else data[key]
+            columns['tempo'][slot] = data.get('R_Tempo') or 0.0
+
+    def _handle_line(self, line: str):
+        """Processes a single line of hand tracking data."""
+        if not self.camera_on:
+            return
+        if self.speculation is not None:
+            self._check_speculation(line)
+        if self.is_fading:
+            return
+
+        if line == "No hands detected.":
+            self.view.set('action', text='Action: (no hands)')
+            self.slider_state.clear()
+            return
+
+        data = self._parse_tracker_data(line)
+        if not data:
+            if '_Gesture:' in line:
+                # A performer left the frame; forget their slider anchor.
+                self.slider_state.pop(_performer_of(line), None)
+            return
+
+        performer = data['P']
+        lg = data.get('L_Gesture', 'N/A')
+        rg = data.get('R_Gesture', 'N/A')
+        now = time.time()
+        self._record_line(now, data, lg, rg)
+        if performer == 0:
+            self.view.set('action', text=f"L: {lg} | R: {rg}")
+        else:
+            self.view.set('action', text=f"P{performer} L: {lg} | R: {rg}")
+
+        actions = self.rules.actions_for(lg, rg, self.control_mode)
+        slider_active = False
+        for op, value in actions:
+            if self.rules.allows(performer, op):
+                self._dispatch(op, value, data, now)
+                slider_active |= op in ('rate_slider', 'volume_slider', 'scrub')
+
+        if not slider_active:
+            self.slider_state.pop(performer, None)
+
+            # A slider drag looks like a swipe, so motions only count while no slider is held
+            for hand, key in (('left', 'L_Motion'), ('right', 'R_Motion')):
+                motion = data.get(key)
+                if motion:
+                    for op, value in self.rules.motion_actions_for(hand, motion, self.control_mode):
+                        if self.rules.allows(performer, op):
+                            self._dispatch(op, value, data, now)
+
+        if self.SPECULATIVE and self.speculation is None:
+            self._speculate(data, now)
+
+    def _speculate(self, data, now):
+        """Starts the reversible actions of a confident candidate gesture before it is confirmed."""
+        lg, rg = data['L_Gesture'], data['R_Gesture']
+        confirmed = set(self.rules.actions_for(lg, rg, self.control_mode))
+        for key, candidate_key, conf_key in (('L_Gesture', 'L_Cand', 'L_Conf'),
+                                             ('R_Gesture', 'R_Cand', 'R_Conf')):
+            candidate = data.get(candidate_key)
+            if not candidate or data.get(conf_key, 0.0) < self.SPECULATIVE_MIN_CONFIDENCE:
+                continue
+            gestures = {'L_Gesture': lg, 'R_Gesture': rg, key: candidate}
+            ops = [(op, value)
+                   for op, value in self.rules.actions_for(gestures['L_Gesture'], gestures['R_Gesture'],
+                                                           self.control_mode)
+                   if op in self.SPECULATIVE_OPS and (op, value) not in confirmed
+                   and self.rules.allows(data['P'], op)
+                   and (op != 'fade_pause' or (self.is_playing and not self.is_paused and not self.is_fading))]
+            if not ops:
+                continue
+
+            self.speculation = {'performer': data['P'], 'key': key, 'candidate_key': candidate_key,
+                                'gesture': candidate, 'ops': ops, 'target_volume': self.target_volume,
+                                'target_rate': self.target_rate, 'fade': False, 'fade_done': False}
+            for op, value in ops:
+                if op == 'fade_pause':
+                    self.speculation['fade'] = True
+                    self.fade_and_pause()
+                else:
+                    self._dispatch(op, value, data, now)
+            self.metrics['speculations'] += 1
+            self._speculation_after_id = self.scheduler.after(self.SPECULATION_WINDOW_MS,
+                                                              self._rollback_speculation)
+            return
+
+    def _check_speculation(self, line):
+        """Confirms or rolls back the pending speculation with the next line of its performer."""
+        spec = self.speculation
+        data = self._parse_tracker_data(line)
+        if line != "No hands detected." and (data['P'] if data else _performer_of(line)) != spec['performer']:
+            return
+        if data and data.get(spec['key']) == spec['gesture']:
+            self._commit_speculation()
+        elif not data or data.get(spec['candidate_key']) != spec['gesture']:
+            self._rollback_speculation()
+
+    def _commit_speculation(self):
+        spec, self.speculation = self.speculation, None
+        if self._speculation_after_id:
+            try:
+                self.scheduler.after_cancel(self._speculation_after_id)
+            except Exception:
+                pass
+        self._speculation_after_id = None
+        if spec['fade_done']:
+            self._finish_fade_pause()
+
+    def _rollback_speculation(self):
+        """Undoes a speculative action that was not confirmed in time."""
+        spec, self.speculation = self.speculation, None
+        if self._speculation_after_id:
+            try:
+                self.scheduler.after_cancel(self._speculation_after_id)
+            except Exception:
+                pass
+        self._speculation_after_id = None
+        if spec is None:
+            return
+        self.metrics['rollbacks'] += 1
+        if spec['fade'] and self.is_fading:
+            self._cancel_fade()
+        self.target_volume = spec['target_volume']
+        self.target_rate = spec['target_rate']
+        log.info(f"Rolled back speculative {spec['gesture']}", ops=[op for op, _ in spec['ops']])
+
+    def _dispatch(self, op, value, data, now):
+        self.recorder.record('commands', now, performer=data['P'], op=op,
+                             value=float('nan') if value is None else value)
+        self._action_handlers[op](value, data)
+
+    def _slider_for(self, data):
+        """Returns the slider anchor of the performer that sent ``data``."""
+        return self.slider_state.setdefault(data.get('P', 0), {'R_X': None, 'R_Y': None})
+
+    def _act_play(self, value, data):
+        if not self.is_playing or self.is_paused:
+            self.play_manual()
+
+    def _act_fade_pause(self, value, data):
+        if self.is_playing and not self.is_paused:
+            self.fade_and_pause()
+
+    def _act_set_volume(self, value, data):
+        target_vol = int(value)
+        if target_vol != self.target_volume:
+            self.target_volume = target_vol
+
+    def _act_set_rate(self, value, data):
+        target_rate = float(value)
+        if abs(target_rate - self.target_rate) > 0.01:
+            self.target_rate = target_rate
+
+    def _act_rate_slider(self, value, data):
+        """Speed control via horizontal movement of the right hand."""
+        R_X = data.get('R_X')
+        if R_X is None:
+            return
+        slider = self._slider_for(data)
+        prev_x = slider.get('R_X')
+        if prev_x is not None:
+            delta_x = R_X - prev_x
+            if abs(delta_x) > self.SLIDER_DEADZONE_X:
+                new_actual_rate = self.playback_rate + (delta_x * 0.005)
+                new_actual_rate = max(0.25, min(3.0, new_actual_rate))
+                if abs(new_actual_rate - self.playback_rate) > 0.01:
+                    self.playback_rate = new_actual_rate
+                    self.target_rate = new_actual_rate
+                    self.player.set_rate(self.playback_rate)
+
+        slider['R_X'] = R_X
+        slider['R_Y'] = None
+
+    def _act_volume_slider(self, value, data):
+        """Volume control via vertical movement of the right hand."""
+        R_Y = data.get('R_Y')
+        if R_Y is None:
+            return
+        slider = self._slider_for(data)
+        prev_y = slider.get('R_Y')
+        if prev_y is not None:
+            delta_y = R_Y - prev_y
+            if abs(delta_y) > self.SLIDER_DEADZONE_Y:
+                new_actual_vol = self.volume - (delta_y * 0.75)
+                new_actual_vol = int(max(0, min(100, new_actual_vol)))
+                if new_actual_vol != self.volume:
+                    self.volume = new_actual_vol
+                    self.target_volume = new_actual_vol
+                    self.player.audio_set_volume(self.volume)
+                    if not self.is_fading:
+                        self.original_volume_on_fade = self.volume
+
+        slider['R_Y'] = R_Y
+        slider['R_X'] = None
+
+    def _act_scrub(self, value, data):
+        """Seeks by dragging the right hand left or right (grab with a fist, open to release)."""
+        R_X = data.get('R_X')
+        if R_X is None:
+            return
+        slider = self._slider_for(data)
+        prev_x = slider.get('R_X')
+        if prev_x is not None:
+            delta_x = R_X - prev_x
+            if abs(delta_x) <= self.SLIDER_DEADZONE_X:
+                # Keep the anchor so slow drags add up
+                return
+            # VLC only estimates the length of VBR files; the seek index knows it
+            index = self._current_seek_index()
+            length = index.duration_ms if index else self.player.get_length()
+            if length > 0:
+                current = self._scrub_position(slider, index)
+                target = int(max(0, min(length - 1, current + delta_x * self.SCRUB_MS_PER_PIXEL)))
+                self._seek(target, index)
+                slider['time'] = (target, time.monotonic())
+                self.view.set('action', text=f'Action: Scrub {target // 60000}:{target // 1000 % 60:02d}')
+
+        slider['R_X'] = R_X
+        slider['R_Y'] = None
+
+    def _scrub_position(self, slider, index=None):
+        """Track time (ms) a scrub step continues from.
+
+        A seek sent through the sync master only runs ``SYNC_LEAD`` later, so
+        within that window the player still reports the old time; the last
+        target is used instead, advanced by the time played since it was set.
+        Otherwise the seek index maps the player position to its frame, as
+        VLC's own time is only an estimate in VBR files.
+        """
+        last = slider.get('time')
+        if last is not None:
+            target, sent_at = last
+            elapsed = time.monotonic() - sent_at
+            if elapsed < self.SYNC_LEAD:
+                if self.is_playing and not self.is_paused:
+                    target += elapsed * 1000 * self.playback_rate
+                return target
+        if index is not None and len(index):
+            return index.time_at(self.player.get_position())
+        return self.player.get_time()
+
+    def _current_seek_index(self):
+        """Seek index of the current track, or None while it is not built (or not needed)."""
+        return self.seek_index.lookup(self.current_file) if self.current_file else None
+
+    def _seek(self, ms, index=None):
+        """Seeks to ``ms``, to the exact frame when the track has a seek index."""
+        if self.sync_master:
+            # Every node seeks by time with its own index; only the local player needs the position
+            self.player.set_time(ms, index.position_for(ms) if index else None)
+        else:
+            seek(self.player, index, ms)
+
+    def _act_follow_tempo(self, value, data):
+        """Sets the playback rate so the track follows the conducted tempo."""
+        tempo = data.get('R_Tempo')
+        if not tempo:
+            return
+        if self.conduct_reference_bpm is None:
+            if self.track_bpm is None and self.current_file:
+                # The background analysis may have finished since the track was loaded.
+                info = self.analysis.lookup(self.current_file)
+                self.track_bpm = info['bpm'] if info else None
+            # Without a known track tempo, the first steady beat counts as 1.00x.
+            self.conduct_reference_bpm = self.track_bpm or tempo
+        target_rate = max(0.25, min(3.0, tempo / self.conduct_reference_bpm))
+        if abs(target_rate - self.target_rate) > 0.02:
+            self.target_rate = target_rate
+
+    def _act_next_track(self, value, data):
+        self._step_track(1)
+
+    def _act_previous_track(self, value, data):
+        self._step_track(-1)
+
+    def _act_toggle_loop(self, value, data):
+        self.loop_enabled = not self.loop_enabled
+        log.info(f"Loop {'on' if self.loop_enabled else 'off'}")
+        self._update_state_label()
+
+    def _step_track(self, offset):
+        """Switches to the neighbouring audio file in the current folder."""
+        if self.is_fading:
+            return
+        folder = os.path.dirname(self.current_file) if self.current_file else os.path.dirname(os.path.realpath(__file__))
+        tracks = list_tracks(folder)
+        if not tracks:
+            return
+        try:
+            index = tracks.index(os.path.join(folder, os.path.basename(self.current_file)))
+        except (ValueError, TypeError):
+            index = -1 if offset > 0 else 0
+        self.load_media(tracks[(index + offset) % len(tracks)])
+        self.play_manual()
+
+    def _update_state_label(self, refresh_player=False):
+        """Updates the state display label with current playback info.
+
+        Only ``refresh_player=True`` (the throttled smoothing-loop path) asks
+        VLC for its state; event handlers already keep the flags current.
+        """
+        if refresh_player:
+            try:
+                player_state = self.player.get_state()
+                if player_state == vlc.State.Playing:
+                    self.is_playing, self.is_paused = True, False
+                elif player_state == vlc.State.Paused:
+                    self.is_playing, self.is_paused = False, True
+                elif player_state not in (vlc.State.Opening, vlc.State.Buffering):
+                    self.is_playing, self.is_paused = False, False
+            except Exception:
+                pass
+
+        if self.is_playing and not self.is_paused:
+            state, state_style = 'playing', 'Playing.TLabel'
+        elif self.is_paused:
+            state, state_style = 'paused', 'Paused.TLabel'
+        else:
+            state, state_style = 'stopped', 'Stopped.TLabel'
+
+        rate_str = f"{self.playback_rate:.2f}x"
+        loop_str = ' | Loop' if self.loop_enabled else ''
+        self.view.set('state',
+                      text=f'State: {state} | Volume: {self.volume} | Rate: {rate_str}{loop_str}',
+                      style=state_style)
+
+    def shutdown(self):
+        """Stops the loops, the tracker, the nodes and VLC. The front end closes itself afterwards."""
+        self.running = False
+
+        # Cancel all scheduled callbacks
+        for after_id in (self._fade_after_id, self._poll_after_id, self._smooth_update_id,
+                         self._watchdog_after_id, self._speculation_after_id):
+            if after_id:
+                try:
+                    self.scheduler.after_cancel(after_id)
+                except Exception:
+                    pass
+
+        self._fade_after_id = None
+        self._poll_after_id = None
+        self._smooth_update_id = None
+        self._watchdog_after_id = None
+        self._speculation_after_id = None
+        self.view.cancel()
+
+        self._on_profile_written(self.profiler.stop())
+
+        # Stop hand tracking and background analysis
+        self.stop_hand_tracking_subprocess(wait=True)
+        self.analysis.shutdown()
+        self.seek_index.shutdown()
+
+        # Tell the player nodes to stop, then stop the local player right away
+        if self.sync_master:
+            try:
+                self.player.stop()
+                self.player.close()
+            except Exception as e:
+                log.error(f"Error stopping player nodes: {e}")
+            self.player = self.player.player
+
+        # Stop VLC player
+        try:
+            log.info("Stopping VLC player on close.")
+            if self.player:
+                self.player.stop()
+        except Exception as e:
+            log.error(f"Error stopping player: {e}")
+        if self.dsp:
+            self.dsp.close()
+
+        try:
+            log.info("Releasing VLC instance.")
+            if self.instance:
+                self.instance.release()
+        except Exception as e:
+            log.error(f"Error releasing instance: {e}")
+
+
+def add_controller_arguments(parser):
+    """Options shared by the GUI and the headless daemon."""
+    parser.add_argument('--profile', metavar='MODE[:SECONDS]', type=profile_arg,
+                        help='profile the controller at startup: cprofile or sample (also $MAESTRO_PROFILE)')
+    parser.add_argument('--watchdog-ms', type=int, default=MaestroController.WATCHDOG_BUDGET_MS,
+                        help='restart the tracker after this long without output (also $MAESTRO_WATCHDOG_MS)')
+    parser.add_argument('--max-hands', type=int, default=MaestroController.TRACKER_MAX_HANDS,
+                        help='hands the tracker follows; every two nearby hands form one performer')
+    parser.add_argument('--sync-port', type=int,
+                        help='let player nodes (sync_playback.py node) follow playback on this UDP port')
+    parser.add_argument('--sync-lead-ms', type=float, default=DEFAULT_LEAD * 1000,
+                        help='delay before synchronized commands take effect on all nodes')
+    parser.add_argument('--dsp-audio', action='store_true',
+                        help='play through the NumPy DSP path for click-free fades (needs sounddevice)')
+    parser.add_argument('--preview-fps', type=float, default=MaestroController.PREVIEW_FPS,
+                        help='show hand landmarks in the controller at this rate instead of a camera window')
+    parser.add_argument('--speculative', action='store_true',
+                        help='start volume, speed and fade changes on a confident gesture before it is confirmed, '
+                             'rolling them back if it is not')
+    parser.add_argument('--camera', type=int, default=MaestroController.TRACKER_CAMERA,
+                        help='camera device index for the tracker (default: the first one that delivers frames)')
+    parser.add_argument('--tracker-backend', choices=('legacy', 'tasks'),
+                        default=MaestroController.TRACKER_BACKEND,
+                        help='hand detector in the tracker; tasks needs hand_landmarker.task next to the scripts')
+    parser.add_argument('--log-level', type=str.upper, choices=list(LEVELS),
+                        default=os.environ.get(LOG_LEVEL_ENV, 'INFO').upper(),
+                        help='event log level for the controller and tracker (also $MAESTRO_LOG_LEVEL)')
+    return parser
+
+
+def configure_controller(args):
+    """Sets the log level and returns the MaestroController settings for the shared options."""
+    log.set_level(args.log_level)
+    return {
+        'WATCHDOG_BUDGET_MS': args.watchdog_ms,
+        'TRACKER_MAX_HANDS': args.max_hands,
+        'SYNC_PORT': args.sync_port,
+        'SYNC_LEAD': args.sync_lead_ms / 1000.0,
+        'DSP_AUDIO': args.dsp_audio,
+        'LOG_LEVEL': args.log_level,
+        'PREVIEW_FPS': args.preview_fps,
+        'TRACKER_BACKEND': args.tracker_backend,
+        'TRACKER_CAMERA': args.camera,
+        'SPECULATIVE': args.speculative,
+    }
+
+
+def start_profile_from_args(controller, args):
+    spec = args.profile or parse_env_spec(log)
+    if spec:
+        controller.start_profile(*spec)
@@ -0,0 +1,299 @@
+import sys
+import time
+import wave
+import ctypes
+import argparse
+import threading
+
+import numpy as np
+
+from track_analysis import decode_wav
+
+try:
+    import sounddevice
+except ImportError:
+    sounddevice = None
+
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BLOCK = 1024                 # Frames per processing block
+FRAME = 1024                 # WSOLA frame length (samples)
+SYNTHESIS_HOP = 512          # Output hop; 50% overlap with a periodic Hann window sums to 1
+TOLERANCE = 256              # WSOLA search range around the nominal input position (samples)
+SEARCH_DECIMATION = 4        # Correlation is computed on every 4th sample of a mono mix
+VOLUME_RAMP = 0.02           # Seconds over which volume changes are smoothed
+
+
+class GainEnvelope:
+    """Sample-accurate gain with linear ramps.
+
+    ``ramp_to`` may be called from any thread; ``process`` scales a block of
+    shape (frames, channels) in place, continuing a ramp across blocks.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, gain=1.0):
+        self.sample_rate = sample_rate
+        self.gain = float(gain)
+        self.target = float(gain)
+        self._step = 0.0
+        self._remaining = 0
+        self._lock = threading.Lock()
+
+    def set(self, gain):
+        with self._lock:
+            self.gain = self.target = float(gain)
+            self._remaining = 0
+
+    def ramp_to(self, gain, seconds):
+        with self._lock:
+            self.target = float(gain)
+            self._remaining = max(1, int(seconds * self.sample_rate))
+            self._step = (self.target - self.gain) / self._remaining
+
+    @property
+    def ramping(self):
+        return self._remaining > 0
+
+    def process(self, block):
+        with self._lock:
+            n = len(block)
+            if self._remaining:
+                k = min(n, self._remaining)
+                ramp = self.gain + self._step * np.arange(1, k + 1, dtype=np.float32)
+                block[:k] *= ramp[:, None]
+                self._remaining -= k
+                self.gain = self.target if not self._remaining else float(ramp[-1])
+                if k < n:
+                    block[k:] *= self.gain
+            elif self.gain != 1.0:
+                block *= self.gain
+        return block
+
+
+class TimeStretcher:
+    """Streaming, pitch-preserving time-stretch (WSOLA).
+
+    Output frames are taken every ``SYNTHESIS_HOP`` samples from the input
+    advanced by ``rate * SYNTHESIS_HOP``; each frame's start is shifted by up
+    to ``TOLERANCE`` samples to best match the natural continuation of the
+    previous frame (one vectorized correlation per frame), then overlap-added.
+    ``rate`` can be ramped per frame with ``ramp_to``.
+    """
+
+    def __init__(self, channels=CHANNELS, sample_rate=SAMPLE_RATE, rate=1.0, frame=FRAME,
+                 hop=SYNTHESIS_HOP, tolerance=TOLERANCE):
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.frame = frame
+        self.hop = hop
+        self.tolerance = tolerance
+        self.rate = float(rate)
+        self._target_rate = self.rate
+        self._rate_step = 0.0
+        self._rate_frames = 0
+        self._window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)[:, None]
+        # Zero padding in front lets the first frames search backwards, too
+        self._input = np.zeros((tolerance, channels), dtype=np.float32)
+        self._pos = float(tolerance)       # Nominal start of the next frame in _input
+        self._natural = None               # Start of the natural continuation of the last frame
+        self._acc = np.zeros((frame, channels), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def ramp_to(self, rate, seconds):
+        with self._lock:
+            frames = max(1, int(seconds * self.sample_rate / self.hop))
+            self._target_rate = float(rate)
+            self._rate_frames = frames
+            self._rate_step = (self._target_rate - self.rate) / frames
+
+    def set_rate(self, rate):
+        with self._lock:
+            self.rate = self._target_rate = float(rate)
+            self._rate_frames = 0
+
+    def process(self, block):
+        """Consumes a (frames, channels) block and returns whatever output is ready."""
+        with self._lock:
+            self._input = np.concatenate([self._input, block.astype(np.float32, copy=False)])
+            out = []
+            frame, hop, tol = self.frame, self.hop, self.tolerance
+            while True:
+                expected = int(round(self._pos))
+                if max(expected + tol, self._natural or 0) + frame > len(self._input):
+                    break
+                if self._natural is None:
+                    start = expected
+                elif self.rate == 1.0 and not self._rate_frames:
+                    start = self._natural
+                else:
+                    start = expected - tol + self._best_offset(expected)
+                self._acc += self._input[start:start + frame] * self._window
+                out.append(self._acc[:hop].copy())
+                self._acc[:-hop] = self._acc[hop:]
+                self._acc[-hop:] = 0.0
+                self._natural = start + hop
+
+                if self._rate_frames:
+                    self.rate += self._rate_step
+                    self._rate_frames -= 1
+                    if not self._rate_frames:
+                        self.rate = self._target_rate
+                self._pos += self.rate * hop
+
+            # Drop input that no future frame can reach
+            keep_from = max(0, min(int(self._pos) - tol, self._natural or 0) - 1)
+            if keep_from:
+                self._input = self._input[keep_from:]
+                self._pos -= keep_from
+                if self._natural is not None:
+                    self._natural -= keep_from
+        if not out:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        return np.concatenate(out)
+
+    def _best_offset(self, expected):
+        tol, frame, d = self.tolerance, self.frame, SEARCH_DECIMATION
+        template = self._input[self._natural:self._natural + frame:d].mean(axis=1)
+        region = self._input[expected - tol:expected + tol + frame].mean(axis=1)
+        candidates = np.lib.stride_tricks.sliding_window_view(region, frame)[:, ::d]
+        return int(np.argmax(candidates @ template))
+
+    def flush(self):
+        """Returns the remaining output after the last input block."""
+        tail = self.process(np.zeros((self.frame + 2 * self.tolerance, self.channels), dtype=np.float32))
+        return np.concatenate([tail, self._acc[:self.frame - self.hop]])
+
+
+class WavSink:
+    """Writes float blocks to a 16-bit WAV file (offline verification)."""
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        self._wav = wave.open(str(path), 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(int(sample_rate))
+
+    def write(self, block):
+        pcm = (np.clip(block, -1.0, 1.0) * 32767.0).astype('<i2')
+        self._wav.writeframes(pcm.tobytes())
+
+    def close(self):
+        self._wav.close()
+
+
+class SoundDeviceSink:
+    """Plays float blocks on the default sound device (needs the sounddevice package)."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS, block=BLOCK):
+        if sounddevice is None:
+            raise RuntimeError("sounddevice is not installed (pip install sounddevice)")
+        self._stream = sounddevice.OutputStream(samplerate=sample_rate, channels=channels,
+                                                dtype='float32', blocksize=block)
+        self._stream.start()
+
+    def write(self, block):
+        self._stream.write(np.ascontiguousarray(block, dtype=np.float32))
+
+    def close(self):
+        self._stream.stop()
+        self._stream.close()
+
+
+class DspChain:
+    """Time-stretch followed by gain, block by block, into a sink."""
+
+    def __init__(self, sink, sample_rate=SAMPLE_RATE, channels=CHANNELS, stretch=True):
+        self.sink = sink
+        self.gain = GainEnvelope(sample_rate)
+        self.stretcher = TimeStretcher(channels, sample_rate) if stretch else None
+        self.process_time = 0.0
+        self.frames_in = 0
+
+    def process(self, block):
+        start = time.perf_counter()
+        self.frames_in += len(block)
+        out = self.stretcher.process(block) if self.stretcher else block
+        if len(out):
+            self.gain.process(out)
+            self.sink.write(out)
+        self.process_time += time.perf_counter() - start
+
+    def close(self):
+        if self.stretcher:
+            out = self.stretcher.flush()
+            self.gain.process(out)
+            self.sink.write(out)
+        self.sink.close()
+
+
+class VlcAudioTap:
+    """Routes libvlc's decoded PCM through a DspChain instead of VLC's own output.
+
+    VLC keeps decoding, pacing and its scaletempo rate changes; the chain
+    applies sample-accurate gain. VLC volume changes arrive through the volume
+    callback and become short ramps instead of steps.
+    """
+
+    def __init__(self, vlc, player, sink, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        self.channels = channels
+        self.chain = DspChain(sink, sample_rate, channels, stretch=False)
+        self.gain = self.chain.gain
+        self._scratch = np.zeros((BLOCK * 8, channels), dtype=np.float32)
+        # Keep references to the ctypes callbacks, or they are garbage collected
+        self._play_cb = vlc.CallbackDecorators.AudioPlayCb(self._on_play)
+        self._volume_cb = vlc.CallbackDecorators.AudioSetVolumeCb(self._on_volume)
+        player.audio_set_format('S16N', sample_rate, channels)
+        player.audio_set_callbacks(self._play_cb, None, None, None, None, None)
+        player.audio_set_volume_callback(self._volume_cb)
+
+    def _on_play(self, data, samples, count, pts):
+        pcm = np.ctypeslib.as_array(ctypes.cast(samples, ctypes.POINTER(ctypes.c_int16)),
+                                    shape=(count * self.channels,)).reshape(count, self.channels)
+        if count > len(self._scratch):
+            self._scratch = np.zeros((count, self.channels), dtype=np.float32)
+        block = self._scratch[:count]
+        np.multiply(pcm, 1.0 / 32768.0, out=block)
+        self.chain.process(block)
+
+    def _on_volume(self, data, volume, mute):
+        self.gain.ramp_to(0.0 if mute else volume, VOLUME_RAMP)
+
+    def close(self):
+        self.chain.sink.close()
+
+
+def main():
+    """Processes a WAV file offline and reports the real-time factor."""
+    parser = argparse.ArgumentParser(description='MaestroBOT DSP audio path (offline)')
+    parser.add_argument('input', help='PCM WAV file')
+    parser.add_argument('output', nargs='?', help='WAV file to write (default: play on the sound device)')
+    parser.add_argument('--rate', type=float, default=1.0, help='playback rate at the end of the ramp')
+    parser.add_argument('--rate-ramp', type=float, default=0.0, help='seconds to ramp from 1.0 to --rate')
+    parser.add_argument('--fade-out', type=float, default=0.0, help='fade to silence over the last N seconds')
+    args = parser.parse_args()
+
+    samples, rate = decode_wav(args.input, mono=False)
+    channels = samples.shape[1]
+    sink = WavSink(args.output, rate, channels) if args.output else SoundDeviceSink(rate, channels)
+    chain = DspChain(sink, rate, channels)
+    if args.rate_ramp > 0:
+        chain.stretcher.ramp_to(args.rate, args.rate_ramp)
+    else:
+        chain.stretcher.set_rate(args.rate)
+
+    fade_at = len(samples) - int(args.fade_out * rate) if args.fade_out else None
+    for start in range(0, len(samples), BLOCK):
+        if fade_at is not None and start >= fade_at:
+            chain.gain.ramp_to(0.0, args.fade_out / max(args.rate, 0.01))
+            fade_at = None
+        chain.process(samples[start:start + BLOCK])
+    chain.close()
+
+    audio_seconds = len(samples) / rate
+    print(f"{audio_seconds:.1f}s of audio processed in {chain.process_time:.3f}s "
+          f"(real-time factor {chain.process_time / audio_seconds:.4f})")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
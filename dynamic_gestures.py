@@ -0,0 +1,166 @@
+import time
+
+import numpy as np
+
+
+# Recognizer defaults
+RING_CAPACITY = 64          # Samples kept per hand (~2s at 30fps)
+MATCH_WINDOW = 0.8          # Seconds of trajectory compared against templates
+TEMPLATE_POINTS = 32        # Points per resampled trajectory/template
+DTW_BAND = 6                # Sakoe-Chiba band half-width (in points)
+MATCH_THRESHOLD = 0.02      # Max mean squared distance (normalized units) for a match
+MIN_EXTENT = 120.0          # Pixels the hand must travel before matching is attempted
+FIRE_COOLDOWN = 0.6         # Seconds before the same hand can fire again
+
+_BIG = 1e9  # Cost outside the DTW band (finite so the cumulative sums stay well defined)
+
+
+class TrajectoryRing:
+    """Fixed-size ring of (time, x, y) samples for one hand. Never reallocates."""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.points = np.zeros((capacity, 2), dtype=np.float64)
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+        self._order = np.arange(capacity)
+
+    def push(self, t, x, y):
+        self.points[self.head, 0] = x
+        self.points[self.head, 1] = y
+        self.times[self.head] = t
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def window(self, seconds, now):
+        """Returns the samples from the last ``seconds``, oldest first."""
+        idx = (self._order[:self.count] + (self.head - self.count)) % self.capacity
+        keep = self.times[idx] >= (now - seconds)
+        return self.points[idx[keep]]
+
+
+def resample(path, n=TEMPLATE_POINTS):
+    """Resamples a path to ``n`` points evenly spaced along its arc length.
+
+    Pauses contribute no arc length, so the result only depends on the shape
+    of the movement, not on its speed.
+    """
+    seg = np.sqrt((np.diff(path, axis=0) ** 2).sum(axis=1))
+    dist = np.concatenate(([0.0], np.cumsum(seg)))
+    if dist[-1] <= 0:
+        return np.repeat(path[:1], n, axis=0)
+    targets = np.linspace(0.0, dist[-1], n)
+    return np.stack([np.interp(targets, dist, path[:, 0]),
+                     np.interp(targets, dist, path[:, 1])], axis=1)
+
+
+def normalize(path):
+    """Centers a path and scales its largest extent to 1 (aspect preserved)."""
+    path = path - path.mean(axis=0)
+    extent = np.ptp(path, axis=0).max()
+    return path / extent if extent > 0 else path
+
+
+def _build_templates(n=TEMPLATE_POINTS):
+    """Built-in templates in image coordinates (y grows downwards)."""
+    s = np.linspace(0.0, 1.0, n)
+    angle = s * 2 * np.pi
+    zeros = np.zeros(n)
+    shapes = [
+        ("Swipe Right", np.stack([s, zeros], axis=1)),
+        ("Swipe Left", np.stack([-s, zeros], axis=1)),
+        ("Circle", np.stack([np.cos(angle), np.sin(angle)], axis=1)),
+        ("Circle", np.stack([np.cos(angle), -np.sin(angle)], axis=1)),
+        # Conductor's downbeat: a drop followed by a rebound
+        ("Beat", np.stack([zeros, 1.0 - np.abs(2 * s - 1.0)], axis=1)),
+    ]
+    names = [name for name, _ in shapes]
+    templates = np.stack([normalize(resample(points, n)) for _, points in shapes])
+    return names, templates
+
+
+def dtw_distances(query, templates, band=DTW_BAND, abandon_above=np.inf):
+    """DTW distance from ``query`` (M, 2) to every template (K, M, 2) at once.
+
+    Rows are computed for all templates together. The within-row dependency
+    D[i, j-1] is resolved with a min-plus scan:
+    D[i] = S + minimum.accumulate(tmp - S) where S is the cumulative row cost.
+    The loop stops early once every template's best partial path already
+    exceeds ``abandon_above`` (row minima never decrease). Returns mean
+    per-step costs, or None if abandoned.
+    """
+    m = query.shape[0]
+    cost = ((query[None, :, None, :] - templates[:, None, :, :]) ** 2).sum(axis=-1)
+    i_idx, j_idx = np.indices((m, m))
+    cost[:, np.abs(i_idx - j_idx) > band] = _BIG
+
+    limit = abandon_above * m
+    prev = np.cumsum(cost[:, 0, :], axis=1)
+    for i in range(1, m):
+        row = cost[:, i, :]
+        diag = np.empty_like(prev)
+        diag[:, 0] = np.inf
+        diag[:, 1:] = prev[:, :-1]
+        tmp = row + np.minimum(prev, diag)
+        running = np.cumsum(row, axis=1)
+        prev = running + np.minimum.accumulate(tmp - running, axis=1)
+        if prev.min() > limit:
+            return None
+    return prev[:, -1] / m
+
+
+class DynamicGestureRecognizer:
+    """Streaming matcher for swipes, circles and beats per hand.
+
+    Call ``update`` once per frame with the wrist position of each visible
+    hand; it returns the name of a gesture that just completed, or None.
+    Most frames return before any matching because the hand has not moved
+    far enough within the window.
+    """
+
+    def __init__(self, window=MATCH_WINDOW, threshold=MATCH_THRESHOLD, min_extent=MIN_EXTENT,
+                 cooldown=FIRE_COOLDOWN):
+        self.window = window
+        self.threshold = threshold
+        self.min_extent = min_extent
+        self.cooldown = cooldown
+        self.names, self.templates = _build_templates()
+        self.rings = {}
+        self.last_fire = {}
+        self.last_match_ms = 0.0
+
+    def forget(self, key):
+        """Drops the history of a hand that left the frame."""
+        self.rings.pop(key, None)
+
+    def update(self, key, x, y, now=None):
+        now = time.time() if now is None else now
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = TrajectoryRing()
+        ring.push(now, x, y)
+
+        if (now - self.last_fire.get(key, 0.0)) < self.cooldown:
+            return None
+        path = ring.window(self.window, now)
+        if len(path) < 4 or np.ptp(path, axis=0).max() < self.min_extent:
+            return None
+
+        start = time.perf_counter()
+        query = normalize(resample(path))
+        distances = dtw_distances(query, self.templates, abandon_above=self.threshold)
+        self.last_match_ms = (time.perf_counter() - start) * 1000.0
+        if distances is None:
+            return None
+
+        best = int(np.argmin(distances))
+        if distances[best] > self.threshold:
+            return None
+        self.last_fire[key] = now
+        ring.clear()
+        return self.names[best]
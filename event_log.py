@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import threading
+from collections import deque
+
+
+LOG_LEVEL_ENV = 'MAESTRO_LOG_LEVEL'      # DEBUG, INFO, WARNING or ERROR
+LOG_DIR_ENV = 'MAESTRO_LOG_DIR'
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+DEFAULT_LEVEL = 'INFO'
+BUFFER_RECORDS = 4096        # Records held in memory; more are dropped (and counted), never waited for
+FLUSH_INTERVAL = 0.25        # Seconds between writer wakeups when nothing urgent is queued
+MAX_BYTES = 5 * 1024 * 1024  # Rotate the file past this size
+BACKUPS = 3                  # Rotated files kept: <name>.jsonl.1 ... .3
+
+
+def default_log_dir():
+    return os.environ.get(LOG_DIR_ENV) or os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), 'logs')
+
+
+def parse_level(level):
+    """Returns the numeric level for a name like "info" (default level when empty)."""
+    name = (level or os.environ.get(LOG_LEVEL_ENV) or DEFAULT_LEVEL).strip().upper()
+    if name not in LEVELS:
+        raise ValueError(f"unknown log level {level!r} (choose from {', '.join(LEVELS)})")
+    return LEVELS[name]
+
+
+class EventLog:
+    """Structured JSON-lines log written by a background thread.
+
+    ``info``/``error``/... only filter by level and append a small dict to a
+    bounded in-memory buffer, so the Tk and capture threads never wait on a
+    disk or a slow terminal. The writer thread serializes records to
+    ``<dir>/<name>.jsonl`` (rotated by size) and mirrors them to stderr as
+    ``LEVEL: message`` lines.
+    """
+
+    def __init__(self, name, level=None, out_dir=None, console=True, max_bytes=MAX_BYTES,
+                 backups=BACKUPS, capacity=BUFFER_RECORDS):
+        self.name = name
+        self.level = parse_level(level)
+        self.out_dir = out_dir or default_log_dir()
+        self.path = os.path.join(self.out_dir, f"{name}.jsonl")
+        self.console = console
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.capacity = capacity
+        self.dropped = 0
+        self._buffer = deque()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._closed = False
+
+    def set_level(self, level):
+        self.level = parse_level(level)
+
+    def enabled(self, level):
+        return LEVELS[level] >= self.level
+
+    def log(self, level, msg, **fields):
+        if LEVELS[level] < self.level or self._closed:
+            return
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        fields['t'] = time.time()
+        fields['level'] = level
+        fields['msg'] = msg
+        self._buffer.append(fields)
+        if self._thread is None:
+            self._start()
+        if LEVELS[level] >= LEVELS['ERROR']:
+            self._wake.set()
+
+    def debug(self, msg, **fields):
+        self.log('DEBUG', msg, **fields)
+
+    def info(self, msg, **fields):
+        self.log('INFO', msg, **fields)
+
+    def warning(self, msg, **fields):
+        self.log('WARNING', msg, **fields)
+
+    def error(self, msg, **fields):
+        self.log('ERROR', msg, **fields)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name=f"{self.name}-log", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _writer_loop(self):
+        while not self._closed:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            self._write_pending()
+        self._write_pending()
+
+    def _write_pending(self):
+        if not self._buffer:
+            return
+        lines, console = [], []
+        while self._buffer:
+            record = self._buffer.popleft()
+            lines.append(json.dumps(record, default=str, ensure_ascii=False))
+            if self.console:
+                extra = ' '.join(f"{k}={v}" for k, v in record.items() if k not in ('t', 'level', 'msg'))
+                console.append(f"{record['level']}: {record['msg']}" + (f" ({extra})" if extra else ''))
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            lines.append(json.dumps({'t': time.time(), 'level': 'WARNING', 'msg': 'log buffer full',
+                                     'dropped': dropped}))
+            if self.console:
+                console.append(f"WARNING: log buffer full, {dropped} records dropped")
+        try:
+            if self._file is None:
+                os.makedirs(self.out_dir, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            if self._file.tell() > self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            console.append(f"ERROR: Could not write {self.path}: {e}")
+        if console:
+            try:
+                sys.stderr.write('\n'.join(console) + '\n')
+                sys.stderr.flush()
+            except (OSError, ValueError):
+                pass
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self):
+        """Writes what is buffered and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_logs = {}
+
+
+def _reset_after_fork():
+    # The writer thread does not survive fork(); a child (e.g. a tracker
+    # pipeline stage) starts its own on first use.
+    for log in _logs.values():
+        log._buffer = deque()
+        log._wake = threading.Event()
+        log._lock = threading.Lock()
+        log._thread = None
+        log._file = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_log(name):
+    """Returns the process-wide EventLog called ``name`` (created on first use)."""
+    log = _logs.get(name)
+    if log is None:
+        log = _logs.setdefault(name, EventLog(name))
+    return log
+
+
+def main():
+    """Prints JSON-lines logs as text, optionally filtered by level."""
+    parser = argparse.ArgumentParser(description='Show MaestroBOT event logs')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--level', default='DEBUG', help='minimum level to show')
+    args = parser.parse_args()
+    minimum = parse_level(args.level)
+    for path in args.files:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if LEVELS.get(record.get('level'), 0) < minimum:
+                    continue
+                stamp = time.strftime('%H:%M:%S', time.localtime(record.pop('t', 0)))
+                extra = ' '.join(f"{k}={v}" for k, v in record.items() if k not in ('level', 'msg'))
+                print(f"{stamp} {record['level']:<7} {record['msg']}" + (f" ({extra})" if extra else ''))
+
+
+if __name__ == '__main__':
+    main()
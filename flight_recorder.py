@@ -0,0 +1,191 @@
+import os
+import sys
+import glob
+import time
+import signal
+import threading
+
+import numpy as np
+
+from event_log import get_log
+
+
+RECORDER_DIR_ENV = 'MAESTRO_RECORDER_DIR'
+RECORD_SECONDS = 30.0        # History kept in every ring
+MAX_DUMPS = 20               # Older dumps of the same process name are deleted
+
+
+def clip_text(value, dtype):
+    """Fits ``value`` into a text column of ``dtype`` ('U<n>'), cutting it at n characters."""
+    return str(value)[:np.dtype(dtype).itemsize // 4]
+
+
+def default_recorder_dir():
+    return os.environ.get(RECORDER_DIR_ENV) or os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), 'crashes')
+
+
+def reason_slug(reason):
+    return ''.join(c if c.isalnum() else '-' for c in reason)[:40]
+
+
+def find_dumps(name, pid, reason, out_dir=None):
+    """Dumps written by process ``pid`` of recorder ``name`` for ``reason`` (e.g. another process's)."""
+    pattern = f"{name}-*-{pid}-{reason_slug(reason)}.npz"
+    return glob.glob(os.path.join(out_dir or default_recorder_dir(), pattern))
+
+
+class Ring:
+    """Fixed-capacity ring of records stored column-wise in preallocated arrays.
+
+    ``fields`` maps a column name to ``(dtype, shape)``; a time column ``t`` is
+    always present. Appending writes into the existing arrays, so recording
+    never allocates or grows. Text columns use 'U<n>' dtypes: any text fits
+    (gesture names come from the user's gestures.json), cut at n characters.
+    """
+
+    def __init__(self, capacity, fields):
+        self.capacity = int(capacity)
+        self.columns = {'t': np.zeros(self.capacity, dtype=np.float64)}
+        for name, (dtype, shape) in fields.items():
+            self.columns[name] = np.zeros((self.capacity,) + tuple(shape), dtype=dtype)
+        self.head = 0
+        self.count = 0
+
+    def claim(self, t):
+        """Advances to the next slot and stamps it; returns the slot index.
+
+        The caller fills the other columns in place, e.g.
+        ``ring.columns['landmarks'][slot, 0] = ...``.
+        """
+        slot = self.head
+        self.columns['t'][slot] = t
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return slot
+
+    def append(self, t, /, **values):
+        slot = self.claim(t)
+        for name, value in values.items():
+            column = self.columns[name]
+            if column.dtype.kind == 'U':
+                value = clip_text(value, column.dtype)
+            column[slot] = value
+        return slot
+
+    def snapshot(self):
+        """Returns the recorded rows, oldest first, as copies."""
+        start = (self.head - self.count) % self.capacity
+        order = (start + np.arange(self.count)) % self.capacity
+        return {name: column[order] for name, column in self.columns.items()}
+
+
+class FlightRecorder:
+    """Always-on, fixed-memory record of the last few seconds of a process.
+
+    Rings are added once at startup (``add``) and filled every frame; ``dump``
+    writes all of them to one ``.npz`` file. ``install`` hooks unhandled
+    exceptions (main thread, other threads and Tk callbacks) and SIGUSR1 so a
+    post-mortem is written without full-session logging.
+    """
+
+    def __init__(self, name, seconds=RECORD_SECONDS, out_dir=None):
+        self.name = name
+        self.seconds = seconds
+        self.out_dir = out_dir or default_recorder_dir()
+        self.rings = {}
+        self.lock = threading.RLock()   # Re-entrant: the SIGUSR1 handler runs on the main thread
+        self.last_dump = None
+
+    def add(self, name, rate, /, **fields):
+        """Adds a ring holding ``seconds`` of history at ``rate`` records per second."""
+        ring = Ring(max(1, int(self.seconds * rate)), fields)
+        self.rings[name] = ring
+        return ring
+
+    def record(self, ring, t, /, **values):
+        with self.lock:
+            self.rings[ring].append(t, **values)
+
+    def dump(self, reason):
+        """Writes every ring to ``<name>-<time>-<pid>-<reason>.npz``. Returns the path."""
+        with self.lock:
+            arrays = {f"{ring}/{column}": values
+                      for ring, snapshot in ((n, r.snapshot()) for n, r in self.rings.items())
+                      for column, values in snapshot.items()}
+        arrays['reason'] = np.array(reason)
+        arrays['dumped_at'] = np.array(time.time())
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S') + f"{time.time() % 1:.3f}"[1:]
+        path = os.path.join(self.out_dir, f"{self.name}-{stamp}-{os.getpid()}-{reason_slug(reason)}.npz")
+        # Written under a temporary name, so a finished dump is all another process can find
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+        self.last_dump = path
+        self._prune()
+        return path
+
+    def _prune(self):
+        dumps = sorted(glob.glob(os.path.join(self.out_dir, f"{self.name}-*.npz")), key=os.path.getmtime)
+        for old in dumps[:-MAX_DUMPS]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def dump_safely(self, reason):
+        """Like ``dump``, but reports errors instead of raising. Returns the path or None."""
+        try:
+            path = self.dump(reason)
+        except Exception as e:
+            get_log(self.name).error(f"Could not write flight recorder: {e}")
+            return None
+        get_log(self.name).info(f"Flight recorder written to {path}")
+        return path
+
+    def install(self, root=None):
+        """Dumps on unhandled exceptions, Tk callback errors (if ``root``) and SIGUSR1."""
+        previous_hook = sys.excepthook
+        previous_thread_hook = threading.excepthook
+
+        def excepthook(exc_type, exc, tb):
+            self.dump_safely(f"exception {exc_type.__name__}")
+            previous_hook(exc_type, exc, tb)
+
+        def thread_excepthook(args):
+            self.dump_safely(f"thread exception {args.exc_type.__name__}")
+            previous_thread_hook(args)
+
+        sys.excepthook = excepthook
+        threading.excepthook = thread_excepthook
+
+        if root is not None:
+            previous_report = root.report_callback_exception
+
+            def report_callback_exception(exc_type, exc, tb):
+                self.dump_safely(f"tk exception {exc_type.__name__}")
+                previous_report(exc_type, exc, tb)
+
+            root.report_callback_exception = report_callback_exception
+
+        if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump_safely('SIGUSR1'))
+
+
+def main():
+    """Prints a summary of flight recorder dumps."""
+    for path in sys.argv[1:]:
+        with np.load(path) as data:
+            print(f"{os.path.basename(path)}: {data['reason']}")
+            rings = sorted({key.split('/')[0] for key in data.files if '/' in key})
+            for ring in rings:
+                t = data[f"{ring}/t"]
+                span = f"{t[-1] - t[0]:.1f}s" if len(t) else "empty"
+                print(f"  {ring}: {len(t)} records, {span}")
+
+
+if __name__ == '__main__':
+    main()
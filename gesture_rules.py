@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import itertools
+
+
+# Reserved gesture codes; vocabulary entries are numbered after these.
+NO_HAND = 0
+OTHER = 1
+RESERVED_NAMES = ["No Hand", "Other"]
+
+# Actions the controller knows how to perform.
+ACTIONS = {"play", "fade_pause", "set_volume", "set_rate", "volume_slider", "rate_slider",
+           "next_track", "previous_track", "toggle_loop", "follow_tempo", "scrub"}
+HANDS = ("left", "right")
+
+FINGER_ORDER = "thumb, index, middle, ring, pinky"
+
+# Used when no config file can be found; matches the shipped gestures.json.
+DEFAULT_CONFIG = {
+    "gestures": [
+        {"name": "Closed Fist", "count": 0},
+        {"name": "One Finger", "count": 1},
+        {"name": "Two Fingers", "count": 2},
+        {"name": "Three Fingers", "count": 3},
+        {"name": "Four Fingers", "count": 4},
+        {"name": "Open Hand", "count": 5},
+    ],
+    "actions": {
+        "static": [
+            {"left": "Open Hand", "right": "Open Hand", "do": "play"},
+            {"left": "Closed Fist", "right": "Closed Fist", "do": "fade_pause"},
+            {"left": "One Finger", "do": ["set_volume", 25]},
+            {"left": "Two Fingers", "do": ["set_volume", 50]},
+            {"left": "Three Fingers", "do": ["set_volume", 75]},
+            {"left": "Four Fingers", "do": ["set_volume", 100]},
+            {"right": "One Finger", "do": ["set_rate", 0.5]},
+            {"right": "Two Fingers", "do": ["set_rate", 0.75]},
+            {"right": "Three Fingers", "do": ["set_rate", 1.0]},
+            {"right": "Four Fingers", "do": ["set_rate", 1.5]},
+        ],
+        "slider": [
+            {"left": "Open Hand", "do": "play"},
+            {"left": "Closed Fist", "do": "fade_pause"},
+            {"right": "Open Hand", "do": "rate_slider"},
+            {"right": "Closed Fist", "do": "volume_slider"},
+        ],
+        "conduct": [
+            {"left": "Open Hand", "do": "play"},
+            {"left": "Closed Fist", "do": "fade_pause"},
+            {"do": "follow_tempo"},
+        ],
+        "scrub": [
+            {"left": "Open Hand", "do": "play"},
+            {"left": "Closed Fist", "do": "fade_pause"},
+            {"right": "Closed Fist", "do": "scrub"},
+        ],
+    },
+    "motions": [
+        {"hand": "right", "motion": "Swipe Left", "do": "previous_track", "modes": ["static"]},
+        {"hand": "right", "motion": "Swipe Right", "do": "next_track", "modes": ["static"]},
+        {"hand": "right", "motion": "Circle", "do": "toggle_loop", "modes": ["static"]},
+    ],
+    "performers": {
+        "0": "*",
+        "1": ["set_volume", "volume_slider"],
+        "2": ["set_rate", "rate_slider", "follow_tempo"],
+    },
+}
+
+
+def default_rules_path():
+    """Config path from $MAESTRO_GESTURES, else gestures.json next to the scripts."""
+    env_path = os.environ.get("MAESTRO_GESTURES")
+    if env_path:
+        return env_path
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), "gestures.json")
+
+
+def _pattern_masks(pattern):
+    """Expands a finger pattern like "01100" or "x1100" into matching bitmasks."""
+    pattern = pattern.replace(" ", "").lower()
+    if len(pattern) != 5 or any(c not in "01x" for c in pattern):
+        raise ValueError(f"finger pattern {pattern!r} must be 5 chars of 0/1/x ({FINGER_ORDER})")
+    options = [(0, 1) if c == "x" else (int(c),) for c in pattern]
+    return [sum(bit << i for i, bit in enumerate(bits)) for bits in itertools.product(*options)]
+
+
+def _parse_action(do):
+    if isinstance(do, str):
+        op, arg = do, None
+    elif isinstance(do, (list, tuple)) and len(do) == 2:
+        op, arg = do
+    else:
+        raise ValueError(f"action {do!r} must be a name or [name, value]")
+    if op not in ACTIONS:
+        raise ValueError(f"unknown action {op!r} (known: {', '.join(sorted(ACTIONS))})")
+    return (op, arg)
+
+
+class RuleSet:
+    """Gesture vocabulary and action mapping compiled into lookup tables.
+
+    ``finger_lut`` maps the 5-bit finger mask (bit 0 = thumb) to a gesture
+    code, and ``dispatch`` maps ``(left_code, right_code, mode)`` to a tuple of
+    ``(action, value)`` pairs, so both classification and dispatch are a single
+    lookup. Dynamic gestures (swipes, circles) map through ``motion_dispatch``
+    keyed by ``(hand, motion, mode)``; a motion rule applies in the modes it
+    lists (all modes when it lists none), so it can stay out of modes where
+    the same movement drives a slider. ``performer_roles`` limits which actions each
+    performer may trigger (None = all). The file is re-read when its mtime
+    changes. A file that cannot be loaded never raises: the built-in
+    defaults (or the previous tables, on reload) stay in use and the error is
+    stored in ``last_error``.
+    """
+
+    def __init__(self, path=None, check_interval=1.0):
+        self.path = path or default_rules_path()
+        self.check_interval = check_interval
+        self.last_error = None
+        self._mtime = None
+        self._last_check = 0.0
+        try:
+            self._compile(self._read())
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._compile(DEFAULT_CONFIG)
+            self.last_error = f"{self.path}: {e} (using the built-in rules)"
+
+    def _read(self):
+        try:
+            self._mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._mtime = None
+            return DEFAULT_CONFIG
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _compile(self, config):
+        names = list(RESERVED_NAMES)
+        lut = [OTHER] * 32
+        for entry in config.get("gestures", []):
+            name = entry["name"]
+            if name in names:
+                raise ValueError(f"gesture {name!r} defined twice")
+            code = len(names)
+            names.append(name)
+
+            masks = []
+            fingers = entry.get("fingers", [])
+            for pattern in [fingers] if isinstance(fingers, str) else fingers:
+                masks.extend(_pattern_masks(pattern))
+            if "count" in entry:
+                masks.extend(m for m in range(32) if bin(m).count("1") == entry["count"])
+
+            # Earlier entries win, so specific patterns can be listed before counts.
+            for mask in masks:
+                if lut[mask] == OTHER:
+                    lut[mask] = code
+
+        codes = {name: code for code, name in enumerate(names)}
+
+        def hand_codes(rule, key):
+            wanted = rule.get(key)
+            if wanted is None or wanted == "*":
+                return range(len(names))
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            missing = [w for w in wanted if w not in codes]
+            if missing:
+                raise ValueError(f"unknown gesture(s) {missing} in rule {rule}")
+            return [codes[w] for w in wanted]
+
+        dispatch = {}
+        modes = []
+        for mode, rules in config.get("actions", {}).items():
+            modes.append(mode)
+            for rule in rules:
+                action = _parse_action(rule["do"])
+                for left in hand_codes(rule, "left"):
+                    for right in hand_codes(rule, "right"):
+                        key = (left, right, mode)
+                        dispatch[key] = dispatch.get(key, ()) + (action,)
+
+        motion_dispatch = {}
+        for rule in config.get("motions", []):
+            action = _parse_action(rule["do"])
+            hands = HANDS if rule.get("hand", "*") == "*" else [rule["hand"]]
+            rule_modes = rule.get("modes", "*")
+            rule_modes = modes if rule_modes == "*" else [rule_modes] if isinstance(rule_modes, str) else rule_modes
+            unknown = [m for m in rule_modes if m not in modes]
+            if unknown:
+                raise ValueError(f"unknown mode(s) {unknown} in rule {rule}")
+            for hand in hands:
+                if hand not in HANDS:
+                    raise ValueError(f"hand {hand!r} must be one of {HANDS} in rule {rule}")
+                for mode in rule_modes:
+                    key = (hand, rule["motion"], mode)
+                    motion_dispatch[key] = motion_dispatch.get(key, ()) + (action,)
+
+        performer_roles = {}
+        for performer, allowed in config.get("performers", {"0": "*"}).items():
+            if allowed == "*":
+                performer_roles[int(performer)] = None
+                continue
+            allowed = [allowed] if isinstance(allowed, str) else allowed
+            unknown = [op for op in allowed if op not in ACTIONS]
+            if unknown:
+                raise ValueError(f"unknown action(s) {unknown} for performer {performer}")
+            performer_roles[int(performer)] = frozenset(allowed)
+
+        self.names = names
+        self.codes = codes
+        self.finger_lut = lut
+        self.dispatch = dispatch
+        self.motion_dispatch = motion_dispatch
+        self.performer_roles = performer_roles
+        self.modes = modes
+
+    def maybe_reload(self, now=None):
+        """Recompiles the tables if the file changed; returns True on reload.
+
+        A broken file keeps the previous tables and stores the error in
+        ``last_error``.
+        """
+        now = time.time() if now is None else now
+        if (now - self._last_check) < self.check_interval:
+            return False
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        try:
+            self._compile(self._read())
+            self.last_error = None
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._mtime = mtime
+            self.last_error = f"{self.path}: {e} (keeping the previous rules)"
+            return False
+
+    def classify(self, fingers_up):
+        """Returns the gesture name for a list of 5 finger flags (thumb first)."""
+        mask = 0
+        for i, up in enumerate(fingers_up):
+            if up:
+                mask |= 1 << i
+        return self.names[self.finger_lut[mask]]
+
+    def code_for(self, name):
+        return self.codes.get(name, NO_HAND if name is None else OTHER)
+
+    def actions_for(self, left_name, right_name, mode):
+        return self.dispatch.get((self.code_for(left_name), self.code_for(right_name), mode), ())
+
+    def motion_actions_for(self, hand, motion, mode):
+        return self.motion_dispatch.get((hand, motion, mode), ())
+
+    def allows(self, performer, op):
+        """True if ``performer`` may trigger action ``op``; unlisted performers may not."""
+        allowed = self.performer_roles.get(performer, ())
+        return allowed is None or op in allowed
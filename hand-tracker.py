@@ -1,48 +1,90 @@
 import cv2
 import mediapipe as mp
+import numpy as np
+import os
 import sys
 import time
-from google.protobuf.json_format import MessageToDict
+import argparse
+import threading
+from gesture_rules import RuleSet, default_rules_path
+from dynamic_gestures import DynamicGestureRecognizer
+from conducting import TempoEstimator
+from profiling import Profiler, profile_arg, parse_env_spec
+from hand_identity import HandIdentityTracker
+from flight_recorder import FlightRecorder, clip_text
+from event_log import get_log, LEVELS, LOG_LEVEL_ENV
+from pipeline import Pipeline, Stage, StopPipeline, BufferPool, parse_placement, QUEUE_SIZE
 
 # MediaPipe setup
-mpDrawing = mp.solutions.drawing_utils
-mpDrawingStyles = mp.solutions.drawing_styles
 mpHands = mp.solutions.hands
+HAND_CONNECTIONS = sorted(mpHands.HAND_CONNECTIONS)
+LANDMARK_COLOR = (245, 117, 66)
+CONNECTION_COLOR = (245, 66, 230)
 
-# Initialize hand detector
-hands = mpHands.Hands(
-    static_image_mode=False,
-    model_complexity=1,
-    min_detection_confidence=0.75,
-    min_tracking_confidence=0.75,
-    max_num_hands=2
-)
+# Structured event log (stdout carries gesture lines, so nothing else is printed there)
+log = get_log('tracker')
 
-# Landmark IDs for fingertips
+# Hand detector defaults
+MAX_HANDS = 2                  # Two hands per performer; raise for several performers
+BACKENDS = ('legacy', 'tasks') # mp.solutions.hands, or the Tasks HandLandmarker in live-stream mode
+MODEL_ENV = 'MAESTRO_HAND_MODEL'
+MODEL_URL = ('https://storage.googleapis.com/mediapipe-models/hand_landmarker/'
+             'hand_landmarker/float16/latest/hand_landmarker.task')
+
+# Landmark IDs for the wrist, middle-finger knuckle and fingertips
+WRIST = 0
+MIDDLE_MCP = 9
 TIP_IDS = [4, 8, 12, 16, 20]
 
-# Gesture tracking state
-prev_hand_data = {}
+# Gesture tracking
 GESTURE_COOLDOWN = 0.5  # Seconds before gesture can change
-last_output_line = ""
-
-# Gesture classification lookup
-GESTURE_PATTERNS = {
-    5: "Open Hand",
-    0: "Closed Fist",
-    1: "One Finger",
-    2: "Two Fingers",
-    3: "Three Fingers",
-    4: "Four Fingers"
-}
-
-def count_fingers(hand_landmarks, label):
-    """Counts extended fingers on a hand."""
+CONFIRM_FRAMES = 1      # Frames a new gesture must be seen in a row before it is reported
+CONFIDENCE_MARGIN = 0.15  # Finger margin (in palm lengths) that counts as fully clear
+
+# Emission policy defaults (pixels / updates per second)
+EMIT_GRID = 4
+EMIT_MOVE_THRESHOLD = 8
+EMIT_MAX_RATE = 30.0
+EMIT_TEMPO_STEP = 2            # BPM change that triggers a tempo update
+
+# Liveness heartbeat sent even when no hands are visible
+HEARTBEAT_INTERVAL_MS = 150
+
+# Landmark lines for an embedded preview (instead of the OpenCV window)
+LANDMARK_FPS = 15.0
+
+# Where the selfie mirror is applied: to the pixels before inference, or to the landmarks after it
+MIRROR_MODES = ('pixels', 'landmarks')
+SWAPPED_LABELS = {'Left': 'Right', 'Right': 'Left'}
+
+# Motion gate defaults
+MOTION_SIZE = (64, 48)         # Downsampled frame size used for differencing
+MOTION_PIXEL_DELTA = 20        # Grayscale change that counts a pixel as "moved"
+MOTION_THRESHOLD = 0.004       # Fraction of moved pixels that counts as motion
+MIN_INFERENCE_RATE = 2.0       # Full inferences per second even when static
+
+# Camera selection, capture mode and recovery
+CAMERA_PROBE_COUNT = 4         # Device indexes probed when no --camera is given
+CAMERA_SIZE = (640, 480)       # Requested capture size; hand detection gains nothing from more
+CAMERA_FPS = 60                # Requested rate; cameras that cannot fall back to 30
+CAMERA_TEST_READS = 5          # Reads a newly opened camera gets to deliver its first frame
+CAMERA_MAX_READ_FAILURES = 5   # Failed reads in a row before the camera counts as lost
+CAMERA_BACKOFF_MIN = 0.5       # Seconds before a reconnect attempt, doubling up to the max
+CAMERA_BACKOFF_MAX = 8.0
+CAMERA_STABLE_AFTER = 10.0     # Seconds of frames before the backoff resets
+CAMERA_IDLE_WAIT = 0.05        # Seconds the source blocks per item while there is no camera
+CAMERA_CLOSE_TIMEOUT = 2.0     # Seconds to wait for a pending connection attempt on exit
+
+# Replayed flight recorder dumps have no frame size; use the usual webcam one
+REPLAY_SIZE = CAMERA_SIZE
+
+def count_fingers(landmarks, label):
+    """Counts extended fingers on a hand ((21, 3) normalized landmarks)."""
     fingers_up = []
     
     # Thumb detection (lateral movement)
-    thumb_tip_x = hand_landmarks.landmark[TIP_IDS[0]].x
-    thumb_ip_x = hand_landmarks.landmark[TIP_IDS[0] - 1].x
+    thumb_tip_x = landmarks[TIP_IDS[0], 0]
+    thumb_ip_x = landmarks[TIP_IDS[0] - 1, 0]
     
     if label == 'Right':
         fingers_up.append(1 if thumb_tip_x < thumb_ip_x else 0)
@@ -51,40 +93,159 @@ def count_fingers(hand_landmarks, label):
     
     # Other fingers (vertical extension)
     for tip_id in TIP_IDS[1:]:
-        tip_y = hand_landmarks.landmark[tip_id].y
-        pip_y = hand_landmarks.landmark[tip_id - 2].y
+        tip_y = landmarks[tip_id, 1]
+        pip_y = landmarks[tip_id - 2, 1]
         fingers_up.append(1 if tip_y < pip_y else 0)
     
     return fingers_up
 
-def classify_gesture(fingers_up):
-    """Classifies gesture based on extended fingers."""
-    total = sum(fingers_up)
-    
-    # Check for specific patterns first
-    if total == 1 and (fingers_up[1] == 1 or fingers_up[0] == 1):
-        return "One Finger"
-    elif total == 2 and fingers_up[1] == 1 and fingers_up[2] == 1:
-        return "Two Fingers"
-    elif total == 3 and fingers_up[1] == 1 and fingers_up[2] == 1 and fingers_up[3] == 1:
-        return "Three Fingers"
-    elif total == 4 and all(fingers_up[1:]):
-        return "Four Fingers"
-    
-    return GESTURE_PATTERNS.get(total, "Other")
+def gesture_confidence(landmarks, label):
+    """How clearly every finger is up or down, from 0 to 1; the least clear finger decides.
+
+    Margins are measured in palm lengths (wrist to middle-finger knuckle), so
+    the value does not depend on the distance to the camera.
+    """
+    palm = float(np.hypot(*(landmarks[MIDDLE_MCP, :2] - landmarks[WRIST, :2]))) or 1e-6
+    thumb = abs(float(landmarks[TIP_IDS[0], 0] - landmarks[TIP_IDS[0] - 1, 0]))
+    others = np.abs(landmarks[TIP_IDS[1:], 1] - landmarks[[tip - 2 for tip in TIP_IDS[1:]], 1])
+    return min(1.0, min(thumb, float(others.min())) / palm / CONFIDENCE_MARGIN)
 
-def get_wrist_position(hand_landmarks, width, height):
+def get_wrist_position(landmarks, width, height):
     """Returns wrist position in pixel coordinates."""
-    wrist = hand_landmarks.landmark[mpHands.HandLandmark.WRIST]
-    return int(wrist.x * width), int(wrist.y * height)
+    return int(landmarks[WRIST, 0] * width), int(landmarks[WRIST, 1] * height)
+
+def create_hand_detector(max_hands=MAX_HANDS):
+    """Initializes the MediaPipe hand detector."""
+    return mpHands.Hands(
+        static_image_mode=False,
+        model_complexity=1,
+        min_detection_confidence=0.75,
+        min_tracking_confidence=0.75,
+        max_num_hands=max_hands
+    )
+
+def default_model_path():
+    return os.environ.get(MODEL_ENV) or os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), 'hand_landmarker.task')
+
+class LegacyHandDetector:
+    """The mp.solutions.hands graph; ``submit`` blocks for the whole inference."""
+
+    def __init__(self, max_hands=MAX_HANDS):
+        self.hands = create_hand_detector(max_hands)
+        self.result = None
+
+    def submit(self, rgb, frame_time):
+        landmarks, labels = landmarks_from_results(self.hands.process(rgb))
+        self.result = (landmarks, labels, frame_time, time.time())
+
+    def latest(self):
+        """Returns (landmarks, labels, frame time, result time) of the newest result, or None."""
+        return self.result
 
-def should_update_gesture(label, new_gesture, current_time):
+    def close(self):
+        self.hands.close()
+
+class TaskHandDetector:
+    """The MediaPipe Tasks HandLandmarker in live-stream mode.
+
+    ``submit`` only hands the frame over and returns; results arrive on a
+    MediaPipe thread through the callback. While the model is busy, the
+    runtime drops frames itself, so nothing queues up in front of it.
+    """
+
+    def __init__(self, model_path, max_hands=MAX_HANDS):
+        from mediapipe.tasks import python as mp_tasks
+        from mediapipe.tasks.python import vision
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"Hand landmarker model not found at {model_path} (download it from {MODEL_URL})")
+        options = vision.HandLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=max_hands,
+            min_hand_detection_confidence=0.75,
+            min_hand_presence_confidence=0.75,
+            min_tracking_confidence=0.75,
+            result_callback=self._on_result
+        )
+        self.frame_times = {}
+        self.lock = threading.Lock()
+        self.result = None
+        self.last_timestamp = -1
+        self.landmarker = vision.HandLandmarker.create_from_options(options)
+
+    def submit(self, rgb, frame_time):
+        # Timestamps must strictly increase
+        timestamp = max(int(frame_time * 1000), self.last_timestamp + 1)
+        self.last_timestamp = timestamp
+        with self.lock:
+            self.frame_times[timestamp] = frame_time
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+        self.landmarker.detect_async(image, timestamp)
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        done = time.time()
+        with self.lock:
+            frame_time = self.frame_times.pop(timestamp_ms, done)
+            # Frames the runtime skipped never come back; forget them
+            for stale in [t for t in self.frame_times if t < timestamp_ms]:
+                del self.frame_times[stale]
+        landmarks, labels = landmarks_from_task_result(result)
+        self.result = (landmarks, labels, frame_time, done)
+
+    def latest(self):
+        return self.result
+
+    def close(self):
+        self.landmarker.close()
+
+def reuse_buffer(buffer, shape, dtype=np.uint8):
+    """Returns ``buffer`` if it has the wanted shape, else a new one (only when the frame size changes)."""
+    if buffer is None or buffer.shape != shape:
+        return np.empty(shape, dtype=dtype)
+    return buffer
+
+def landmarks_from_results(results):
+    """Copies MediaPipe results into an (n, 21, 3) array and a list of handedness labels.
+
+    Plain arrays can be handed to a stage on another thread or in another process.
+    """
+    if not results.multi_hand_landmarks:
+        return np.zeros((0, 21, 3), dtype=np.float32), []
+    landmarks = np.array([[(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+                          for hand_landmarks in results.multi_hand_landmarks], dtype=np.float32)
+    labels = [handedness.classification[0].label for handedness in results.multi_handedness]
+    return landmarks, labels
+
+def landmarks_from_task_result(result):
+    """Like ``landmarks_from_results``, for a Tasks HandLandmarkerResult."""
+    if not result.hand_landmarks:
+        return np.zeros((0, 21, 3), dtype=np.float32), []
+    landmarks = np.array([[(lm.x, lm.y, lm.z) for lm in hand] for hand in result.hand_landmarks],
+                         dtype=np.float32)
+    labels = [handedness[0].category_name for handedness in result.handedness]
+    return landmarks, labels
+
+def mirror_landmarks(landmarks, labels):
+    """Mirrors landmark x and swaps handedness, as if the frame had been flipped before inference."""
+    landmarks[:, :, 0] = 1.0 - landmarks[:, :, 0]
+    return [SWAPPED_LABELS.get(label, label) for label in labels]
+
+def draw_hand(image, landmarks, width, height):
+    """Draws one hand's landmarks and connections onto a BGR image."""
+    points = (landmarks[:, :2] * (width, height)).astype(int).tolist()
+    for start, end in HAND_CONNECTIONS:
+        cv2.line(image, points[start], points[end], CONNECTION_COLOR, 2)
+    for point in points:
+        cv2.circle(image, point, 4, LANDMARK_COLOR, 2)
+
+def should_update_gesture(prev_hand_data, track_id, new_gesture, current_time):
     """Determines if gesture should update based on cooldown."""
-    if label not in prev_hand_data:
+    if track_id not in prev_hand_data:
         return True, new_gesture, current_time
     
-    last_gesture = prev_hand_data[label].get('last_display_gesture', 'No Hand')
-    last_change = prev_hand_data[label].get('last_change_time', 0)
+    last_gesture = prev_hand_data[track_id].get('last_display_gesture', 'No Hand')
+    last_change = prev_hand_data[track_id].get('last_change_time', 0)
     
     if (current_time - last_change) < GESTURE_COOLDOWN:
         return False, last_gesture, last_change
@@ -93,9 +254,120 @@ def should_update_gesture(label, new_gesture, current_time):
     
     return False, last_gesture, last_change
 
-def format_output(detected_hands):
-    """Formats hand data for output."""
-    output_parts = []
+class EmissionPolicy:
+    """Decides when a new line is worth sending to the controller.
+
+    Gesture changes are always sent immediately. Position-only changes are sent
+    when a wrist moved at least ``move_threshold`` pixels since the last emitted
+    line, and no more often than ``max_rate`` times per second.
+    """
+
+    def __init__(self, grid=EMIT_GRID, move_threshold=EMIT_MOVE_THRESHOLD, max_rate=EMIT_MAX_RATE):
+        self.grid = max(1, int(grid))
+        self.move_threshold = move_threshold
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.reset()
+
+    def reset(self):
+        self.last_gestures = None
+        self.last_positions = {}
+        self.last_tempos = {}
+        self.last_emit_time = 0.0
+
+    def quantize(self, value):
+        """Snaps a pixel coordinate to the configured grid."""
+        if self.grid == 1:
+            return value
+        return int(round(value / self.grid)) * self.grid
+
+    def should_emit(self, detected_hands, current_time):
+        gestures = tuple(
+            (data['gesture'], data.get('motion'), data.get('candidate')) if data else None
+            for data in detected_hands.values()
+        )
+        positions = {
+            label: (data['x'], data['y']) for label, data in detected_hands.items() if data
+        }
+        tempos = {
+            label: data.get('tempo') for label, data in detected_hands.items() if data
+        }
+
+        if gestures != self.last_gestures:
+            emit = True
+        elif (current_time - self.last_emit_time) < self.min_interval:
+            emit = False
+        else:
+            emit = False
+            for label, (x, y) in positions.items():
+                last_x, last_y = self.last_positions.get(label, (x, y))
+                if abs(x - last_x) >= self.move_threshold or abs(y - last_y) >= self.move_threshold:
+                    emit = True
+                    break
+            for label, tempo in tempos.items():
+                last_tempo = self.last_tempos.get(label)
+                if (tempo is None) != (last_tempo is None) or (
+                        tempo is not None and abs(tempo - last_tempo) >= EMIT_TEMPO_STEP):
+                    emit = True
+                    break
+
+        if emit:
+            self.last_gestures = gestures
+            self.last_positions = positions
+            self.last_tempos = tempos
+            self.last_emit_time = current_time
+        return emit
+
+class MotionGate:
+    """Cheap frame differencing in front of MediaPipe.
+
+    Each frame is downsampled to a tiny grayscale image (into buffers that are
+    allocated once) and compared with the frame of the last full inference.
+    If too few pixels changed, inference can be skipped and the previous
+    landmarks reused. A full inference still runs at least
+    ``min_inference_rate`` times per second.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, min_inference_rate=MIN_INFERENCE_RATE,
+                 size=MOTION_SIZE, pixel_delta=MOTION_PIXEL_DELTA):
+        self.threshold = threshold
+        self.min_interval = 1.0 / min_inference_rate if min_inference_rate > 0 else 0.0
+        self.size = size
+        self.pixel_delta = pixel_delta
+        width, height = size
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._ref = np.empty((height, width), dtype=np.uint8)
+        self._diff = np.empty((height, width), dtype=np.uint8)
+        self._has_ref = False
+        self.last_inference_time = 0.0
+        self.skipped = 0
+
+    def needs_inference(self, img, current_time):
+        """Returns False when the scene is static and the last result can be reused."""
+        cv2.resize(img, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        if self._has_ref and (current_time - self.last_inference_time) < self.min_interval:
+            cv2.absdiff(self._gray, self._ref, dst=self._diff)
+            cv2.threshold(self._diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self._diff)
+            changed = cv2.countNonZero(self._diff) / self._diff.size
+            if changed < self.threshold:
+                self.skipped += 1
+                return False
+
+        # The current frame becomes the new reference; swap instead of copying.
+        self._gray, self._ref = self._ref, self._gray
+        self._has_ref = True
+        self.last_inference_time = current_time
+        return True
+
+def format_output(detected_hands, performer=0):
+    """Formats hand data for output.
+
+    Lines for additional performers start with "P:<n>|"; the first performer's
+    lines keep the original format.
+    """
+    output_parts = [f"P:{performer}"] if performer else []
     
     left_data = detected_hands.get('Left')
     right_data = detected_hands.get('Right')
@@ -107,6 +379,11 @@ def format_output(detected_hands):
             f"L_X:{left_data['x']}",
             f"L_Y:{left_data['y']}"
         ])
+        if left_data.get('motion'):
+            output_parts.append(f"L_Motion:{left_data['motion']}")
+        if left_data.get('candidate'):
+            output_parts.append(f"L_Cand:{left_data['candidate']}")
+            output_parts.append(f"L_Conf:{left_data['confidence']:.2f}")
     else:
         output_parts.append("L_Gesture:No Hand")
     
@@ -117,98 +394,816 @@ def format_output(detected_hands):
             f"R_X:{right_data['x']}",
             f"R_Y:{right_data['y']}"
         ])
+        if right_data.get('motion'):
+            output_parts.append(f"R_Motion:{right_data['motion']}")
+        if right_data.get('candidate'):
+            output_parts.append(f"R_Cand:{right_data['candidate']}")
+            output_parts.append(f"R_Conf:{right_data['confidence']:.2f}")
+        if right_data.get('tempo') is not None:
+            output_parts.append(f"R_Tempo:{right_data['tempo']}")
     else:
         output_parts.append("R_Gesture:No Hand")
     
     return "|".join(output_parts)
 
-def main():
-    global prev_hand_data, last_output_line
-    
-    cap = cv2.VideoCapture(0)
-    
-    while True:
+def format_landmarks(drawn, width, height):
+    """Formats the drawn hands' landmarks (mirrored pixel coordinates) for a preview.
+
+    "Landmarks:<width>,<height>" followed by one "|<performer>,<side>,<gesture>:x0,y0,...,x20,y20"
+    part per hand; no parts means no hands.
+    """
+    parts = [f"Landmarks:{width},{height}"]
+    for landmarks, label, performer, data in drawn:
+        coords = ','.join(map(str, (landmarks[:, :2] * (width, height)).astype(int).ravel().tolist()))
+        parts.append(f"{performer},{label},{data['gesture']}:{coords}")
+    return '|'.join(parts)
+
+def fourcc_of(cap):
+    """The capture's pixel format as text (e.g. 'MJPG'), or '' if the backend does not say."""
+    code = int(cap.get(cv2.CAP_PROP_FOURCC))
+    return ''.join(chr((code >> 8 * i) & 0xFF) for i in range(4)).strip('\x00 ') if code > 0 else ''
+
+def capture_modes(size=CAMERA_SIZE, fps=CAMERA_FPS):
+    """Capture modes to try, lowest latency first: the highest rate, and MJPG before raw at each rate.
+
+    MJPG lets most USB webcams reach their full frame rate; raw formats are
+    often throttled at the same size because of USB bandwidth.
+    """
+    width, height = size
+    modes = []
+    for rate in (fps, 30):
+        for fourcc in ('MJPG', None):
+            mode = (fourcc, width, height, rate)
+            if mode not in modes:
+                modes.append(mode)
+    return modes
+
+def apply_mode(cap, mode):
+    """Requests a capture mode; returns (fourcc, width, height, fps) as reported back by the driver."""
+    fourcc, width, height, fps = mode
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    # Keep at most one frame queued in the driver, so every read is the newest
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return (fourcc_of(cap), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            cap.get(cv2.CAP_PROP_FPS))
+
+def negotiate_mode(cap, modes):
+    """Applies the first mode the driver accepts as requested, else the fastest one it offered.
+
+    A rate of 0 means the backend does not report one and is taken as met.
+    Returns the mode as reported by the driver.
+    """
+    best = None
+    for mode in modes:
+        got = apply_mode(cap, mode)
+        fourcc, width, height, fps = mode
+        size_ok = got[1:3] == (width, height)
+        if size_ok and (not fourcc or got[0] == fourcc) and (not got[3] or got[3] >= 0.9 * fps):
+            return got
+        if best is None or (size_ok, got[3]) > best[0]:
+            best = ((size_ok, got[3]), mode)
+    return apply_mode(cap, best[1])
+
+def open_camera(device, modes):
+    """Opens a camera, negotiates its mode and checks that it delivers frames.
+
+    Returns (cap, mode) with the driver's reported (fourcc, width, height,
+    fps), or (None, reason) when the device does not open or stays silent
+    (typically because another application holds it).
+    """
+    cap = cv2.VideoCapture(device)
+    if not cap.isOpened():
+        cap.release()
+        return None, 'does not open'
+    mode = negotiate_mode(cap, modes)
+    for _ in range(CAMERA_TEST_READS):
+        success, _ = cap.read()
+        if success:
+            return cap, mode
+    cap.release()
+    return None, 'delivers no frames (in use by another application?)'
+
+def format_mode(mode):
+    fourcc, width, height, fps = mode
+    return f"{width}x{height}@{fps:.0f}" + (f" {fourcc}" if fourcc else '')
+
+class CameraSource(Stage):
+    """Frames from a webcam, read into a pool of reused buffers.
+
+    The camera is opened on a background thread, first the last device that
+    worked and then every probed index, so a slow or missing camera never
+    blocks the pipeline. Until one delivers frames, and after
+    ``CAMERA_MAX_READ_FAILURES`` failed reads in a row, the source waits
+    with exponential backoff between attempts and yields tick items, which
+    keep the heartbeats going. Every item carries the camera status line;
+    EmitStage sends it whenever it changes.
+    """
+
+    name = 'source'
+
+    def __init__(self, device=None, size=CAMERA_SIZE, fps=CAMERA_FPS):
+        self.device = device
+        self.modes = capture_modes(size, fps)
+
+    def open(self, resources):
+        self.pool = BufferPool(resources['in_flight'])
+        self.shape = None
+        self.cap = None
+        self.failures = 0
+        self.backoff = CAMERA_BACKOFF_MIN
+        self.retry_at = 0.0
+        self.connected_at = 0.0
+        self.last_device = self.device
+        self.connector = None
+        self.connected = threading.Event()
+        self.result = None
+        self.status = 'Camera:connecting'
+
+    def devices(self):
+        if self.device is not None:
+            return [self.device]
+        probed = list(range(CAMERA_PROBE_COUNT))
+        if self.last_device in probed:
+            probed.remove(self.last_device)
+            probed.insert(0, self.last_device)
+        return probed
+
+    def _connect(self, devices):
+        reasons = []
+        for device in devices:
+            cap, mode = open_camera(device, self.modes)
+            if cap is not None:
+                self.result = (cap, device, mode)
+                break
+            reasons.append(f"{device} {mode}")
+        else:
+            self.result = (None, None, '; '.join(reasons))
+        self.connected.set()
+
+    def _set_status(self, status, level='info', message=None, **fields):
+        self.status = status
+        getattr(log, level)(message or status, **fields)
+
+    def _wait_for_camera(self):
+        now = time.monotonic()
+        if self.connector is None:
+            if now < self.retry_at:
+                time.sleep(min(CAMERA_IDLE_WAIT, self.retry_at - now))
+                return {'t': time.time(), 'tick': True, 'status': self.status}
+            self.connected.clear()
+            self.connector = threading.Thread(target=self._connect, args=(self.devices(),),
+                                              name='camera-connect', daemon=True)
+            self.connector.start()
+        if self.connected.wait(CAMERA_IDLE_WAIT):
+            self.connector = None
+            cap, device, detail = self.result
+            self.result = None
+            if cap is None:
+                self.retry_at = time.monotonic() + self.backoff
+                self._set_status(f"Camera:unavailable|Retry:{self.backoff:.1f}", 'error',
+                                 f"No camera delivers frames; retrying in {self.backoff:.1f}s", detail=detail)
+                self.backoff = min(CAMERA_BACKOFF_MAX, self.backoff * 2)
+            else:
+                self.cap, self.last_device = cap, device
+                self.failures = 0
+                self.shape = None
+                self.connected_at = time.monotonic()
+                self._set_status(f"Camera:ok|Device:{device}|Mode:{format_mode(detail)}", 'info',
+                                 "Camera connected", device=device, mode=format_mode(detail))
+        return {'t': time.time(), 'tick': True, 'status': self.status}
+
+    def _lost(self):
+        self.cap.release()
+        self.cap = None
+        self.retry_at = time.monotonic() + self.backoff
+        self._set_status(f"Camera:lost|Retry:{self.backoff:.1f}", 'error',
+                         f"Camera stopped delivering frames; reconnecting in {self.backoff:.1f}s",
+                         device=self.last_device)
+        self.backoff = min(CAMERA_BACKOFF_MAX, self.backoff * 2)
+
+    def read(self):
+        # Decode into a pooled buffer once the frame size is known
+        if self.shape is None:
+            return self.cap.read()
+        return self.cap.read(self.pool.get(self.shape))
+
+    def process(self, item):
+        if self.cap is None:
+            return self._wait_for_camera()
         current_time = time.time()
-        success, img = cap.read()
-        
+        success, frame = self.read()
+        if not success:
+            self.failures += 1
+            if self.failures >= CAMERA_MAX_READ_FAILURES:
+                self._lost()
+            else:
+                # A failing camera usually fails at once; do not spin on it
+                time.sleep(CAMERA_IDLE_WAIT)
+            return {'t': time.time(), 'tick': True, 'status': self.status}
+        self.failures = 0
+        if self.backoff > CAMERA_BACKOFF_MIN and time.monotonic() - self.connected_at > CAMERA_STABLE_AFTER:
+            self.backoff = CAMERA_BACKOFF_MIN
+        self.shape = frame.shape
+        return {'t': current_time, 'image': frame, 'status': self.status}
+
+    def close(self):
+        connector = self.connector
+        if connector is not None:
+            connector.join(timeout=CAMERA_CLOSE_TIMEOUT)
+            if self.result is not None and self.result[0] is not None:
+                self.result[0].release()
+        if self.cap is not None:
+            self.cap.release()
+
+class VideoFileSource(Stage):
+    """Frames from a video file, paced at its frame rate; the pipeline ends with the file."""
+
+    name = 'source'
+
+    def __init__(self, path, realtime=True):
+        self.path = path
+        self.realtime = realtime
+
+    def open(self, resources):
+        self.pool = BufferPool(resources['in_flight'])
+        self.shape = None
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video {self.path}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.interval = 1.0 / fps
+        self.next_time = None
+
+    def read(self):
+        if self.shape is None:
+            return self.cap.read()
+        return self.cap.read(self.pool.get(self.shape))
+
+    def process(self, item):
+        if self.realtime and self.next_time is not None:
+            delay = self.next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.next_time = time.monotonic() + self.interval
+        success, frame = self.read()
         if not success:
-            continue
+            raise StopPipeline
+        self.shape = frame.shape
+        return {'t': time.time(), 'image': frame}
+
+    def close(self):
+        self.cap.release()
+
+class ReplaySource(Stage):
+    """Detected hands from a flight recorder dump, replayed at the recorded pace (no camera or model)."""
+
+    name = 'source'
+
+    def __init__(self, path, realtime=True):
+        self.path = path
+        self.realtime = realtime
+
+    def open(self, resources):
+        with np.load(self.path) as dump:
+            self.times = dump['frames/t']
+            self.counts = dump['frames/n_hands']
+            self.landmarks = dump['frames/landmarks']
+            self.sides = dump['frames/sides']
+        self.index = 0
+        self.started = None
+
+    def process(self, item):
+        if self.index >= len(self.times):
+            raise StopPipeline
+        index = self.index
+        self.index += 1
+        if self.started is None:
+            self.started = time.monotonic()
+        if self.realtime:
+            delay = self.started + (self.times[index] - self.times[0]) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        n = int(self.counts[index])
+        # Dumps from before text columns were unicode hold bytes
+        labels = [side.decode() if isinstance(side, bytes) else str(side) for side in self.sides[index, :n]]
+        width, height = REPLAY_SIZE
+        return {'t': time.time(), 'image': None, 'width': width, 'height': height, 'mirrored': True,
+                'hands': (self.landmarks[index, :n].copy(), labels)}
+
+class PreprocessStage(Stage):
+    """Mirrors the frame for a selfie view (unless the landmarks are mirrored after detection)."""
+
+    name = 'preprocess'
+    droppable = True
+
+    def __init__(self, mirror_pixels=True):
+        self.mirror_pixels = mirror_pixels
+
+    def open(self, resources):
+        self.pool = BufferPool(resources['in_flight'])
+
+    def process(self, item):
+        frame = item.get('image')
+        if frame is None:
+            return item
+        item['height'], item['width'] = frame.shape[:2]
+        if self.mirror_pixels:
+            item['image'] = cv2.flip(frame, 1, dst=self.pool.get(frame.shape))
+        item['mirrored'] = self.mirror_pixels
+        return item
+
+class DetectStage(Stage):
+    """MediaPipe hand landmarks, reusing the last result while the scene is static.
+
+    Each item carries the newest finished result. With the asynchronous
+    backend that is usually the result of an earlier frame; ``latency``
+    (capture to landmarks, in seconds) is set on items that bring a new one.
+    """
+
+    name = 'detect'
+    droppable = True
+
+    def __init__(self, max_hands=MAX_HANDS, mirror_pixels=True, motion_gate=True,
+                 motion_threshold=MOTION_THRESHOLD, min_inference_rate=MIN_INFERENCE_RATE,
+                 backend='legacy', model_path=None, report_interval=0.0):
+        self.max_hands = max_hands
+        self.mirror_pixels = mirror_pixels
+        self.motion_gate = motion_gate
+        self.motion_threshold = motion_threshold
+        self.min_inference_rate = min_inference_rate
+        self.backend = backend
+        self.model_path = model_path or default_model_path()
+        self.report_interval = report_interval
+
+    def open(self, resources):
+        if self.backend == 'tasks':
+            self.detector = TaskHandDetector(self.model_path, self.max_hands)
+        else:
+            self.detector = LegacyHandDetector(self.max_hands)
+        self.gate = MotionGate(self.motion_threshold, self.min_inference_rate) if self.motion_gate else None
+        self.rgb = None
+        self.last_result = None
+        self.last_hands = None
+        self.reset_counters(time.monotonic())
+
+    def reset_counters(self, now):
+        self.report_start = now
+        self.submitted = 0
+        self.results = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def process(self, item):
+        if item.get('tick') or 'hands' in item:
+            return item
+        img = item['image']
+        if self.last_result is None or self.gate is None or self.gate.needs_inference(img, item['t']):
+            self.rgb = reuse_buffer(self.rgb, img.shape)
+            cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=self.rgb)
+            self.detector.submit(self.rgb, item['t'])
+            self.submitted += 1
         
-        # Flip and convert image
-        img = cv2.flip(img, 1)
-        height, width, _ = img.shape
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        result = self.detector.latest()
+        if result is not None and result is not self.last_result:
+            self.last_result = result
+            landmarks, labels, frame_time, done = result
+            if not self.mirror_pixels:
+                labels = mirror_landmarks(landmarks, labels)
+            self.last_hands = (landmarks, labels)
+            latency = done - frame_time
+            item['latency'] = latency
+            self.results += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+        item['hands'] = self.last_hands or (np.zeros((0, 21, 3), dtype=np.float32), [])
+        
+        if self.report_interval > 0 and time.monotonic() - self.report_start >= self.report_interval:
+            self.report()
+        return item
+
+    def report(self):
+        now = time.monotonic()
+        elapsed = max(now - self.report_start, 1e-6)
+        if self.submitted:
+            log.info("Detection", backend=self.backend, fps=round(self.results / elapsed, 1),
+                     latency_ms=round(self.latency_total / max(self.results, 1) * 1000.0, 1),
+                     max_latency_ms=round(self.latency_max * 1000.0, 1), submitted=self.submitted,
+                     skipped=max(self.submitted - self.results, 0))
+        self.reset_counters(now)
+
+    def close(self):
+        self.report()
+        self.detector.close()
+
+class ClassifyStage(Stage):
+    """Track identities, static gestures, motion gestures and tempo for every hand."""
+
+    name = 'classify'
+
+    def __init__(self, gestures_path, dynamic=True, tempo=True, max_hands=MAX_HANDS):
+        self.gestures_path = gestures_path
+        self.dynamic = dynamic
+        self.tempo = tempo
+        self.max_hands = max_hands
+
+    def open(self, resources):
+        self.rules = RuleSet(self.gestures_path)
+        self.identities = HandIdentityTracker(max_hands=self.max_hands)
+        self.recognizer = DynamicGestureRecognizer() if self.dynamic else None
+        self.tempo_estimators = {} if self.tempo else None
+        self.last_track_ids = set()
+
+    def process(self, item):
+        current_time = item['t']
+        if self.rules.maybe_reload(current_time):
+            log.info(f"Reloaded gesture rules from {self.rules.path}")
+        elif self.rules.last_error:
+            log.error(f"Could not load gesture rules: {self.rules.last_error}")
+            self.rules.last_error = None
+        if item.get('tick'):
+            return item
         
-        # Process hands
-        results = hands.process(img_rgb)
+        landmarks, labels = item['hands']
+        wrists = [get_wrist_position(hand, item['width'], item['height']) for hand in landmarks]
         
-        current_frame_data = {}
-        detected_hands = {'Left': None, 'Right': None}
+        # Stable track IDs and performers; 'side' is the smoothed handedness
+        tracks = self.identities.update(wrists, labels, item['width'])
         
-        if results.multi_hand_landmarks:
-            for hand_index, hand_landmarks in enumerate(results.multi_hand_landmarks):
-                # Get hand label
-                hand_info = results.multi_handedness[hand_index]
-                label = MessageToDict(hand_info)['classification'][0]['label']
-                
-                # Draw landmarks
-                mpDrawing.draw_landmarks(
-                    img, hand_landmarks, mpHands.HAND_CONNECTIONS,
-                    mpDrawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=4),
-                    mpDrawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
-                )
-                
-                # Count fingers and classify gesture
-                fingers_up = count_fingers(hand_landmarks, label)
-                gesture_str = classify_gesture(fingers_up)
-                
-                # Get wrist position
-                cx, cy = get_wrist_position(hand_landmarks, width, height)
-                
-                # Apply cooldown logic
-                should_update, display_gesture, last_change = should_update_gesture(
-                    label, gesture_str, current_time
-                )
-                
-                # Store detected hand data
-                detected_hands[label] = {'gesture': display_gesture, 'x': cx, 'y': cy}
-                current_frame_data[label] = {
-                    'last_display_gesture': display_gesture,
-                    'last_change_time': last_change
-                }
-                
-                # Draw text on image
-                cv2.putText(
-                    img, f"{label}: {display_gesture}",
-                    (cx - 70, cy - 30),
-                    cv2.FONT_HERSHEY_DUPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA
-                )
+        found = []
+        for hand, (cx, cy), track in zip(landmarks, wrists, tracks):
+            # Count fingers and classify gesture
+            fingers_up = count_fingers(hand, track.side)
+            gesture_str = self.rules.classify(fingers_up)
+            
+            # Feed the motion recognizer and tempo estimator with unquantized positions
+            motion = self.recognizer.update(track.track_id, cx, cy, current_time) if self.recognizer else None
+            tempo = None
+            if self.tempo_estimators is not None and track.side == 'Right':
+                estimator = self.tempo_estimators.get(track.track_id)
+                if estimator is None:
+                    estimator = self.tempo_estimators[track.track_id] = TempoEstimator()
+                estimator.update(current_time, cy)
+                estimate = estimator.estimate()
+                if estimate:
+                    tempo = int(round(estimate[0]))
+            found.append({'landmarks': hand, 'track_id': track.track_id, 'performer': track.performer,
+                          'side': track.side, 'gesture': gesture_str, 'x': cx, 'y': cy,
+                          'motion': motion, 'tempo': tempo,
+                          'confidence': gesture_confidence(hand, track.side)})
         
-        # Update tracking data
-        prev_hand_data = current_frame_data
+        # Forget hands that left
+        track_ids = {hand['track_id'] for hand in found}
+        if self.recognizer:
+            for track_id in self.last_track_ids - track_ids:
+                self.recognizer.forget(track_id)
+        if self.tempo_estimators:
+            live = {track.track_id for track in self.identities.tracks}
+            for track_id in [t for t in self.tempo_estimators if t not in live]:
+                del self.tempo_estimators[track_id]
+        self.last_track_ids = track_ids
+        item['found'] = found
+        return item
+
+class FilterStage(Stage):
+    """Debounces gestures, quantizes positions and decides which lines are worth sending.
+
+    With ``candidates``, a gesture that is seen but not reported yet (held by
+    the cooldown or by ``confirm_frames``) is sent as a candidate with its
+    confidence, so the controller can start a reversible action early.
+    """
+
+    name = 'filter'
+
+    def __init__(self, grid=EMIT_GRID, move_threshold=EMIT_MOVE_THRESHOLD, max_rate=EMIT_MAX_RATE,
+                 max_hands=MAX_HANDS, confirm_frames=CONFIRM_FRAMES, candidates=False):
+        self.grid = grid
+        self.move_threshold = move_threshold
+        self.max_rate = max_rate
+        self.max_hands = max_hands
+        self.confirm_frames = max(1, confirm_frames)
+        self.candidates = candidates
+
+    def open(self, resources):
+        self.prev_hand_data = {}
+        self.quantizer = EmissionPolicy(self.grid)
+        self.policies = {}
+        self.last_output_line = ""
+        # Only recorded when this stage runs in the main process
+        recorder = resources.get('recorder')
+        self.frames = recorder.rings.get('frames') if recorder else None
+
+    def process(self, item):
+        if item.get('tick'):
+            return item
+        current_time = item['t']
+        current_frame_data = {}
+        performers = {}
+        drawn = []
+        slot = self.frames.claim(current_time) if self.frames is not None else None
         
-        # Format and output
-        has_any_hand = detected_hands['Left'] or detected_hands['Right']
+        for hand in item['found']:
+            track_id, label, performer = hand['track_id'], hand['side'], hand['performer']
+            cx, cy = self.quantizer.quantize(hand['x']), self.quantizer.quantize(hand['y'])
+            
+            # Apply cooldown logic, then require the new gesture for a few frames in a row
+            raw_gesture = hand['gesture']
+            prev = self.prev_hand_data.get(track_id)
+            streak = prev['streak'] + 1 if prev and prev['raw_gesture'] == raw_gesture else 1
+            should_update, display_gesture, last_change = should_update_gesture(
+                self.prev_hand_data, track_id, raw_gesture, current_time
+            )
+            if should_update and prev and streak < self.confirm_frames:
+                display_gesture, last_change = prev['last_display_gesture'], prev['last_change_time']
+            
+            # Store detected hand data
+            hand_data = {
+                'gesture': display_gesture, 'x': cx, 'y': cy, 'motion': hand['motion'], 'tempo': hand['tempo']
+            }
+            if self.candidates and raw_gesture != display_gesture:
+                hand_data['candidate'] = raw_gesture
+                hand_data['confidence'] = hand['confidence']
+            performers.setdefault(performer, {'Left': None, 'Right': None})[label] = hand_data
+            current_frame_data[track_id] = {
+                'last_display_gesture': display_gesture,
+                'last_change_time': last_change,
+                'raw_gesture': raw_gesture,
+                'streak': streak
+            }
+            index = len(drawn)
+            if slot is not None and index < self.max_hands:
+                self.frames.columns['landmarks'][slot, index] = hand['landmarks']
+                self.frames.columns['track_ids'][slot, index] = track_id
+                self.frames.columns['performers'][slot, index] = performer
+                self.frames.columns['sides'][slot, index] = label
+                gestures = self.frames.columns['gestures']
+                gestures[slot, index] = clip_text(display_gesture, gestures.dtype)
+            drawn.append((hand['landmarks'], label, performer, hand_data))
+        if slot is not None:
+            self.frames.columns['n_hands'][slot] = min(len(drawn), self.max_hands)
+        self.prev_hand_data = current_frame_data
         
-        if has_any_hand:
-            output_line = format_output(detected_hands)
-            if output_line != last_output_line:
-                sys.stdout.write(output_line + '\n')
-                sys.stdout.flush()
-                last_output_line = output_line
+        # One line per performer that changed enough
+        lines = []
+        if performers:
+            for performer, detected_hands in sorted(performers.items()):
+                policy = self.policies.get(performer)
+                if policy is None:
+                    policy = self.policies[performer] = EmissionPolicy(
+                        self.grid, self.move_threshold, self.max_rate)
+                if policy.should_emit(detected_hands, current_time):
+                    lines.append(format_output(detected_hands, performer))
+                    self.last_output_line = lines[-1]
+            for performer in [p for p in self.policies if p not in performers]:
+                # Tell the controller this performer left, so its state resets
+                del self.policies[performer]
+                lines.append(format_output({'Left': None, 'Right': None}, performer))
         else:
-            if "No hands detected." not in last_output_line and last_output_line:
-                sys.stdout.write("No hands detected.\n")
-                sys.stdout.flush()
-                last_output_line = "No hands detected."
-        
-        # Display window
-        cv2.imshow('Hand Gesture Recognition', img)
+            self.policies.clear()
+            if "No hands detected." not in self.last_output_line and self.last_output_line:
+                lines.append("No hands detected.")
+                self.last_output_line = "No hands detected."
+        item['drawn'] = drawn
+        item['lines'] = lines
+        return item
+
+class EmitStage(Stage):
+    """Writes gesture, heartbeat, camera status and landmark lines to stdout for the controller."""
+
+    name = 'emit'
+
+    def __init__(self, heartbeat_ms=HEARTBEAT_INTERVAL_MS, landmarks=False, landmark_fps=LANDMARK_FPS):
+        self.heartbeat_interval = heartbeat_ms / 1000.0
+        self.landmarks = landmarks
+        self.landmark_interval = 1.0 / landmark_fps if landmark_fps > 0 else 0.0
+
+    def open(self, resources):
+        self.recorder = resources.get('recorder')
+        self.heartbeat_seq = 0
+        self.last_heartbeat = 0.0
+        self.frames_since_heartbeat = 0
+        self.latencies = []
+        self.last_landmarks_time = 0.0
+        self.landmarks_shown = False
+        self.last_status = None
+
+    def process(self, item):
+        current_time = item['t']
+        out = []
+        status = item.get('status')
+        if status and status != self.last_status:
+            # Every item carries the status, so a change survives dropped frames
+            out.append(status)
+            self.last_status = status
+        if self.heartbeat_interval > 0 and (current_time - self.last_heartbeat) >= self.heartbeat_interval:
+            # Sent after all the stages before, so a hung camera or model stops it
+            elapsed = current_time - self.last_heartbeat if self.last_heartbeat else self.heartbeat_interval
+            fps = self.frames_since_heartbeat / elapsed
+            heartbeat = f"Heartbeat:{self.heartbeat_seq}|FPS:{fps:.1f}"
+            if self.latencies:
+                heartbeat += f"|Latency:{sum(self.latencies) / len(self.latencies) * 1000.0:.0f}"
+                self.latencies.clear()
+            out.append(heartbeat)
+            self.heartbeat_seq += 1
+            self.last_heartbeat = current_time
+            self.frames_since_heartbeat = 0
+        if not item.get('tick'):
+            self.frames_since_heartbeat += 1
+            if 'latency' in item and self.heartbeat_interval > 0:
+                self.latencies.append(item['latency'])
+            for line in item['lines']:
+                out.append(line)
+                if self.recorder is not None:
+                    self.recorder.record('lines', current_time, line=line)
+            drawn = item['drawn']
+            if self.landmarks and (drawn or self.landmarks_shown) and \
+                    (current_time - self.last_landmarks_time) >= self.landmark_interval:
+                out.append(format_landmarks(drawn, item['width'], item['height']))
+                self.last_landmarks_time = current_time
+                self.landmarks_shown = bool(drawn)
+        if out:
+            sys.stdout.write('\n'.join(out) + '\n')
+            sys.stdout.flush()
+        return item
+
+class RenderStage(Stage):
+    """Draws landmarks and labels into the OpenCV window; 'q' quits."""
+
+    name = 'render'
+    droppable = True
+
+    def open(self, resources):
+        self.preview = None
+
+    def process(self, item):
+        if item.get('tick'):
+            return None
+        image = item.get('image')
+        width, height = item['width'], item['height']
+        if image is None:
+            # Replayed hands have no pixels; draw them on black
+            self.preview = reuse_buffer(self.preview, (height, width, 3))
+            self.preview.fill(0)
+            preview = self.preview
+        elif item['mirrored']:
+            preview = image
+        else:
+            self.preview = reuse_buffer(self.preview, image.shape)
+            preview = cv2.flip(image, 1, dst=self.preview)
+        for landmarks, label, performer, data in item['drawn']:
+            draw_hand(preview, landmarks, width, height)
+            name = f"P{performer} {label}" if performer else label
+            cv2.putText(
+                preview, f"{name}: {data['gesture']}",
+                (data['x'] - 70, data['y'] - 30),
+                cv2.FONT_HERSHEY_DUPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA
+            )
+        cv2.imshow('Hand Gesture Recognition', preview)
         if cv2.waitKey(1) & 0xff == ord('q'):
-            break
+            raise StopPipeline
+        return None
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+def build_stages(args):
+    """Source, preprocess, detect, classify, filter, emit and (unless --no-window) render."""
+    if args.video:
+        source = VideoFileSource(args.video)
+    elif args.replay:
+        source = ReplaySource(args.replay)
+    else:
+        source = CameraSource(args.camera, args.camera_size, args.camera_fps)
+    mirror_pixels = args.mirror == 'pixels'
+    stages = [
+        source,
+        PreprocessStage(mirror_pixels),
+        DetectStage(args.max_hands, mirror_pixels, not args.no_motion_gate, args.motion_threshold,
+                    args.min_inference_rate, args.backend, args.model, args.stage_stats),
+        ClassifyStage(args.gestures, not args.no_dynamic, not args.no_tempo, args.max_hands),
+        FilterStage(args.grid, args.move_threshold, args.max_rate, args.max_hands, args.confirm_frames,
+                    args.candidates),
+        EmitStage(args.heartbeat_ms, args.landmarks, args.landmark_fps),
+    ]
+    if not args.no_window:
+        stages.append(RenderStage())
+    return stages
+
+def log_stage_stats(pipeline):
+    for name, stats in pipeline.stats().items():
+        log.info("Stage timing", stage=name, **stats)
+
+def parse_size(text):
+    """Parses "640x480" into (640, 480)."""
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return width, height
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='MaestroBOT hand tracker')
+    parser.add_argument('--grid', type=int, default=EMIT_GRID,
+                        help='quantize wrist positions to this many pixels')
+    parser.add_argument('--move-threshold', type=int, default=EMIT_MOVE_THRESHOLD,
+                        help='minimum wrist movement (pixels) before a position update is sent')
+    parser.add_argument('--max-rate', type=float, default=EMIT_MAX_RATE,
+                        help='maximum position updates per second (gesture changes are never delayed)')
+    parser.add_argument('--gestures', default=default_rules_path(),
+                        help='gesture vocabulary/action config (reloaded when it changes)')
+    parser.add_argument('--max-hands', type=int, default=MAX_HANDS,
+                        help='hands to detect; every two nearby hands form one performer')
+    parser.add_argument('--backend', choices=BACKENDS, default='legacy',
+                        help='legacy: blocking mp.solutions.hands; tasks: asynchronous HandLandmarker (needs --model)')
+    parser.add_argument('--model', default=None,
+                        help='HandLandmarker .task file for --backend tasks (default: hand_landmarker.task '
+                             'next to the script, or $MAESTRO_HAND_MODEL)')
+    parser.add_argument('--mirror', choices=MIRROR_MODES, default='pixels',
+                        help='flip each frame before inference, or mirror only the landmarks (cheaper)')
+    parser.add_argument('--confirm-frames', type=int, default=CONFIRM_FRAMES,
+                        help='frames in a row a new gesture must be seen before it is reported')
+    parser.add_argument('--candidates', action='store_true',
+                        help='also send not yet confirmed gestures with a confidence (speculative control)')
+    parser.add_argument('--no-dynamic', action='store_true',
+                        help='disable swipe/circle/beat recognition')
+    parser.add_argument('--no-tempo', action='store_true',
+                        help='disable beat tempo estimation from the right wrist')
+    parser.add_argument('--heartbeat-ms', type=int, default=HEARTBEAT_INTERVAL_MS,
+                        help='interval between heartbeat lines for the controller watchdog (0 disables)')
+    parser.add_argument('--profile', metavar='MODE[:SECONDS]', type=profile_arg,
+                        help='profile the tracker for a while: cprofile or sample (also $MAESTRO_PROFILE)')
+    parser.add_argument('--no-motion-gate', action='store_true',
+                        help='run hand detection on every frame, even when nothing moves')
+    parser.add_argument('--motion-threshold', type=float, default=MOTION_THRESHOLD,
+                        help='fraction of changed pixels that counts as motion')
+    parser.add_argument('--min-inference-rate', type=float, default=MIN_INFERENCE_RATE,
+                        help='full hand detections per second while the scene is static')
+    parser.add_argument('--landmarks', action='store_true',
+                        help='also print landmark lines for a preview in the controller')
+    parser.add_argument('--landmark-fps', type=float, default=LANDMARK_FPS,
+                        help='maximum landmark lines per second')
+    parser.add_argument('--no-window', action='store_true',
+                        help='do not open the OpenCV preview window')
+    parser.add_argument('--placement', type=parse_placement, default={},
+                        help='where stages run, e.g. detect=process,render=thread (default: all inline)')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help='items buffered between stages on different threads/processes')
+    parser.add_argument('--stage-stats', type=float, default=0.0,
+                        help='log per-stage timing every N seconds (always logged on exit)')
+    parser.add_argument('--camera', type=int, default=None,
+                        help=f'camera device index (default: the first of 0-{CAMERA_PROBE_COUNT - 1} that delivers frames)')
+    parser.add_argument('--camera-size', type=parse_size, default=CAMERA_SIZE, metavar='WxH',
+                        help='requested capture size')
+    parser.add_argument('--camera-fps', type=int, default=CAMERA_FPS,
+                        help='requested capture rate (falls back to 30 if the camera cannot)')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--video', metavar='PATH',
+                        help='read frames from a video file instead of the webcam')
+    source.add_argument('--replay', metavar='NPZ',
+                        help='replay the hands in a flight recorder dump (no camera or model)')
+    parser.add_argument('--log-level', type=str.upper, choices=list(LEVELS),
+                        default=os.environ.get(LOG_LEVEL_ENV, 'INFO').upper(),
+                        help='event log level (also $MAESTRO_LOG_LEVEL)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    log.set_level(args.log_level)
+    profiler = Profiler('tracker')
+    spec = args.profile or parse_env_spec(log)
+    if spec:
+        profiler.start(*spec)
+    recorder = FlightRecorder('tracker')
+    recorder.add('frames', 30, n_hands=(np.int8, ()),
+                 landmarks=(np.float32, (args.max_hands, 21, 3)),
+                 track_ids=(np.int32, (args.max_hands,)), performers=(np.int8, (args.max_hands,)),
+                 sides=('U5', (args.max_hands,)), gestures=('U32', (args.max_hands,)))
+    recorder.add('lines', 30, line=('U256', ()))
+    recorder.install()
+    pipeline = Pipeline(build_stages(args), args.placement, args.queue_size,
+                        resources={'recorder': recorder}, profiler=profiler)
+    last_stats = time.monotonic()
     
-    cap.release()
-    cv2.destroyAllWindows()
+    def tick():
+        # Runs on the main thread, which the profiler hooks
+        nonlocal last_stats
+        written = profiler.poll()
+        if written:
+            log.info(f"Profile written to {', '.join(written)}")
+        if args.stage_stats > 0 and time.monotonic() - last_stats >= args.stage_stats:
+            last_stats = time.monotonic()
+            log_stage_stats(pipeline)
+    
+    try:
+        pipeline.run(tick)
+    finally:
+        written = profiler.stop()
+        if written:
+            log.info(f"Profile written to {', '.join(written)}")
+        log_stage_stats(pipeline)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,211 @@
+import numpy as np
+
+
+# Identity tracking defaults (pixels / frames)
+MAX_MATCH_DISTANCE = 150.0   # Farther than this from a track's prediction starts a new track
+MAX_MISSED_FRAMES = 10       # Frames a track survives without a detection
+VELOCITY_DAMPING = 0.5       # Fraction of last frame's motion used for prediction
+LABEL_SMOOTHING = 0.3        # EMA weight of each new MediaPipe handedness vote
+PAIR_MAX_DISTANCE = 0.7      # Max wrist distance (fraction of frame width) for one performer's hands
+SINGLE_PERFORMER_HANDS = 2   # Up to this many hands all belong to performer 0
+
+
+def linear_assignment(cost):
+    """Minimum-cost assignment (Hungarian / Kuhn-Munkres with potentials).
+
+    Works on rectangular matrices; returns a list of (row, col) pairs. The
+    inner column scan is vectorized, so an 8x8 problem takes well under a
+    millisecond.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return []
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)     # p[j]: row (1-based) assigned to column j
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            free = ~used[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            masked = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(masked)) + 1
+            delta = masked[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted(pairs)
+
+
+class HandTrack:
+    __slots__ = ('track_id', 'x', 'y', 'vx', 'vy', 'missed', 'right_score', 'performer', 'side')
+
+    def __init__(self, track_id, x, y, is_right):
+        self.track_id = track_id
+        self.x, self.y = x, y
+        self.vx = self.vy = 0.0
+        self.missed = 0
+        self.right_score = 1.0 if is_right else 0.0
+        self.performer = None
+        self.side = 'Right' if is_right else 'Left'
+
+    def predict(self):
+        return self.x + VELOCITY_DAMPING * self.vx, self.y + VELOCITY_DAMPING * self.vy
+
+
+class HandIdentityTracker:
+    """Stable per-hand track IDs and performer grouping across frames.
+
+    Detections are matched to existing tracks by wrist distance (Hungarian
+    assignment on a vectorized cost matrix), so IDs survive MediaPipe's
+    occasional Left/Right label flips. Hands are grouped into performers; a
+    performer's two hands are told apart by screen position (the image is
+    mirrored), and a lone hand by its smoothed handedness.
+
+    With ``max_hands`` of 2 or less there is one conductor, however far
+    apart the arms are. With more, new hands are paired closest pair first,
+    with each other or with a one-handed performer, up to ``pair_distance``
+    (a fraction of the frame width, so it does not depend on the capture
+    size).
+    """
+
+    def __init__(self, max_distance=MAX_MATCH_DISTANCE, max_missed=MAX_MISSED_FRAMES,
+                 pair_distance=PAIR_MAX_DISTANCE, max_hands=SINGLE_PERFORMER_HANDS):
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.pair_distance = pair_distance
+        self.single_performer = max_hands <= SINGLE_PERFORMER_HANDS
+        self.frame_width = 1.0
+        self.tracks = []
+        self._next_id = 0
+
+    def update(self, wrists, labels, frame_width=None):
+        """Matches this frame's detections to tracks.
+
+        ``wrists`` is a sequence of (x, y) pixel positions and ``labels`` the
+        MediaPipe handedness label of each detection; ``frame_width`` scales
+        the pairing distance. Returns one HandTrack per detection (same
+        order), with ``performer`` and ``side`` resolved.
+        """
+        if frame_width:
+            self.frame_width = float(frame_width)
+        wrists = np.asarray(wrists, dtype=np.float64).reshape(-1, 2)
+        assigned = [None] * len(wrists)
+
+        if self.tracks and len(wrists):
+            predicted = np.array([t.predict() for t in self.tracks])
+            cost = np.sqrt(((predicted[:, None, :] - wrists[None, :, :]) ** 2).sum(axis=-1))
+            for row, col in linear_assignment(cost):
+                if cost[row, col] <= self.max_distance:
+                    assigned[col] = self.tracks[row]
+
+        seen = set()
+        for index, ((x, y), label) in enumerate(zip(wrists, labels)):
+            track = assigned[index]
+            is_right = label == 'Right'
+            if track is None:
+                track = HandTrack(self._next_id, x, y, is_right)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[index] = track
+            else:
+                track.vx, track.vy = x - track.x, y - track.y
+                track.x, track.y = x, y
+                track.right_score += LABEL_SMOOTHING * ((1.0 if is_right else 0.0) - track.right_score)
+            track.missed = 0
+            seen.add(track.track_id)
+
+        for track in self.tracks:
+            if track.track_id not in seen:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        self._group_performers()
+        return assigned
+
+    def _group_performers(self):
+        by_performer = {}
+        for track in self.tracks:
+            if track.performer is not None:
+                by_performer.setdefault(track.performer, []).append(track)
+
+        new = [t for t in self.tracks if t.performer is None]
+        if self.single_performer:
+            for track in new:
+                track.performer = 0
+                by_performer.setdefault(0, []).append(track)
+        elif new:
+            # Closest pairs first: new hands pair up with each other or with a one-handed performer
+            lone = [members[0] for members in by_performer.values() if len(members) == 1]
+            candidates = new + lone
+            xy = np.array([(t.x, t.y) for t in candidates])
+            dist = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=-1)) / self.frame_width
+            dist[np.tril_indices(len(candidates))] = np.inf
+            dist[len(new):, len(new):] = np.inf     # Two existing performers are never merged
+            paired = set()
+            for flat in np.argsort(dist, axis=None):
+                i, j = np.unravel_index(flat, dist.shape)
+                if dist[i, j] >= self.pair_distance:
+                    break
+                if i in paired or j in paired:
+                    continue
+                paired.update((i, j))
+                a, b = candidates[i], candidates[j]
+                performer = b.performer if b.performer is not None else self._free_performer(by_performer)
+                for track in (a, b):
+                    if track.performer is None:
+                        track.performer = performer
+                        by_performer.setdefault(performer, []).append(track)
+            for track in new:
+                if track.performer is None:
+                    track.performer = self._free_performer(by_performer)
+                    by_performer[track.performer] = [track]
+
+        for members in by_performer.values():
+            # A hand that was just lost may still be tracked next to its re-detection
+            present = [t for t in members if t.missed == 0]
+            if len(present) == 2:
+                left, right = sorted(present, key=lambda t: t.x)
+                left.side, right.side = 'Left', 'Right'
+            else:
+                for track in present:
+                    track.side = 'Right' if track.right_score >= 0.5 else 'Left'
+
+    @staticmethod
+    def _free_performer(by_performer):
+        performer = 0
+        while performer in by_performer:
+            performer += 1
+        return performer
+
+    def performers(self):
+        """Returns {performer_id: {'Left': track, 'Right': track}} for live tracks."""
+        result = {}
+        for track in self.tracks:
+            result.setdefault(track.performer, {})[track.side] = track
+        return result
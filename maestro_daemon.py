@@ -0,0 +1,62 @@
+import sys
+import signal
+import argparse
+
+from event_log import get_log
+from controller_core import (MaestroController, LoopScheduler, HeadlessView, add_controller_arguments,
+                             configure_controller, start_profile_from_args)
+
+log = get_log('controller')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='MaestroBOT headless controller (no display needed)')
+    add_controller_arguments(parser)
+    parser.add_argument('--mode', choices=MaestroController.MODES, default='static',
+                        help='gesture control mode')
+    parser.add_argument('--file', help='audio file to load at startup (default: first .mp3 next to the script)')
+    parser.add_argument('--play', action='store_true', help='start playing right away')
+    parser.add_argument('--no-camera', action='store_true', help='do not start the hand tracker')
+    parser.add_argument('--status-seconds', type=float, default=5.0,
+                        help='print the player and tracker status this often (0 = never)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    settings = configure_controller(args)
+    settings['TRACKER_WINDOW'] = False
+    scheduler = LoopScheduler()
+    view = HeadlessView()
+    core = MaestroController(scheduler, view, settings=settings)
+    core.set_mode(args.mode)
+    if args.file:
+        core.load_media(args.file)
+    core.start(camera=not args.no_camera)
+    if args.play:
+        core.play_manual()
+    start_profile_from_args(core, args)
+
+    def print_status():
+        log.info(f"{view.text('state')} | {view.text('action')} | {view.text('health')}")
+        scheduler.after(int(args.status_seconds * 1000), print_status)
+
+    if args.status_seconds > 0:
+        scheduler.after(int(args.status_seconds * 1000), print_status)
+
+    def request_stop(signum, frame):
+        log.info(f"Signal {signum} received, shutting down.")
+        scheduler.stop()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    try:
+        scheduler.run()
+    finally:
+        core.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,11 @@
-import os
-import sys
-import subprocess
-import time
-import threading
-import queue
+import argparse
 
-try:
-    import vlc
-except Exception:
-    print("!!! need 'python-vlc'. 'pip install python-vlc' !!!")
-    raise
+import numpy as np
+
+from event_log import get_log
+from controller_core import (MaestroController, add_controller_arguments, configure_controller,
+                             start_profile_from_args)
+from track_analysis import resample_peaks
 
 try:
     import tkinter as tk
@@ -18,19 +14,187 @@ except Exception:
     print("!!! tkinter is busted. how?? it should come with python. !!!")
     raise
 
+log = get_log('controller')
 
-def find_default_mp3():
-    """Finds the first .mp3 file in the script directory."""
-    script_dir = os.path.dirname(os.path.realpath(__file__))
-    mp3s = [f for f in os.listdir(script_dir) if f.endswith('.mp3')]
-    return os.path.join(script_dir, mp3s[0]) if mp3s else None
 
+class ViewModel:
+    """Batches widget updates and applies them at most once per display frame.
+
+    ``set`` only records properties that differ from what the widget already
+    shows; ``flush`` runs from a single ``after`` callback and reconfigures
+    each widget once with just the changed properties.
+    """
+
+    FRAME_MS = 16
 
-class MusicControllerGUI:
     def __init__(self, root):
+        self.root = root
+        self._widgets = {}
+        self._applied = {}
+        self._pending = {}
+        self._after_id = None
+
+    def bind(self, name, widget):
+        self._widgets[name] = widget
+        self._applied[name] = {}
+
+    def set(self, name, **props):
+        applied = self._applied[name]
+        pending = self._pending.setdefault(name, {})
+        for key, value in props.items():
+            if applied.get(key) == value:
+                pending.pop(key, None)
+            else:
+                pending[key] = value
+        if not pending:
+            del self._pending[name]
+        if self._pending and self._after_id is None:
+            try:
+                self._after_id = self.root.after(self.FRAME_MS, self.flush)
+            except tk.TclError:
+                pass
+
+    def flush(self):
+        self._after_id = None
+        pending, self._pending = self._pending, {}
+        for name, props in pending.items():
+            try:
+                self._widgets[name].config(**props)
+            except tk.TclError:
+                continue
+            self._applied[name].update(props)
+
+    def cancel(self):
+        if self._after_id:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+
+# MediaPipe's hand skeleton (landmark index pairs)
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8), (5, 9), (9, 10), (10, 11),
+    (11, 12), (9, 13), (13, 14), (14, 15), (15, 16), (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+
+class LandmarkPreview:
+    """Hand landmarks from the tracker drawn on a Tk canvas instead of camera frames.
+
+    Bones, points and a label for ``max_hands`` hands are created once and
+    hidden. Each update moves them with ``coords``; visibility only changes
+    when the number of hands does.
+    """
+
+    POINT_RADIUS = 3
+
+    def __init__(self, canvas, width, height, max_hands, bone_color, point_color, text_color):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self._line = None
+        self._visible = 0
+        self._hands = []
+        for index in range(max_hands):
+            tag = f'hand{index}'
+            bones = [canvas.create_line(0, 0, 0, 0, fill=bone_color, width=2, state='hidden', tags=tag)
+                     for _ in HAND_CONNECTIONS]
+            points = [canvas.create_oval(0, 0, 0, 0, fill=point_color, outline='', state='hidden', tags=tag)
+                      for _ in range(21)]
+            label = canvas.create_text(0, 0, text='', fill=text_color, anchor='s', state='hidden', tags=tag)
+            self._hands.append([tag, bones, points, label, None])
+
+    def update(self, line):
+        """Shows a tracker "Landmarks:" line; None hides every hand."""
+        if line is self._line:
+            return
+        self._line = line
+        parts = line.split('|') if line else []
+        count = 0
+        if parts:
+            frame_w, frame_h = (int(v) for v in parts[0][len('Landmarks:'):].split(','))
+            scale = np.array([self.width / frame_w, self.height / frame_h], dtype=np.float32)
+            r = self.POINT_RADIUS
+            for part, hand in zip(parts[1:], self._hands):
+                meta, _, coords = part.partition(':')
+                performer, side, gesture = meta.split(',', 2)
+                xy = (np.array(coords.split(','), dtype=np.float32).reshape(21, 2) * scale).tolist()
+                _, bones, points, label, shown_text = hand
+                for item, (a, b) in zip(bones, HAND_CONNECTIONS):
+                    self.canvas.coords(item, xy[a][0], xy[a][1], xy[b][0], xy[b][1])
+                for item, (x, y) in zip(points, xy):
+                    self.canvas.coords(item, x - r, y - r, x + r, y + r)
+                self.canvas.coords(label, xy[0][0], max(12, min(y for _, y in xy) - 6))
+                text = f"P{performer} {side}: {gesture}" if performer != '0' else f"{side}: {gesture}"
+                if text != shown_text:
+                    self.canvas.itemconfigure(label, text=text)
+                    hand[4] = text
+                count += 1
+        for index in range(min(count, self._visible), max(count, self._visible)):
+            self.canvas.itemconfigure(self._hands[index][0], state='normal' if index < count else 'hidden')
+        self._visible = count
+
+
+class WaveformView:
+    """Track overview on a Tk canvas.
+
+    The waveform is one polygon whose coordinates are replaced when the track
+    (or its analysis) changes; afterwards only the playhead line is moved, and
+    only when it lands on a different pixel column.
+    """
+
+    def __init__(self, canvas, width, height, color, playhead_color):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.path = None
+        self.has_peaks = False
+        self._head_x = None
+        mid = height / 2
+        self._wave = canvas.create_polygon(0, mid, width, mid, fill=color, outline=color)
+        self._head = canvas.create_line(0, 0, 0, height, fill=playhead_color, width=2)
+
+    def show(self, path, peaks):
+        """Draws the overview of ``path`` from stored [mins, maxs] peaks (flat line if None)."""
+        self.path = path
+        self.has_peaks = bool(peaks and len(peaks[0]))
+        mid = self.height / 2
+        if not self.has_peaks:
+            self.canvas.coords(self._wave, 0, mid, self.width, mid)
+            return
+        mins, maxs = resample_peaks(peaks[0], peaks[1], self.width)
+        xs = np.arange(self.width, dtype=np.float32)
+        top = np.column_stack([xs, mid - np.clip(maxs, -1, 1) * mid])
+        bottom = np.column_stack([xs[::-1], mid - np.clip(mins[::-1], -1, 1) * mid])
+        self.canvas.coords(self._wave, *np.concatenate([top, bottom]).ravel().tolist())
+
+    def set_position(self, fraction):
+        x = int(round(max(0.0, min(1.0, fraction)) * (self.width - 1)))
+        if x != self._head_x:
+            self._head_x = x
+            self.canvas.coords(self._head, x, 0, x, self.height)
+
+
+class MusicControllerGUI:
+    """Tk front end for a MaestroController; the control logic runs on the Tk event loop."""
+
+    TAB_MODES = {
+        "Static Gestures": "static",
+        "Slider Controls": "slider",
+        "Conducting": "conduct",
+        "Scrubbing": "scrub",
+    }
+    WAVEFORM_MS = 100               # Playhead refresh interval
+    PREVIEW_SIZE = (320, 240)
+
+    def __init__(self, root, instance=None, camera=True, settings=None):
         self.root = root
         self.root.title('MaestroBOT')
-        self.root.geometry("480x600")
+        self.settings = settings or {}
+        self.preview_fps = self.settings.get('PREVIEW_FPS', MaestroController.PREVIEW_FPS)
+        self.root.geometry("480x930" if self.preview_fps > 0 else "480x680")
         self.root.configure(bg='#121212')
 
         # Style configuration
@@ -44,7 +208,7 @@ class MusicControllerGUI:
             self.font_action = font.Font(family='Consolas', size=16, weight='bold')
             self.font_state = font.Font(family='Consolas', size=14, weight='bold')
         except tk.TclError:
-            print("INFO: Consolas font not found, falling back to Segoe UI.")
+            log.info("Consolas font not found, falling back to Segoe UI.")
             self.font_normal = font.Font(family='Segoe UI', size=10)
             self.font_bold = font.Font(family='Segoe UI', size=11, weight='bold')
             self.font_action = font.Font(family='Segoe UI', size=16, weight='bold')
@@ -86,51 +250,17 @@ class MusicControllerGUI:
                        background=[('selected', FRAME_COLOR), ('active', BTN_ACTIVE)],
                        foreground=[('selected', TEXT_COLOR)])
 
-        # VLC player initialization
-        self.instance = vlc.Instance('--audio-filter=scaletempo', '--quiet')
-        self.player = self.instance.media_player_new()
-
-        # State variables
-        self.current_file = None
-        self.is_playing = False
-        self.is_paused = False
-        self.camera_on = False
-        self.volume = 60
-        self.playback_rate = 1.0
-        self.target_volume = 60
-        self.target_rate = 1.0
-        self.player.audio_set_volume(self.volume)
-
-        # Fading state
-        self.is_fading = False
-        self.original_volume_on_fade = 60
-        self._fade_after_id = None
-
-        # Control mode state
-        self.control_mode = "static"
-        self.prev_slider_data = {'R_X': None, 'R_Y': None}
-        self.SLIDER_DEADZONE_X = 15
-        self.SLIDER_DEADZONE_Y = 10
-
-        # Smoothing loop tracking
-        self._smooth_update_id = None
-        self._last_state_update = 0
-        self.STATE_UPDATE_INTERVAL = 0.1  # Update state label every 100ms
-
         # Build GUI
         self._build_gui(FRAME_COLOR)
 
-        # Threading components
-        self.queue = queue.Queue()
-        self.subproc = None
-        self.reader_thread = None
-        self.reading = False
-        self._poll_after_id = None
-
-        # Start camera and loops
-        self.toggle_camera()
-        self._poll_after_id = self.root.after(50, self._poll_queue)
-        self._smooth_update_id = self.root.after(50, self._smooth_update_loop)
+        # Control logic runs on Tk's timers and reports through the view model
+        self.core = MaestroController(self.root, self.view, instance, self.settings)
+        self.core.on_error = messagebox.showerror
+        self.core.start(camera=camera)
+        self._waveform_after_id = self.root.after(self.WAVEFORM_MS, self._waveform_loop)
+        self._preview_after_id = None
+        if self.preview is not None:
+            self._preview_after_id = self.root.after(int(1000 / self.preview_fps), self._preview_loop)
         self.root.protocol('WM_DELETE_WINDOW', self._on_close)
 
     def _build_gui(self, FRAME_COLOR):
@@ -158,7 +288,11 @@ class MusicControllerGUI:
             "   • One Finger   → 0.50x\n"
             "   • Two Fingers  → 0.75x\n"
             "   • Three Fingers→ 1.00x\n"
-            "   • Four Fingers → 1.50x"
+            "   • Four Fingers → 1.50x\n"
+            "\n"
+            " Motion (Right Hand):\n"
+            "   • Swipe Left/Right → Prev/Next track\n"
+            "   • Draw a Circle    → Loop on/off"
         )
         self.label_static_instr = ttk.Label(self.static_tab, text=static_instructions, 
                                            justify=tk.LEFT, style='Instructions.TLabel')
@@ -179,12 +313,54 @@ class MusicControllerGUI:
             "      (Right=Faster, Left=Slower)\n"
             "\n"
             "   • Closed Fist + Move U/D → Volume\n"
-            "      (Up=Louder, Down=Quieter)"
+            "      (Up=Louder, Down=Quieter)\n"
+            "\n"
+            "   • Swipe Left/Right → Prev/Next track\n"
+            "   • Draw a Circle    → Loop on/off"
         )
         self.label_slider_instr = ttk.Label(self.slider_tab, text=slider_instructions, 
                                            justify=tk.LEFT, style='Instructions.TLabel')
         self.label_slider_instr.pack(fill='x', expand=True)
 
+        # Conducting tab
+        self.conduct_tab = ttk.Frame(self.notebook, style='TFrame', padding=(10, 10))
+        self.notebook.add(self.conduct_tab, text='Conducting')
+        conduct_instructions = (
+            "Conducting (Music follows your beat):\n"
+            "───────────────────────────────────────\n"
+            " Playback (Left Hand):\n"
+            "   • Open Hand   → Play/Resume\n"
+            "   • Closed Fist → Fade to Pause\n"
+            "\n"
+            " Tempo (Right Hand):\n"
+            "   • Beat up and down steadily\n"
+            "   • Speed follows your tempo relative\n"
+            "     to the track's own tempo (or to\n"
+            "     your first steady tempo)"
+        )
+        self.label_conduct_instr = ttk.Label(self.conduct_tab, text=conduct_instructions,
+                                            justify=tk.LEFT, style='Instructions.TLabel')
+        self.label_conduct_instr.pack(fill='x', expand=True)
+
+        # Scrubbing tab
+        self.scrub_tab = ttk.Frame(self.notebook, style='TFrame', padding=(10, 10))
+        self.notebook.add(self.scrub_tab, text='Scrubbing')
+        scrub_instructions = (
+            "Scrubbing (Seek through the track):\n"
+            "───────────────────────────────────────\n"
+            " Playback (Left Hand):\n"
+            "   • Open Hand   → Play/Resume\n"
+            "   • Closed Fist → Fade to Pause\n"
+            "\n"
+            " Seek (Right Hand):\n"
+            "   • Closed Fist + Move L/R → Scrub\n"
+            "      (Right=Forward, Left=Back)\n"
+            "   • Open Hand → Let go"
+        )
+        self.label_scrub_instr = ttk.Label(self.scrub_tab, text=scrub_instructions,
+                                          justify=tk.LEFT, style='Instructions.TLabel')
+        self.label_scrub_instr.pack(fill='x', expand=True)
+
         self.notebook.pack(fill='x', padx=10, pady=(10,0))
         self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
@@ -193,12 +369,36 @@ class MusicControllerGUI:
         status_frame.pack(fill='x')
         self.label_file = ttk.Label(status_frame, text='File: (none)', wraplength=450)
         self.label_file.pack(pady=(5, 10))
+        self.canvas_waveform = tk.Canvas(status_frame, width=450, height=56, bg='#2A2A2A',
+                                         highlightthickness=0)
+        self.canvas_waveform.pack(pady=(0, 5))
+        self.waveform = WaveformView(self.canvas_waveform, 450, 56, '#4F6F8F', '#FFA726')
         self.label_action = ttk.Label(status_frame, text='Action: (waiting)', 
                                      font=self.font_action, style='TLabel', background=FRAME_COLOR)
         self.label_action.pack(pady=(10, 10))
         self.label_state = ttk.Label(status_frame, text='State: stopped | Volume: 60 | Rate: 1.00x', 
                                      style='Stopped.TLabel', background=FRAME_COLOR)
         self.label_state.pack(pady=(10, 10))
+        self.label_health = ttk.Label(status_frame, text='Tracker: starting...', style='TLabel')
+        self.label_health.pack(pady=(0, 5))
+
+        # Optional landmark preview (the tracker then runs without its own window)
+        self.preview = None
+        if self.preview_fps > 0:
+            width, height = self.PREVIEW_SIZE
+            self.canvas_preview = tk.Canvas(status_frame, width=width, height=height, bg='#000000',
+                                            highlightthickness=0)
+            self.canvas_preview.pack(pady=(5, 5))
+            self.preview = LandmarkPreview(self.canvas_preview, width, height,
+                                           self.settings.get('TRACKER_MAX_HANDS',
+                                                             MaestroController.TRACKER_MAX_HANDS),
+                                           '#F542E6', '#F57542', '#66BB6A')
+
+        self.view = ViewModel(self.root)
+        self.view.bind('file', self.label_file)
+        self.view.bind('action', self.label_action)
+        self.view.bind('state', self.label_state)
+        self.view.bind('health', self.label_health)
 
         # Manual control buttons
         btn_frame = ttk.Frame(self.root, padding=(10, 10), style='TFrame')
@@ -215,6 +415,14 @@ class MusicControllerGUI:
         self.btn_camera_toggle = ttk.Button(cam_frame, text='Turn Camera OFF', 
                                            command=self.toggle_camera, width=25)
         self.btn_camera_toggle.pack(pady=5)
+        self.btn_profile = ttk.Button(cam_frame, text='Profile 30s',
+                                      command=self.toggle_profiling, width=25)
+        self.btn_profile.pack(pady=5)
+        self.btn_recorder = ttk.Button(cam_frame, text='Dump Recorder',
+                                       command=self.dump_recorder, width=25)
+        self.btn_recorder.pack(pady=5)
+        self.view.bind('camera', self.btn_camera_toggle)
+        self.view.bind('profile', self.btn_profile)
 
         # Crash button
         bottom_frame = ttk.Frame(self.root, padding=(10, 10), style='TFrame')
@@ -228,591 +436,121 @@ class MusicControllerGUI:
                                     style='Crash.TButton')
         self.btn_crash.pack(side='right', padx=10, pady=10)
 
-    def _on_tab_changed(self, event):
-        """Handles tab switching between control modes."""
-        current_tab_name = self.notebook.tab(self.notebook.select(), "text")
-        self.control_mode = "static" if current_tab_name == "Static Gestures" else "slider"
-        self.target_volume = self.volume
-        self.target_rate = self.playback_rate
-        self.prev_slider_data = {'R_X': None, 'R_Y': None}
-        print(f"INFO: Control mode changed to: {self.control_mode}")
-
-    def force_crash(self):
-        """Forces application crash for testing error handling."""
-        print("INFO: Stopping camera before crashing...")
-        self.stop_hand_tracking_subprocess()
-        print("INFO: Crashing as requested!")
-        raise Exception("Forced crash.")
-
-    def toggle_camera(self):
-        """Toggles camera on/off for hand tracking."""
-        if self.camera_on:
-            self.stop_hand_tracking_subprocess()
-            self.camera_on = False
-            self.btn_camera_toggle.config(text='Turn Camera ON')
-            self.label_action.config(text='Action: Camera OFF')
-        else:
-            self.start_hand_tracking_subprocess()
-            if self.subproc:
-                self.camera_on = True
-                self.btn_camera_toggle.config(text='Turn Camera OFF')
-                self.label_action.config(text='Action: (waiting)')
-            else:
-                self.camera_on = False
-                self.btn_camera_toggle.config(text='Turn Camera ON')
-                self.label_action.config(text='Action: Start Failed')
-
-    def load_file(self):
-        """Opens file dialog to load an MP3 file."""
-        file = filedialog.askopenfilename(filetypes=[('MP3 files', '*.mp3'), ('All files', '*.*')])
-        if not file:
-            return
-        self.current_file = file
-        self.label_file.config(text=f'File: {os.path.basename(file)}')
-        media = self.instance.media_new(str(file))
-        self.player.set_media(media)
-        self.play_manual()
-
-    def play_manual(self):
-        """Starts or resumes playback."""
-        if self.is_fading:
-            return
-        
-        try:
-            player_state = self.player.get_state()
-            if player_state == vlc.State.Playing:
-                return
-        except Exception:
-            pass
-
-        if not self.current_file:
-            default = find_default_mp3()
-            if default:
-                self.current_file = str(default)
-                media = self.instance.media_new(self.current_file)
-                self.player.set_media(media)
-                self.label_file.config(text=f'File: {os.path.basename(self.current_file)}')
-            else:
-                return
-
-        success = self.player.play()
-        if success == 0:
-            self.is_playing = True
-            self.is_paused = False
-            self.volume = self.target_volume
-            self.playback_rate = self.target_rate
-            self.player.audio_set_volume(self.volume)
-            self.player.set_rate(self.playback_rate)
-            self._update_state_label()
-
-    def pause_manual(self):
-        """Pauses playback immediately."""
-        if self.is_fading:
-            return
-        
-        try:
-            player_state = self.player.get_state()
-            if player_state != vlc.State.Playing:
-                return
-        except Exception:
-            pass
-
-        self.player.pause()
-        self.is_paused = True
-        self.is_playing = False
-        self._update_state_label()
-
-    def stop_manual(self):
-        """Stops playback and resets to initial state."""
-        if self.is_fading:
-            if self._fade_after_id:
-                try:
-                    self.root.after_cancel(self._fade_after_id)
-                except Exception:
-                    pass
-            self._fade_after_id = None
-            self.is_fading = False
-
-        self.player.stop()
-        self.is_playing = False
-        self.is_paused = False
-        self.volume = 60
-        self.target_volume = 60
-        self.playback_rate = 1.0
-        self.target_rate = 1.0
-        self.player.audio_set_volume(self.volume)
-        self.player.set_rate(self.playback_rate)
-        self._update_state_label()
-
-    def fade_and_pause(self):
-        """Gradually fades volume to zero then pauses."""
-        try:
-            player_state = self.player.get_state()
-            if player_state != vlc.State.Playing or self.is_fading:
-                return
-        except Exception:
-            return
-
-        self.is_fading = True
-        self.original_volume_on_fade = self.player.audio_get_volume()
-        if self._fade_after_id:
-            try:
-                self.root.after_cancel(self._fade_after_id)
-            except Exception:
-                pass
-        self._fade_after_id = self.root.after(50, self._fade_loop_pause)
-
-    def _fade_loop_pause(self):
-        """Recursive loop for fade effect."""
-        self._fade_after_id = None
-        
-        try:
-            root_exists = self.root.winfo_exists()
-        except Exception:
-            return
-
-        if not self.is_fading or not root_exists:
-            if not self.is_fading:
-                try:
-                    if self.player.is_playing():
-                        self.player.audio_set_volume(self.original_volume_on_fade)
-                except Exception:
-                    pass
-            return
-
-        current_vol = self.player.audio_get_volume()
-        step_down = max(1, self.original_volume_on_fade // 10 if self.original_volume_on_fade > 0 else 1)
-        new_vol = max(0, current_vol - step_down)
-        self.player.audio_set_volume(new_vol)
 
-        if new_vol > 0:
-            if self.is_fading and root_exists:
-                self._fade_after_id = self.root.after(50, self._fade_loop_pause)
-            elif not self.is_fading:
-                try:
-                    if self.player.is_playing():
-                        self.player.audio_set_volume(self.original_volume_on_fade)
-                except Exception:
-                    pass
-        else:
-            self.player.pause()
-            try:
-                self.player.audio_set_volume(self.original_volume_on_fade)
-            except Exception:
-                pass
-            self.is_paused = True
-            self.is_playing = False
-            self.is_fading = False
-            self._update_state_label()
-
-    def start_hand_tracking_subprocess(self):
-        """Launches the hand tracking subprocess."""
-        if self.subproc and self.subproc.poll() is None:
-            return
-        
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        script_path = os.path.join(script_dir, 'hand-tracker.py')
-        
-        if not os.path.exists(script_path):
-            messagebox.showerror('Missing Script', f'hand-tracker.py not found at {script_path}')
-            return
-        
-        cmd = [sys.executable, '-u', str(script_path)]
+    def _waveform_loop(self):
+        """Redraws the overview when a track's analysis arrives; otherwise only moves the playhead."""
+        core = self.core
+        path = core.current_file
         try:
-            print("INFO: Starting hand-tracking subprocess...")
-            self.subproc = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
-                text=True, bufsize=1, creationflags=subprocess.CREATE_NO_WINDOW,
-                encoding='utf-8', errors='ignore'
-            )
+            if path != self.waveform.path:
+                info = core.analysis.lookup(path) if path else None
+                self.waveform.show(path, info.get('peaks') if info else None)
+                self._show_waveform(True)
+            elif path and not self.waveform.has_peaks:
+                # Analysis runs in the background; pick the peaks up once they are cached
+                info = core.analysis.lookup(path)
+                if info and info.get('peaks'):
+                    self.waveform.show(path, info['peaks'])
+                elif core.analysis.unavailable(path):
+                    self._show_waveform(False)
+            self.waveform.set_position(core.player.get_position() if path else 0.0)
         except Exception as e:
-            messagebox.showerror('Subprocess error', f'Failed to start hand-tracker.py: {e}')
-            self.subproc = None
-            return
-        
-        self.reading = True
-        self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
-        self.reader_thread.start()
-        print("INFO: Hand tracking subprocess started.")
-
-    def stop_hand_tracking_subprocess(self):
-        """Stops the hand tracking subprocess cleanly."""
-        print("INFO: Stopping hand tracking...")
-        self.reading = False
-        sub = self.subproc
-        
-        if sub and sub.poll() is None:
-            try:
-                sub.terminate()
-                try:
-                    sub.wait(timeout=1)
-                except subprocess.TimeoutExpired:
-                    sub.kill()
-            except Exception as e:
-                print(f"ERROR: Error terminating subprocess: {e}")
-                if sub and sub.poll() is None:
-                    try:
-                        sub.kill()
-                    except Exception as kill_e:
-                        print(f"ERROR: Error killing subprocess: {kill_e}")
-        
-        if hasattr(self, 'reader_thread') and self.reader_thread and self.reader_thread.is_alive():
-            self.reader_thread.join(timeout=1)
-        
-        self.subproc = None
-        self.reader_thread = None
-        
-        while not self.queue.empty():
-            try:
-                self.queue.get_nowait()
-            except queue.Empty:
-                break
-        
-        print("INFO: Hand tracking stopped.")
-
-    def _reader_loop(self):
-        """Background thread that reads from subprocess stdout."""
-        while self.reading:
-            sub = self.subproc
-            if not sub or not sub.stdout or sub.stdout.closed:
-                break
-            try:
-                raw = sub.stdout.readline()
-                if raw:
-                    line = raw.strip()
-                    if line:
-                        self.queue.put(line)
-                else:
-                    break
-            except ValueError:
-                break
-            except Exception as e:
-                if self.reading:
-                    print(f"ERROR: Exception in reader loop: {e}. Exiting.")
-                break
-
-    def _poll_queue(self):
-        """Polls the message queue from hand tracking subprocess."""
-        try:
-            for _ in range(10):
-                if self.queue.empty():
-                    break
-                line = self.queue.get_nowait()
-                self._handle_line(line)
-        except queue.Empty:
-            pass
-        except Exception as e:
-            print(f"ERROR: Error processing queue: {e}")
+            log.error(f"Error updating waveform: {e}")
         finally:
-            try:
-                root_exists = self.root.winfo_exists()
-            except Exception:
-                return
-            
-            if root_exists:
-                self._poll_after_id = self.root.after(50, self._poll_queue)
+            if core.running:
+                self._waveform_after_id = self.root.after(self.WAVEFORM_MS, self._waveform_loop)
 
-    def _smooth_update_loop(self):
-        """Smoothly interpolates volume and playback rate changes."""
-        try:
-            root_exists = self.root.winfo_exists()
-        except Exception:
-            return
-
-        if not root_exists:
+    def _show_waveform(self, visible):
+        """Shows the overview strip, or hides it for a track that will never have one."""
+        if visible == bool(self.canvas_waveform.winfo_manager()):
             return
+        if visible:
+            self.canvas_waveform.pack(pady=(0, 5), before=self.label_action)
+        else:
+            self.canvas_waveform.pack_forget()
 
-        vol_changed = False
-        rate_changed = False
-        
+    def _preview_loop(self):
+        """Moves the preview to the newest landmark line, at most ``preview_fps`` times a second."""
         try:
-            current_vlc_vol = self.player.audio_get_volume()
-            current_vlc_rate = self.player.get_rate()
-
-            # Smooth volume transitions
-            if not self.is_fading and abs(self.target_volume - self.volume) > 1:
-                step = 2 if self.target_volume > self.volume else -2
-                self.volume = max(0, min(100, self.volume + step))
-                if self.volume != current_vlc_vol:
-                    self.player.audio_set_volume(self.volume)
-                    vol_changed = True
-
-            # Smooth rate transitions
-            if abs(self.target_rate - self.playback_rate) > 0.02:
-                step = 0.05 if self.target_rate > self.playback_rate else -0.05
-                self.playback_rate = max(0.25, min(3.0, self.playback_rate + step))
-                if abs(self.playback_rate - current_vlc_rate) > 0.01:
-                    self.player.set_rate(self.playback_rate)
-                    rate_changed = True
-
-            # Throttled state label updates
-            current_time = time.time()
-            if vol_changed or rate_changed or (current_time - self._last_state_update) > self.STATE_UPDATE_INTERVAL:
-                self._update_state_label()
-                self._last_state_update = current_time
-
+            self.preview.update(self.core.landmarks)
         except Exception as e:
-            print(f"ERROR in smooth update loop accessing player: {e}")
+            log.error(f"Error updating landmark preview: {e}")
         finally:
-            if root_exists:
-                try:
-                    self._smooth_update_id = self.root.after(50, self._smooth_update_loop)
-                except Exception:
-                    pass
+            if self.core.running:
+                self._preview_after_id = self.root.after(int(1000 / self.preview_fps), self._preview_loop)
 
-    def _parse_tracker_data(self, line: str) -> dict | None:
-        """Parses hand tracking data from subprocess output."""
-        if not line or '|' not in line or ':' not in line or "_Gesture:" not in line:
-            return None
-        
-        data = {}
-        try:
-            parts = line.split('|')
-            valid_keys = {"L_Gesture", "L_X", "L_Y", "R_Gesture", "R_X", "R_Y"}
-            has_hand = False
-            
-            for part in parts:
-                split_part = part.split(':', 1)
-                if len(split_part) == 2:
-                    key, val = split_part[0].strip(), split_part[1].strip()
-                    if key in valid_keys:
-                        if '_X' in key or '_Y' in key:
-                            data[key] = int(val) if val != 'None' else None
-                        else:
-                            data[key] = val
-                            has_hand |= (val != "No Hand")
-            
-            if not has_hand:
-                return None
-            
-            data.setdefault("L_Gesture", "No Hand")
-            data.setdefault("L_X", None)
-            data.setdefault("L_Y", None)
-            data.setdefault("R_Gesture", "No Hand")
-            data.setdefault("R_X", None)
-            data.setdefault("R_Y", None)
-            
-            return data
-        except (ValueError, Exception):
-            return None
-
-    def _handle_line(self, line: str):
-        """Processes a single line of hand tracking data."""
-        if not self.camera_on or self.is_fading:
-            return
-        
-        if line == "No hands detected.":
-            self.label_action.config(text='Action: (no hands)')
-            self.prev_slider_data = {'R_X': None, 'R_Y': None}
-            return
+    def _on_tab_changed(self, event):
+        """Handles tab switching between control modes."""
+        current_tab_name = self.notebook.tab(self.notebook.select(), "text")
+        self.core.set_mode(self.TAB_MODES.get(current_tab_name, "static"))
 
-        data = self._parse_tracker_data(line)
-        if not data:
+    def load_file(self):
+        """Opens file dialog to load an MP3 file."""
+        file = filedialog.askopenfilename(filetypes=[('Audio files', '*.mp3 *.wav'), ('MP3 files', '*.mp3'),
+                                                     ('WAV files', '*.wav'), ('All files', '*.*')])
+        if not file:
             return
+        self.core.load_media(file)
+        self.core.play_manual()
 
-        lg = data.get('L_Gesture', 'N/A')
-        rg = data.get('R_Gesture', 'N/A')
-        self.label_action.config(text=f"L: {lg} | R: {rg}")
+    def play_manual(self):
+        self.core.play_manual()
 
-        if self.control_mode == "static":
-            self._handle_static_mode(data)
-        else:
-            self._handle_slider_mode(data)
-
-    def _handle_static_mode(self, data: dict):
-        """Handles gesture processing in static mode."""
-        left_gesture = data.get('L_Gesture')
-        right_gesture = data.get('R_Gesture')
-
-        # Playback control
-        if left_gesture == "Open Hand" and right_gesture == "Open Hand":
-            if not self.is_playing or self.is_paused:
-                self.play_manual()
-        elif left_gesture == "Closed Fist" and right_gesture == "Closed Fist":
-            if self.is_playing and not self.is_paused:
-                self.fade_and_pause()
-
-        # Volume control (left hand)
-        volume_map = {
-            "One Finger": 25,
-            "Two Fingers": 50,
-            "Three Fingers": 75,
-            "Four Fingers": 100
-        }
-        
-        if left_gesture in volume_map:
-            target_vol = volume_map[left_gesture]
-            if target_vol != self.target_volume:
-                self.target_volume = target_vol
-
-        # Speed control (right hand)
-        rate_map = {
-            "One Finger": 0.5,
-            "Two Fingers": 0.75,
-            "Three Fingers": 1.0,
-            "Four Fingers": 1.5
-        }
-        
-        if right_gesture in rate_map:
-            target_rate = rate_map[right_gesture]
-            if abs(target_rate - self.target_rate) > 0.01:
-                self.target_rate = target_rate
-
-    def _handle_slider_mode(self, data: dict):
-        """Handles gesture processing in slider mode."""
-        left_gesture = data.get('L_Gesture')
-        right_gesture = data.get('R_Gesture')
-
-        # Playback control (left hand)
-        if left_gesture == "Open Hand":
-            if not self.is_playing or self.is_paused:
-                self.play_manual()
-        elif left_gesture == "Closed Fist":
-            if self.is_playing and not self.is_paused:
-                self.fade_and_pause()
-
-        # Slider controls (right hand)
-        R_X = data.get('R_X')
-        R_Y = data.get('R_Y')
-        prev_x = self.prev_slider_data.get('R_X')
-        prev_y = self.prev_slider_data.get('R_Y')
-
-        # Speed control via horizontal movement
-        if right_gesture == "Open Hand" and R_X is not None:
-            if prev_x is not None:
-                delta_x = R_X - prev_x
-                if abs(delta_x) > self.SLIDER_DEADZONE_X:
-                    new_actual_rate = self.playback_rate + (delta_x * 0.005)
-                    new_actual_rate = max(0.25, min(3.0, new_actual_rate))
-                    if abs(new_actual_rate - self.playback_rate) > 0.01:
-                        self.playback_rate = new_actual_rate
-                        self.target_rate = new_actual_rate
-                        self.player.set_rate(self.playback_rate)
-            
-            self.prev_slider_data['R_X'] = R_X
-            self.prev_slider_data['R_Y'] = None
-
-        # Volume control via vertical movement
-        elif right_gesture == "Closed Fist" and R_Y is not None:
-            if prev_y is not None:
-                delta_y = R_Y - prev_y
-                if abs(delta_y) > self.SLIDER_DEADZONE_Y:
-                    new_actual_vol = self.volume - (delta_y * 0.75)
-                    new_actual_vol = int(max(0, min(100, new_actual_vol)))
-                    if new_actual_vol != self.volume:
-                        self.volume = new_actual_vol
-                        self.target_volume = new_actual_vol
-                        self.player.audio_set_volume(self.volume)
-                        if not self.is_fading:
-                            self.original_volume_on_fade = self.volume
-            
-            self.prev_slider_data['R_Y'] = R_Y
-            self.prev_slider_data['R_X'] = None
-        
-        else:
-            if self.prev_slider_data['R_X'] is not None or self.prev_slider_data['R_Y'] is not None:
-                self.prev_slider_data['R_X'] = None
-                self.prev_slider_data['R_Y'] = None
+    def pause_manual(self):
+        self.core.pause_manual()
 
-    def _update_state_label(self):
-        """Updates the state display label with current playback info."""
-        try:
-            root_exists = self.root.winfo_exists()
-        except Exception:
-            return
+    def stop_manual(self):
+        self.core.stop_manual()
 
-        if not root_exists:
-            return
+    def toggle_camera(self):
+        self.core.toggle_camera()
 
-        state_style = 'Stopped.TLabel'
-        state = 'stopped'
-        current_display_vol = self.volume
-        current_display_rate = self.playback_rate
+    def toggle_profiling(self):
+        self.core.toggle_profiling()
 
-        try:
-            player_state = self.player.get_state()
-            if player_state == vlc.State.Playing:
-                state = 'playing'
-                state_style = 'Playing.TLabel'
-            elif player_state == vlc.State.Paused:
-                state = 'paused'
-                state_style = 'Paused.TLabel'
-            
-            self.is_playing = (state == 'playing')
-            self.is_paused = (state == 'paused')
-        except Exception:
-            if self.is_playing and not self.is_paused:
-                state = 'playing'
-                state_style = 'Playing.TLabel'
-            elif self.is_paused:
-                state = 'paused'
-                state_style = 'Paused.TLabel'
-
-        rate_str = f"{current_display_rate:.2f}x"
-        vol_str = f"{current_display_vol}"
-        self.label_state.config(
-            text=f'State: {state} | Volume: {vol_str} | Rate: {rate_str}',
-            style=state_style
-        )
+    def dump_recorder(self):
+        self.core.dump_recorder()
+
+    def force_crash(self):
+        self.core.force_crash()
 
     def _on_close(self):
         """Cleanup handler for window close event."""
-        print("INFO: Close window requested.")
-        
-        # Cancel all scheduled callbacks
-        if self._fade_after_id:
-            try:
-                self.root.after_cancel(self._fade_after_id)
-            except Exception:
-                pass
-        if self._poll_after_id:
-            try:
-                self.root.after_cancel(self._poll_after_id)
-            except Exception:
-                pass
-        if self._smooth_update_id:
-            try:
-                self.root.after_cancel(self._smooth_update_id)
-            except Exception:
-                pass
-        
-        self._fade_after_id = None
-        self._poll_after_id = None
-        self._smooth_update_id = None
+        log.info("Close window requested.")
+        for after_id in (self._waveform_after_id, self._preview_after_id):
+            if after_id:
+                try:
+                    self.root.after_cancel(after_id)
+                except Exception:
+                    pass
+        self._waveform_after_id = None
+        self._preview_after_id = None
+        self.core.shutdown()
 
-        # Stop hand tracking
-        self.stop_hand_tracking_subprocess()
-        
-        # Stop VLC player
-        try:
-            print("INFO: Stopping VLC player on close.")
-            if self.player:
-                self.player.stop()
-        except Exception as e:
-            print(f"ERROR: Error stopping player: {e}")
-        
-        try:
-            print("INFO: Releasing VLC instance.")
-            if self.instance:
-                self.instance.release()
-        except Exception as e:
-            print(f"ERROR: Error releasing instance: {e}")
-        
         # Destroy window
         try:
-            print("INFO: Destroying root window.")
+            log.info("Destroying root window.")
             self.root.destroy()
         except tk.TclError:
-            print("INFO: Root window already destroyed.")
+            log.info("Root window already destroyed.")
         except Exception as e:
-            print(f"ERROR: Error destroying root: {e}")
+            log.error(f"Error destroying root: {e}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='MaestroBOT gesture music controller')
+    add_controller_arguments(parser)
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+    settings = configure_controller(args)
     root = tk.Tk()
-    app = MusicControllerGUI(root)
+    app = MusicControllerGUI(root, settings=settings)
+    start_profile_from_args(app.core, args)
     root.mainloop()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -8,6 +8,8 @@ import queue
 from pathlib import Path
 import platform
 
+from event_log import get_log
+
 try:
     import vlc
 except Exception:
@@ -21,6 +23,8 @@ except Exception:
     print("Tkinter not available - it's required for the GUI (usually included with standard Python).")
     raise
 
+log = get_log('controller-mac')
+
 
 def find_default_mp3():
     """Finds the first .mp3 file in the script's directory."""
@@ -161,7 +165,7 @@ class MusicControllerGUI:
 
     def force_crash(self):
         """Intentionally raises an exception."""
-        print("Force crash button clicked. Raising exception.")
+        log.info("Force crash button clicked. Raising exception.")
         raise Exception("Forced crash as requested by user.")
 
     def toggle_camera(self):
@@ -228,7 +232,7 @@ class MusicControllerGUI:
     def start_hand_tracking_subprocess(self):
         """Finds and runs the hand_tracker.py script as a subprocess."""
         if self.subproc and self.subproc.poll() is None:
-            print("Hand tracking is already running.")
+            log.info("Hand tracking is already running.")
             return
 
         script_path = Path(__file__).parent / 'hand-tracker.py'
@@ -249,7 +253,7 @@ class MusicControllerGUI:
             self.subproc = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
+                stderr=subprocess.DEVNULL,   # The tracker logs to its own file; stdout is gestures only
                 text=True,
                 bufsize=1,
                 creationflags=creationflags
@@ -262,7 +266,7 @@ class MusicControllerGUI:
         self.reading = True
         self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
         self.reader_thread.start()
-        print("Hand tracking subprocess started.")
+        log.info("Hand tracking subprocess started.")
 
     def stop_hand_tracking_subprocess(self):
         """Stops the hand-tracking subprocess."""
@@ -271,9 +275,9 @@ class MusicControllerGUI:
             try:
                 self.subproc.terminate()
                 self.subproc.wait(timeout=2)
-                print("Hand tracking subprocess terminated.")
+                log.info("Hand tracking subprocess terminated.")
             except (subprocess.TimeoutExpired, Exception) as e:
-                print(f"Forcing kill on subprocess: {e}")
+                log.error(f"Forcing kill on subprocess: {e}")
                 self.subproc.kill()
         
         if self.reader_thread and self.reader_thread.is_alive():
@@ -286,7 +290,7 @@ class MusicControllerGUI:
             try: self.queue.get_nowait()
             except queue.Empty: break
             
-        print("Hand tracking stopped.")
+        log.info("Hand tracking stopped.")
 
 
     def _reader_loop(self):
@@ -303,7 +307,7 @@ class MusicControllerGUI:
                     break
             except Exception:
                 break # Exit loop if process dies
-        print("Reader loop exited.")
+        log.info("Reader loop exited.")
 
     def _poll_queue(self):
         """Periodically checks the queue for new lines from the reader thread."""
@@ -333,14 +337,14 @@ class MusicControllerGUI:
                             self.player.play()
                             self.is_paused = False
                             self.is_playing = True
-                            print('Unpaused playback (Open Hand)')
+                            log.info('Unpaused playback (Open Hand)', action=action)
                         else:
                             self.player.play()
                             self.playback_rate = 1.0
                             self.player.set_rate(self.playback_rate)
                             self.is_playing = True
                             self.is_paused = False
-                            print('Started playback (Open Hand)')
+                            log.info('Started playback (Open Hand)', action=action)
                         self.last_action_time['start'] = now
 
             elif 'Pause' in action:
@@ -348,35 +352,35 @@ class MusicControllerGUI:
                     if self.is_playing and not self.is_paused:
                         self.player.pause()
                         self.is_paused = True
-                        print('Paused playback (Closed Fist)')
+                        log.info('Paused playback (Closed Fist)', action=action)
                         self.last_action_time['pause'] = now
 
             elif 'Volume Up' in action:
                 if (now - self.last_action_time['vol']) > self.ACTION_COOLDOWN:
                     self.volume = min(100, self.volume + self.VOL_STEP)
                     self.player.audio_set_volume(self.volume)
-                    print(f'Volume up -> {self.volume} ({action})')
+                    log.info('Volume up', volume=self.volume, action=action)
                     self.last_action_time['vol'] = now
 
             elif 'Volume Down' in action:
                 if (now - self.last_action_time['vol']) > self.ACTION_COOLDOWN:
                     self.volume = max(0, self.volume - self.VOL_STEP)
                     self.player.audio_set_volume(self.volume)
-                    print(f'Volume down -> {self.volume} ({action})')
+                    log.info('Volume down', volume=self.volume, action=action)
                     self.last_action_time['vol'] = now
             
             elif 'Speed Up' in action:
                 if (now - self.last_action_time['rate']) > self.ACTION_COOLDOWN:
                     self.playback_rate = min(3.0, self.playback_rate + self.RATE_STEP)
                     self.player.set_rate(self.playback_rate)
-                    print(f'Speed up -> {self.playback_rate:.2f}x ({action})')
+                    log.info('Speed up', rate=round(self.playback_rate, 2), action=action)
                     self.last_action_time['rate'] = now
             
             elif 'Slow Down' in action:
                 if (now - self.last_action_time['rate']) > self.ACTION_COOLDOWN:
                     self.playback_rate = max(0.25, self.playback_rate - self.RATE_STEP)
                     self.player.set_rate(self.playback_rate)
-                    print(f'Speed down -> {self.playback_rate:.2f}x ({action})')
+                    log.info('Speed down', rate=round(self.playback_rate, 2), action=action)
                     self.last_action_time['rate'] = now
             
             self._update_state_label()
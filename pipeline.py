@@ -0,0 +1,306 @@
+import time
+import queue
+import threading
+import multiprocessing
+
+import numpy as np
+
+
+MODES = ('inline', 'thread', 'process')
+QUEUE_SIZE = 2               # Items buffered between two runners
+POLL_INTERVAL = 0.1          # Seconds a runner blocks on a queue before checking for stop
+STATS_INTERVAL = 1.0         # Seconds between stage timing reports from each runner
+
+
+class StopPipeline(Exception):
+    """Raised by a stage to end the pipeline.
+
+    From the source it ends the stream: items already in flight are still
+    processed. From any other stage (e.g. 'q' pressed in a window) it stops
+    every runner at once.
+    """
+
+
+class _EndOfStream:
+    """Sent downstream after the last item."""
+
+
+class Stage:
+    """One step of a Pipeline.
+
+    ``__init__`` should only keep plain configuration: a stage placed in a
+    process is pickled before it starts. Working state (models, windows,
+    buffers) is created in ``open``, which runs wherever the stage is placed
+    and receives the pipeline's shared resources (empty in a process, apart
+    from ``in_flight``). ``process`` returns the item for the next stage, or
+    None to drop it. The first stage is the source: it is called with None and
+    returns new items.
+
+    ``droppable`` says whether items waiting for this stage may be discarded
+    (oldest first) when its input queue is full, instead of blocking the
+    upstream runner. Frames can be skipped; gesture updates cannot.
+    """
+
+    name = 'stage'
+    droppable = False
+
+    def open(self, resources):
+        pass
+
+    def process(self, item):
+        return item
+
+    def close(self):
+        pass
+
+
+class BufferPool:
+    """Round-robin set of reusable arrays.
+
+    A stage that hands its buffers downstream needs as many of them as there
+    can be items in flight (``resources['in_flight']``), so a buffer is not
+    overwritten while another runner still reads it. New arrays are only
+    allocated when the shape changes.
+    """
+
+    def __init__(self, count):
+        self.buffers = [None] * max(1, int(count))
+        self.index = 0
+
+    def get(self, shape, dtype=np.uint8):
+        index = self.index
+        self.index = (index + 1) % len(self.buffers)
+        buffer = self.buffers[index]
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self.buffers[index] = np.empty(shape, dtype=dtype)
+        return buffer
+
+
+def parse_placement(spec):
+    """Parses "detect=process,render=thread" into {'detect': 'process', 'render': 'thread'}."""
+    placement = {}
+    for part in (spec or '').split(','):
+        if not part.strip():
+            continue
+        name, _, mode = part.partition('=')
+        mode = mode.strip().lower()
+        if mode not in MODES:
+            raise ValueError(f"unknown placement {part.strip()!r} (modes: {', '.join(MODES)})")
+        placement[name.strip()] = mode
+    return placement
+
+
+def _put(outq, item, droppable, stop, counters):
+    """Hands an item to the next runner; drops the oldest waiting one instead of blocking if allowed."""
+    if droppable:
+        while not stop.is_set():
+            try:
+                outq.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    outq.get_nowait()
+                    counters[3] += 1
+                except queue.Empty:
+                    pass
+        return
+    while not stop.is_set():
+        try:
+            outq.put(item, timeout=POLL_INTERVAL)
+            return
+        except queue.Full:
+            pass
+
+
+def _run_segment(stages, inq, outq, droppable, stop, report, resources, profiler=None, tick=None):
+    """Runs a chain of stages on the current thread until the stream ends or ``stop`` is set."""
+    timings = {stage.name: [0, 0.0, 0.0, 0] for stage in stages}
+    last_report = time.perf_counter()
+    opened = []
+    ended = False
+    try:
+        for stage in stages:
+            stage.open(resources)
+            opened.append(stage)
+        while not stop.is_set():
+            if tick is not None:
+                tick()
+            if inq is None:
+                item = None
+            else:
+                try:
+                    item = inq.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if isinstance(item, _EndOfStream):
+                    ended = True
+                    break
+
+            for stage in stages:
+                counters = timings[stage.name]
+                start = time.perf_counter()
+                if profiler is not None:
+                    with profiler.stage(stage.name):
+                        item = stage.process(item)
+                else:
+                    item = stage.process(item)
+                elapsed = time.perf_counter() - start
+                counters[0] += 1
+                counters[1] += elapsed
+                if elapsed > counters[2]:
+                    counters[2] = elapsed
+                if item is None:
+                    break
+
+            if item is not None and outq is not None:
+                _put(outq, item, droppable, stop, counters)
+            now = time.perf_counter()
+            if now - last_report >= STATS_INTERVAL:
+                report(timings)
+                last_report = now
+    except StopPipeline:
+        # The source ends the stream; anything downstream stops everyone.
+        ended = inq is None
+        if not ended:
+            stop.set()
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for stage in reversed(opened):
+            stage.close()
+        report(timings)
+        if outq is not None:
+            if ended and not stop.is_set():
+                _put(outq, _EndOfStream(), False, stop, [0, 0.0, 0.0, 0])
+            if hasattr(outq, 'cancel_join_thread') and stop.is_set():
+                # Nobody will read what is left; do not wait for it on exit
+                outq.cancel_join_thread()
+
+
+class Pipeline:
+    """Stages connected by bounded queues, each placed inline, on a thread or in a process.
+
+    Consecutive stages run together on one runner: a stage placed on a
+    thread or in a process starts a new runner, and the inline stages after
+    it join that runner. The first runner (with the source) runs on the
+    thread that calls ``run``. Every runner times its stages; ``stats``
+    returns the totals.
+    """
+
+    def __init__(self, stages, placement=None, queue_size=QUEUE_SIZE, resources=None, profiler=None):
+        placement = dict(placement or {})
+        names = [stage.name for stage in stages]
+        unknown = set(placement) - set(names)
+        if unknown:
+            raise ValueError(f"unknown stage(s) {', '.join(sorted(unknown))} (stages: {', '.join(names)})")
+        if placement.get(names[0], 'inline') != 'inline':
+            raise ValueError(f"the source stage {names[0]!r} always runs inline")
+        self.stages = stages
+        self.placement = placement
+        self.queue_size = max(1, int(queue_size))
+        self.profiler = profiler
+
+        self.segments = [[stages[0]]]
+        self.modes = ['inline']
+        for stage in stages[1:]:
+            mode = placement.get(stage.name, 'inline')
+            if mode == 'inline':
+                self.segments[-1].append(stage)
+            else:
+                self.segments.append([stage])
+                self.modes.append(mode)
+
+        self.uses_processes = 'process' in self.modes
+        self.in_flight = self.queue_size * (len(self.segments) - 1) + len(self.segments) + 1
+        self.resources = dict(resources or {}, in_flight=self.in_flight)
+        self._timings = {name: [0, 0.0, 0.0, 0] for name in names}
+        self._lock = threading.Lock()
+        self._stats_queue = multiprocessing.Queue() if self.uses_processes else None
+        self._stop = multiprocessing.Event() if self.uses_processes else threading.Event()
+        self._errors = []
+
+    def _report(self, timings):
+        with self._lock:
+            for name, counters in timings.items():
+                self._timings[name] = list(counters)
+
+    def stats(self):
+        """Returns {stage: {'count', 'mean_ms', 'max_ms', 'dropped'}} in pipeline order."""
+        if self._stats_queue is not None:
+            while True:
+                try:
+                    self._report(self._stats_queue.get_nowait())
+                except queue.Empty:
+                    break
+        with self._lock:
+            return {
+                name: {
+                    'count': count,
+                    'mean_ms': round(total / count * 1000.0, 3) if count else 0.0,
+                    'max_ms': round(worst * 1000.0, 3),
+                    'dropped': dropped,
+                }
+                for name, (count, total, worst, dropped) in self._timings.items()
+            }
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_thread(self, *args):
+        try:
+            _run_segment(*args)
+        except BaseException as e:
+            self._errors.append(e)
+            raise
+
+    def run(self, tick=None):
+        """Runs until the source ends, a stage raises StopPipeline or ``stop`` is called.
+
+        ``tick`` is called once per source item on the calling thread (e.g. to
+        poll a profiler that must run there).
+        """
+        queues = []
+        for mode in self.modes[1:]:
+            if self.uses_processes:
+                queues.append(multiprocessing.Queue(self.queue_size))
+            else:
+                queues.append(queue.Queue(self.queue_size))
+
+        runners = []
+        for index in range(1, len(self.segments)):
+            segment = self.segments[index]
+            inq = queues[index - 1]
+            outq = queues[index] if index < len(queues) else None
+            droppable = index + 1 < len(self.segments) and self.segments[index + 1][0].droppable
+            name = '+'.join(stage.name for stage in segment)
+            if self.modes[index] == 'process':
+                runner = multiprocessing.Process(
+                    target=_run_segment, name=f"pipeline-{name}", daemon=True,
+                    args=(segment, inq, outq, droppable, self._stop, self._stats_queue.put,
+                          {'in_flight': self.in_flight}))
+            else:
+                runner = threading.Thread(
+                    target=self._run_thread, name=f"pipeline-{name}", daemon=True,
+                    args=(segment, inq, outq, droppable, self._stop, self._report, self.resources,
+                          self.profiler))
+            runner.start()
+            runners.append(runner)
+
+        outq = queues[0] if queues else None
+        droppable = len(self.segments) > 1 and self.segments[1][0].droppable
+        try:
+            _run_segment(self.segments[0], None, outq, droppable, self._stop, self._report,
+                         self.resources, self.profiler, tick)
+        finally:
+            for runner in runners:
+                runner.join(timeout=None if not self._stop.is_set() else 2.0)
+                if isinstance(runner, multiprocessing.Process) and runner.is_alive():
+                    runner.terminate()
+            self._stop.set()
+
+        failed = [r for r in runners if isinstance(r, multiprocessing.Process) and r.exitcode]
+        if self._errors:
+            raise self._errors[0]
+        if failed:
+            raise RuntimeError(f"pipeline process {failed[0].name} exited with code {failed[0].exitcode}")
@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import pstats
+import argparse
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+
+
+PROFILE_ENV = 'MAESTRO_PROFILE'          # e.g. "cprofile:30" or "sample:60"
+PROFILE_DIR_ENV = 'MAESTRO_PROFILE_DIR'
+MODES = ('cprofile', 'sample')
+DEFAULT_MODE = 'cprofile'
+DEFAULT_SECONDS = 30.0
+SAMPLE_INTERVAL = 0.005                  # Seconds between stack samples
+MEMORY_TOP = 30                          # Lines in the tracemalloc diff report
+
+
+def default_profile_dir():
+    return os.environ.get(PROFILE_DIR_ENV) or os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), 'profiles')
+
+
+def parse_spec(spec):
+    """Parses "mode[:seconds]" (e.g. "sample:60"). Returns (mode, seconds) or None."""
+    if not spec:
+        return None
+    mode, _, seconds = spec.partition(':')
+    mode = mode.strip().lower() or DEFAULT_MODE
+    if mode not in MODES:
+        raise ValueError(f"unknown profiler {mode!r} (choose from {', '.join(MODES)})")
+    try:
+        return mode, float(seconds) if seconds else DEFAULT_SECONDS
+    except ValueError:
+        raise ValueError(f"profile length {seconds!r} is not a number of seconds") from None
+
+
+def profile_arg(spec):
+    """argparse ``type`` for --profile: rejects a bad spec with a usage error."""
+    try:
+        return parse_spec(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def parse_env_spec(log):
+    """parse_spec of $MAESTRO_PROFILE; a bad value is reported to ``log`` and ignored."""
+    spec = os.environ.get(PROFILE_ENV)
+    try:
+        return parse_spec(spec)
+    except ValueError as e:
+        log.error(f"Ignoring {PROFILE_ENV}={spec!r}: {e}")
+        return None
+
+
+class _NullStage:
+    """Shared no-op context manager returned while profiling is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        tid = threading.get_ident()
+        stages = self.profiler.current_stage
+        self.outer = stages.get(tid)
+        stages[tid] = self.name
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.profiler.current_stage[threading.get_ident()] = self.outer
+        totals = self.profiler.stage_times[self.name]
+        totals[0] += 1
+        totals[1] += elapsed
+        totals[2] = max(totals[2], elapsed)
+        return False
+
+
+class Profiler:
+    """Time-boxed cProfile or sampling profile plus a tracemalloc diff.
+
+    While inactive, ``stage`` returns a shared no-op context manager and
+    ``poll`` is a single attribute check, so leaving the hooks in the hot path
+    costs nothing measurable. ``start`` and ``poll`` must be called from the
+    thread being profiled (cProfile hooks are per-thread).
+    """
+
+    def __init__(self, name, out_dir=None):
+        self.name = name
+        self.out_dir = out_dir or default_profile_dir()
+        self.active = False
+        self.mode = None
+        self.deadline = None
+        self.current_stage = {}
+        self.stage_times = defaultdict(lambda: [0, 0.0, 0.0])
+        self.last_files = []
+        self._profile = None
+        self._samples = None
+        self._sampler = None
+        self._stop_sampler = threading.Event()
+        self._started_tracemalloc = False
+        self._snapshot = None
+
+    def stage(self, name):
+        """Tags the enclosed block as a pipeline stage (timed and used to label samples)."""
+        if not self.active:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def start(self, mode=DEFAULT_MODE, seconds=DEFAULT_SECONDS):
+        if self.active:
+            return
+        if mode not in MODES:
+            raise ValueError(f"unknown profiler {mode!r}")
+        self.mode = mode
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.current_stage.clear()
+        self.stage_times.clear()
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._snapshot = tracemalloc.take_snapshot()
+
+        if mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._samples = Counter()
+            self._stop_sampler.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, args=(threading.get_ident(),),
+                                             name='profiler-sampler', daemon=True)
+            self._sampler.start()
+        self.active = True
+
+    def poll(self):
+        """Stops and writes the results once the time box has elapsed."""
+        if self.active and self.deadline is not None and time.monotonic() >= self.deadline:
+            return self.stop()
+        return None
+
+    def stop(self):
+        """Stops profiling and writes the result files. Returns their paths."""
+        if not self.active:
+            return []
+        self.active = False
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._stop_sampler.set()
+            self._sampler.join(timeout=1)
+
+        memory = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S') + f"{time.time() % 1:.3f}"[1:]
+        base = os.path.join(self.out_dir, f"{self.name}-{stamp}-{os.getpid()}")
+        files = []
+
+        if self._profile is not None:
+            self._profile.dump_stats(base + '.pstats')
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                pstats.Stats(self._profile, stream=f).sort_stats('cumulative').print_stats(40)
+            files += [base + '.pstats', base + '.txt']
+        if self._samples is not None:
+            # Collapsed-stack format, readable by flamegraph.pl / speedscope
+            with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            files.append(base + '.collapsed')
+
+        with open(base + '-memory.txt', 'w', encoding='utf-8') as f:
+            for stat in memory.compare_to(self._snapshot, 'lineno')[:MEMORY_TOP]:
+                f.write(f"{stat}\n")
+        files.append(base + '-memory.txt')
+
+        stages = {name: {'count': n, 'total_s': round(total, 6), 'max_ms': round(worst * 1000, 3),
+                         'mean_ms': round(total / n * 1000, 3) if n else 0.0}
+                  for name, (n, total, worst) in self.stage_times.items()}
+        with open(base + '-stages.json', 'w', encoding='utf-8') as f:
+            json.dump(stages, f, indent=2)
+        files.append(base + '-stages.json')
+
+        self._profile = None
+        self._samples = None
+        self._sampler = None
+        self._snapshot = None
+        self.last_files = files
+        return files
+
+    def _sample_loop(self, target_tid):
+        while not self._stop_sampler.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(target_tid)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stage = self.current_stage.get(target_tid) or 'other'
+            self._samples[stage + ';' + ';'.join(reversed(stack))] += 1
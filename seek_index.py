@@ -0,0 +1,295 @@
+import os
+import sys
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from event_log import get_log
+from track_analysis import cache_key, default_cache_dir
+
+
+INDEX_VERSION = 1
+INDEXABLE_EXTENSIONS = ('.mp3', '.mp2', '.mpga')
+CHUNK_SIZE = 1 << 16     # Bytes read from the file at a time
+LOOKAHEAD = 1 << 13      # Bytes kept ahead of the parser (longest frame plus the next header)
+
+# MPEG audio header tables, by version (1, 2, 2.5) and layer (I, II, III)
+BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+BITRATES[(2, 3)] = BITRATES[(2, 2)]
+SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+VERSIONS = {0: 2.5, 2: 2, 3: 1}     # Header bits -> MPEG version (1 is reserved)
+LAYERS = {1: 3, 2: 2, 3: 1}         # Header bits -> layer (0 is reserved)
+
+log = get_log('controller')
+
+
+def parse_header(buf, pos):
+    """Parses the MPEG audio frame header at ``buf[pos]``.
+
+    Returns (frame_bytes, samples, sample_rate, stream_id) or None when there
+    is no valid header there. Frames of one stream share the stream_id.
+    Free-format frames are not supported (they have no length in the header).
+    """
+    b0, b1, b2, b3 = buf[pos], buf[pos + 1], buf[pos + 2], buf[pos + 3]
+    if b0 != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version = VERSIONS.get((b1 >> 3) & 3)
+    layer = LAYERS.get((b1 >> 1) & 3)
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    rate = SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        return (12 * bitrate // rate + padding) * 4, 384, rate, (version, layer, rate)
+    if layer == 3 and version != 1:
+        return 72 * bitrate // rate + padding, 576, rate, (version, layer, rate)
+    return 144 * bitrate // rate + padding, 1152, rate, (version, layer, rate)
+
+
+def is_info_frame(buf, pos, stream_id):
+    """True for a Xing/Info/VBRI tag frame, which carries no audio."""
+    version, layer, _ = stream_id
+    if layer != 3:
+        return False
+    mono = buf[pos + 3] >> 6 == 3
+    side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+    return (bytes(buf[pos + 4 + side_info:pos + 8 + side_info]) in (b'Xing', b'Info')
+            or bytes(buf[pos + 36:pos + 40]) == b'VBRI')
+
+
+def id3v2_size(header):
+    """Length of an ID3v2 tag from its 10-byte header (0 if there is none)."""
+    if len(header) < 10 or header[:3] != b'ID3':
+        return 0
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def build_index(path, chunk_size=CHUNK_SIZE):
+    """Indexes every audio frame of an MPEG audio file, reading it in chunks.
+
+    Returns a dict with the byte offset and start time (seconds) of each
+    frame, the offset where the audio starts (after an ID3v2 tag), the file
+    size and the duration. The parser locks onto a stream only where two
+    consecutive headers agree, and resynchronizes the same way after
+    damaged data, so stray sync bytes in tags or artwork are skipped.
+    """
+    st = os.stat(path)
+    offsets = array('q')
+    times = array('d')
+    total_samples = 0
+    sample_rate = 0
+    stream = None
+    with open(path, 'rb') as f:
+        audio_start = id3v2_size(f.read(10))
+        f.seek(audio_start)
+        buf = b''
+        base = audio_start    # File offset of buf[0]
+        pos = 0
+        eof = False
+        while True:
+            if not eof and len(buf) - pos < LOOKAHEAD:
+                buf = buf[pos:]
+                base += pos
+                pos = 0
+                # Several small chunks may be needed to hold a whole frame
+                while not eof and len(buf) < LOOKAHEAD:
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buf += chunk
+            if len(buf) - pos < 4:
+                break
+            header = parse_header(buf, pos)
+            if header is not None and stream is not None and header[3] != stream:
+                header = None
+            if header is not None and stream is None:
+                # Not locked yet: the next frame must start right after this one
+                following = pos + header[0]
+                if following + 4 <= len(buf):
+                    header2 = parse_header(buf, following)
+                    if header2 is None or header2[3] != header[3]:
+                        header = None
+                elif not eof:
+                    # Longer than any real frame: the lookahead holds a whole one
+                    header = None
+            if header is None:
+                stream = None
+                pos = buf.find(b'\xff', pos + 1)
+                if pos < 0:
+                    pos = len(buf)
+                continue
+
+            length, samples, rate, stream_id = header
+            if offsets or not is_info_frame(buf, pos, stream_id):
+                offsets.append(base + pos)
+                times.append(total_samples / rate)
+                total_samples += samples
+            stream = stream_id
+            sample_rate = rate
+            pos += length
+
+    return {
+        'version': INDEX_VERSION,
+        'key': cache_key(path, st),
+        'audio_start': audio_start,
+        'size': st.st_size,
+        'duration': total_samples / sample_rate if sample_rate else 0.0,
+        'offsets': np.frombuffer(offsets, dtype=np.int64),
+        'times': np.frombuffer(times, dtype=np.float64),
+    }
+
+
+class SeekIndex:
+    """Frame offsets and times of one file, for seeking by byte position."""
+
+    def __init__(self, data):
+        self.offsets = np.asarray(data['offsets'], dtype=np.int64)
+        self.times = np.asarray(data['times'], dtype=np.float64)
+        self.audio_start = int(data['audio_start'])
+        self.size = int(data['size'])
+        self.duration_ms = int(float(data['duration']) * 1000)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def frame_at(self, ms):
+        """Returns (byte_offset, start_ms) of the frame playing at ``ms``."""
+        i = int(np.searchsorted(self.times, ms / 1000.0, side='right')) - 1
+        i = max(0, min(len(self.offsets) - 1, i))
+        return int(self.offsets[i]), int(self.times[i] * 1000)
+
+    def position_for(self, ms):
+        """Player position (0-1) that starts exactly at the frame playing at ``ms``.
+
+        VLC maps a position linearly onto the bytes after the ID3v2 tag, so
+        this lands on the frame boundary even in VBR files, where seeking by
+        time only estimates the offset from the average bitrate.
+        """
+        offset, _ = self.frame_at(ms)
+        return (offset - self.audio_start) / max(1, self.size - self.audio_start)
+
+    def time_at(self, position):
+        """Start (ms) of the frame at player position ``position`` (0-1).
+
+        The inverse of ``position_for``: in VBR files this is exact where the
+        player's own time is only estimated from the average bitrate.
+        """
+        offset = self.audio_start + position * (self.size - self.audio_start)
+        i = int(np.searchsorted(self.offsets, offset, side='right')) - 1
+        i = max(0, min(len(self.offsets) - 1, i))
+        return int(self.times[i] * 1000)
+
+
+def seek(player, index, ms):
+    """Seeks ``player`` to ``ms`` through ``index``, or by time when there is no index."""
+    if index is None or not len(index):
+        player.set_time(int(ms))
+    else:
+        player.set_position(index.position_for(ms))
+
+
+class SeekIndexCache:
+    """On-disk seek indexes next to the track analyses, built by a background thread.
+
+    Indexes are stored as "<key>.seek.npz" in the analysis cache directory,
+    under the same path/mtime/size key, so an edited file is indexed again.
+    ``lookup`` is cheap enough to call on every seek.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self._indexes = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _file_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.seek.npz")
+
+    def lookup(self, path):
+        """Returns the SeekIndex for the current version of ``path``, or None."""
+        try:
+            key = cache_key(path)
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._indexes:
+                return self._indexes[key]
+        try:
+            with np.load(self._file_for(key)) as data:
+                if int(data['version']) != INDEX_VERSION:
+                    return None
+                index = SeekIndex(data)
+        except (OSError, ValueError, KeyError):
+            return None
+        with self._lock:
+            self._indexes[key] = index
+        return index
+
+    def submit(self, paths):
+        """Schedules indexing for MPEG audio files that have no index yet."""
+        for path in paths:
+            if not str(path).lower().endswith(INDEXABLE_EXTENSIONS):
+                continue
+            if self.lookup(path) is not None:
+                continue
+            try:
+                key = cache_key(path)
+            except OSError:
+                continue
+            with self._lock:
+                if key in self._pending:
+                    continue
+                self._pending.add(key)
+                if self._executor is None:
+                    # Indexing is mostly file reading; one thread keeps the disk sequential
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='seek-index')
+                future = self._executor.submit(build_index, str(path))
+            future.add_done_callback(lambda f, key=key, path=path: self._on_done(key, path, f))
+
+    def _on_done(self, key, path, future):
+        with self._lock:
+            self._pending.discard(key)
+        try:
+            data = future.result()
+        except Exception as e:
+            log.error(f"Seek index failed for {path}: {e}")
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._file_for(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.savez(f, **data)
+            os.replace(tmp, self._file_for(key))
+        except OSError as e:
+            log.error(f"Could not write seek index for {path}: {e}")
+        with self._lock:
+            self._indexes[key] = SeekIndex(data)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    """Indexes the given files and prints their frame count and duration."""
+    for path in sys.argv[1:]:
+        index = SeekIndex(build_index(path))
+        print(f"{os.path.basename(path)}: {len(index)} frames, {index.duration_ms / 1000:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
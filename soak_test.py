@@ -0,0 +1,449 @@
+import os
+import sys
+import enum
+import math
+import time
+import types
+import random
+import argparse
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+SCENARIOS = {                # Scenario -> controller mode
+    'mixed': 'static',       # Volume/speed gestures changing twice a second, jittering wrists
+    'slider': 'slider',      # One slider gesture held for the whole run, hand sweeping
+    'flood': 'static',       # A different random gesture and performer on every event
+}
+DEFAULT_RATE = 30.0          # Tracker lines per second
+HEARTBEAT_INTERVAL = 0.1     # Seconds between synthetic heartbeats
+FEED_TICK = 0.005            # Seconds between writes of the synthetic tracker
+PROBE_MS = 20                # Event-loop lag probe interval
+WARMUP_FRACTION = 0.1        # Part of the run before the memory baseline is taken
+STUB_LENGTH_MS = 180000      # Length of the stub player's "track"
+
+# Default failure thresholds
+MAX_LAG_MS = 100.0           # 99th percentile event-loop lag
+MAX_DEPTH = 64               # Mailbox depth at any probe
+MAX_LATENCY_MS = 250.0       # 99th percentile line-to-dispatch latency
+MAX_GROWTH_MB = 20.0         # Resident memory growth after warm-up
+
+GESTURES = ('One Finger', 'Two Fingers', 'Three Fingers', 'Four Fingers', 'Open Hand', 'Closed Fist')
+
+
+class Histogram:
+    """Fixed-memory histogram of millisecond values (0.1 ms bins up to ``max_ms``).
+
+    Long runs at thousands of events per second would otherwise grow the
+    harness itself and blur the memory measurement.
+    """
+
+    def __init__(self, max_ms=10000.0, resolution_ms=0.1):
+        self.resolution = resolution_ms
+        self.bins = np.zeros(int(max_ms / resolution_ms) + 1, dtype=np.int64)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, ms):
+        index = min(len(self.bins) - 1, max(0, int(ms / self.resolution)))
+        self.bins[index] += 1
+        self.count += 1
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100.0)
+        return round(float(np.searchsorted(np.cumsum(self.bins), rank)) * self.resolution, 1)
+
+
+def rss_bytes():
+    """Resident set size of this process (psutil, /proc, or the peak from getrusage)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StubState(enum.IntEnum):
+    """``vlc.State`` (libvlc_state_t), for running without python-vlc."""
+    NothingSpecial = 0
+    Opening = 1
+    Buffering = 2
+    Playing = 3
+    Paused = 4
+    Stopped = 5
+    Ended = 6
+    Error = 7
+
+
+def import_vlc():
+    """Returns the vlc module, or a stand-in with only ``State`` when it cannot be loaded.
+
+    The stand-in is registered as ``vlc`` so the controller imports it too;
+    the stub player and instance are all it is used with.
+    """
+    try:
+        import vlc
+    except (ImportError, OSError):
+        vlc = types.SimpleNamespace(State=StubState)
+        sys.modules['vlc'] = vlc
+    return vlc
+
+
+class StubMedia:
+    def __init__(self, path):
+        self.path = path
+
+
+class StubPlayer:
+    """Stands in for a VLC media player: keeps the playback state, plays nothing."""
+
+    def __init__(self, vlc):
+        self.vlc = vlc
+        self.state = vlc.State.NothingSpecial
+        self.media = None
+        self.volume = 100
+        self.rate = 1.0
+        self.position_ms = 0.0
+        self.started = None
+
+    def _advance(self):
+        if self.started is not None:
+            now = time.monotonic()
+            self.position_ms = min(STUB_LENGTH_MS, self.position_ms + (now - self.started) * 1000.0 * self.rate)
+            self.started = now
+
+    def set_media(self, media):
+        self.media = media
+        self.position_ms = 0.0
+
+    def play(self):
+        self.state = self.vlc.State.Playing
+        self.started = time.monotonic()
+        return 0
+
+    def pause(self):
+        self._advance()
+        self.started = None
+        self.state = self.vlc.State.Paused
+
+    def stop(self):
+        self.started = None
+        self.position_ms = 0.0
+        self.state = self.vlc.State.Stopped
+
+    def get_state(self):
+        self._advance()
+        if self.state == self.vlc.State.Playing and self.position_ms >= STUB_LENGTH_MS:
+            self.state = self.vlc.State.Ended
+        return self.state
+
+    def is_playing(self):
+        return int(self.get_state() == self.vlc.State.Playing)
+
+    def audio_get_volume(self):
+        return self.volume
+
+    def audio_set_volume(self, volume):
+        self.volume = int(volume)
+        return 0
+
+    def get_rate(self):
+        return self.rate
+
+    def set_rate(self, rate):
+        self._advance()
+        self.rate = float(rate)
+        return 0
+
+    def get_time(self):
+        self._advance()
+        return int(self.position_ms)
+
+    def set_time(self, ms):
+        self._advance()
+        self.position_ms = float(max(0, min(STUB_LENGTH_MS, ms)))
+
+    def get_length(self):
+        return STUB_LENGTH_MS
+
+    def get_position(self):
+        return self.get_time() / STUB_LENGTH_MS
+
+
+class StubInstance:
+    """The part of ``vlc.Instance`` the controller uses."""
+
+    def __init__(self, vlc):
+        self.vlc = vlc
+
+    def media_new(self, path):
+        return StubMedia(path)
+
+    def media_player_new(self):
+        return StubPlayer(self.vlc)
+
+    def release(self):
+        pass
+
+
+def _hand(prefix, gesture, x, y):
+    return f"{prefix}_Gesture:{gesture}|{prefix}_X:{int(x)}|{prefix}_Y:{int(y)}"
+
+
+def synthetic_line(scenario, t, rng):
+    """One tracker line for time ``t`` (seconds since start) of a scenario."""
+    if scenario == 'slider':
+        # Left hand opens once to start playback; the right hand then holds the rate slider
+        left = _hand('L', 'Open Hand', 160, 240) if t < 1.0 else 'L_Gesture:No Hand'
+        x = 320 + 200 * math.sin(t * 0.7) + rng.uniform(-3, 3)
+        return f"{left}|{_hand('R', 'Open Hand', x, 240 + rng.uniform(-3, 3))}"
+    if scenario == 'flood':
+        if rng.random() < 0.01:
+            return "No hands detected."
+        performer = rng.randrange(3)
+        prefix = f"P:{performer}|" if performer else ''
+        return (f"{prefix}{_hand('L', rng.choice(GESTURES), rng.uniform(0, 640), rng.uniform(0, 480))}|"
+                f"{_hand('R', rng.choice(GESTURES), rng.uniform(0, 640), rng.uniform(0, 480))}")
+    # mixed: a new gesture pair every half second, wrists jittering
+    step = int(t * 2)
+    if step % 20 == 19:
+        return "No hands detected."
+    left = GESTURES[step % 4]
+    right = GESTURES[(step // 4) % 4]
+    return f"{_hand('L', left, 160 + rng.uniform(-4, 4), 240)}|{_hand('R', right, 480 + rng.uniform(-4, 4), 240)}"
+
+
+def feed(args):
+    """Synthetic tracker: prints scenario lines at ``--rate`` per second, plus heartbeats."""
+    rng = random.Random(args.seed)
+    start = time.monotonic()
+    sent = 0
+    heartbeat_seq = 0
+    next_heartbeat = start
+    out = sys.stdout
+    try:
+        while True:
+            now = time.monotonic()
+            due = int((now - start) * args.rate) - sent
+            lines = []
+            if now >= next_heartbeat:
+                lines.append(f"Heartbeat:{heartbeat_seq}|FPS:{args.rate:.1f}")
+                heartbeat_seq += 1
+                next_heartbeat = now + HEARTBEAT_INTERVAL
+            stamp = time.time()
+            for _ in range(due):
+                line = synthetic_line(args.scenario, now - start, rng)
+                # The controller ignores unknown parts; the harness reads this one
+                lines.append(f"{line}|Sent:{stamp:.6f}" if '_Gesture:' in line else line)
+            sent += due
+            if lines:
+                out.write('\n'.join(lines) + '\n')
+                out.flush()
+            time.sleep(FEED_TICK)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    return 0
+
+
+class SoakMonitor:
+    """Samples event-loop lag, mailbox depth, dispatch latency and memory of a running controller."""
+
+    def __init__(self, core, scheduler, seconds):
+        self.core = core
+        self.scheduler = scheduler
+        self.seconds = seconds
+        self.lag = Histogram()
+        self.latency = Histogram()
+        self.max_depth = 0
+        self.depth_total = 0
+        self.probes = 0
+        self.handled = 0
+        self.rss_start = rss_bytes()
+        self.rss_baseline = None
+        self.rss_peak = self.rss_start
+        self.started = time.monotonic()
+        self._expected = None
+
+        handle_line = core._handle_line
+
+        def timed_handle_line(line):
+            handle_line(line)
+            self.handled += 1
+            index = line.rfind('|Sent:')
+            if index >= 0:
+                try:
+                    self.latency.add((time.time() - float(line[index + 6:])) * 1000.0)
+                except ValueError:
+                    pass
+
+        core._handle_line = timed_handle_line
+
+    def start(self):
+        self._expected = time.monotonic() + PROBE_MS / 1000.0
+        self.scheduler.after(PROBE_MS, self._probe)
+
+    def _probe(self):
+        now = time.monotonic()
+        self.lag.add(max(0.0, (now - self._expected) * 1000.0))
+        depth = self.core.mailbox.depth()
+        self.max_depth = max(self.max_depth, depth)
+        self.depth_total += depth
+        self.probes += 1
+        if self.probes % 50 == 0:
+            rss = rss_bytes()
+            self.rss_peak = max(self.rss_peak, rss)
+            if self.rss_baseline is None and now - self.started >= self.seconds * WARMUP_FRACTION:
+                self.rss_baseline = rss
+        self._expected = time.monotonic() + PROBE_MS / 1000.0
+        self.scheduler.after(PROBE_MS, self._probe)
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        rss_end = rss_bytes()
+        baseline = self.rss_baseline if self.rss_baseline is not None else self.rss_start
+        mailbox = self.core.mailbox.stats()
+        return {
+            'seconds': round(elapsed, 1),
+            'handled': self.handled,
+            'handled_per_second': round(self.handled / elapsed, 1) if elapsed else 0.0,
+            'coalesced': mailbox['coalesced'],
+            'dropped': mailbox['dropped'],
+            'lag_p50_ms': self.lag.percentile(50),
+            'lag_p99_ms': self.lag.percentile(99),
+            'lag_max_ms': round(self.lag.max, 1),
+            'depth_max': self.max_depth,
+            'depth_mean': round(self.depth_total / self.probes, 2) if self.probes else 0.0,
+            'latency_p50_ms': self.latency.percentile(50),
+            'latency_p99_ms': self.latency.percentile(99),
+            'latency_max_ms': round(self.latency.max, 1),
+            'rss_mb': round(rss_end / 2 ** 20, 1),
+            'growth_mb': round((rss_end - baseline) / 2 ** 20, 1),
+            'tracker_restarts': self.core.metrics['tracker_restarts'],
+        }
+
+
+def check(report, args):
+    """Returns the threshold violations of a report."""
+    failures = []
+    if report['lag_p99_ms'] > args.max_lag_ms:
+        failures.append(f"event-loop lag p99 {report['lag_p99_ms']:.1f} ms > {args.max_lag_ms} ms")
+    if report['depth_max'] > args.max_depth:
+        failures.append(f"mailbox depth {report['depth_max']} > {args.max_depth}")
+    if report['latency_p99_ms'] > args.max_latency_ms:
+        failures.append(f"dispatch latency p99 {report['latency_p99_ms']:.1f} ms > {args.max_latency_ms} ms")
+    if report['growth_mb'] > args.max_growth_mb:
+        failures.append(f"memory grew {report['growth_mb']:.1f} MB > {args.max_growth_mb} MB")
+    if report['tracker_restarts']:
+        failures.append(f"the watchdog restarted the tracker {report['tracker_restarts']} times")
+    if not report['handled']:
+        failures.append("no tracker lines were dispatched")
+    return failures
+
+
+def soak(args):
+    # Imported here so the synthetic tracker subprocess starts without VLC or Tk
+    vlc = import_vlc()
+    from controller_core import MaestroController, LoopScheduler, HeadlessView
+
+    settings = {
+        'TRACKER_COMMAND': [sys.executable, '-u', os.path.realpath(__file__), 'feed', '--rate', str(args.rate),
+                            '--scenario', args.scenario, '--seed', str(args.seed)],
+        'WATCHDOG_BUDGET_MS': args.watchdog_ms,
+    }
+    instance = StubInstance(vlc)
+
+    if args.headless:
+        scheduler = LoopScheduler()
+        core = MaestroController(scheduler, HeadlessView(), instance, settings)
+        core.start()
+        close = scheduler.stop
+        run = scheduler.run
+    else:
+        import tkinter as tk
+        from music_controller import MusicControllerGUI
+        root = tk.Tk()
+        app = MusicControllerGUI(root, instance=instance, settings=settings)
+        scheduler, core = root, app.core
+        close = app._on_close
+        run = root.mainloop
+
+    core.set_mode(SCENARIOS[args.scenario])
+    core.load_media('soak-test.stub')
+    core.play_manual()
+    monitor = SoakMonitor(core, scheduler, args.seconds)
+    monitor.start()
+    result = {}
+
+    def progress():
+        report = monitor.report()
+        print(f"{report['seconds']:>7.1f}s  handled {report['handled_per_second']:>7.1f}/s  "
+              f"lag p99 {report['lag_p99_ms']:.1f} ms  depth max {report['depth_max']}  "
+              f"latency p99 {report['latency_p99_ms']:.1f} ms  rss {report['rss_mb']} MB", flush=True)
+        scheduler.after(int(args.report_seconds * 1000), progress)
+
+    def finish():
+        result.update(monitor.report())
+        close()
+
+    if args.report_seconds > 0:
+        scheduler.after(int(args.report_seconds * 1000), progress)
+    scheduler.after(int(args.seconds * 1000), finish)
+    try:
+        run()
+    finally:
+        if args.headless:
+            core.shutdown()
+
+    print()
+    for key, value in result.items():
+        print(f"{key:>20}: {value}")
+    failures = check(result, args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS")
+    return 1 if failures else 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Soak/load test: drive the controller with a synthetic tracker and a stub player')
+    parser.add_argument('command', nargs='?', choices=('soak', 'feed'), default='soak',
+                        help='soak runs the test; feed is the synthetic tracker it starts')
+    parser.add_argument('--scenario', choices=list(SCENARIOS), default='mixed')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='tracker lines per second')
+    parser.add_argument('--seconds', type=float, default=60.0, help='length of the run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--headless', action='store_true',
+                        help='use the headless scheduler instead of the Tk GUI (no display needed)')
+    parser.add_argument('--report-seconds', type=float, default=10.0, help='progress line interval (0 = none)')
+    parser.add_argument('--watchdog-ms', type=int, default=2000,
+                        help='tracker watchdog budget; generous, so load does not count as a stall')
+    parser.add_argument('--max-lag-ms', type=float, default=MAX_LAG_MS)
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH)
+    parser.add_argument('--max-latency-ms', type=float, default=MAX_LATENCY_MS)
+    parser.add_argument('--max-growth-mb', type=float, default=MAX_GROWTH_MB)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'feed':
+        return feed(args)
+    return soak(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
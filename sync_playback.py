@@ -0,0 +1,632 @@
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import socket
+import argparse
+import itertools
+import threading
+import subprocess
+from collections import OrderedDict, deque
+from urllib.parse import unquote, urlparse
+
+from event_log import get_log
+from seek_index import SeekIndexCache, seek
+
+
+DEFAULT_PORT = 47800
+DEFAULT_LEAD = 0.1           # Seconds between sending a command and executing it everywhere
+REDUNDANCY = 2               # Copies of every command datagram (UDP may drop one)
+SYNC_INTERVAL = 0.5          # Seconds between clock-sync requests once settled
+SYNC_FAST_INTERVAL = 0.05    # ...and while a node is starting up
+SYNC_FAST_COUNT = 10
+SYNC_WINDOW = 16             # Sync samples kept; the one with the smallest round trip wins
+NODE_TIMEOUT = 3.0           # Nodes silent for longer stop receiving commands
+SPIN_MARGIN = 0.002          # The scheduler busy-waits for the last 2 ms before a deadline
+RAMP_STEP = 0.02             # Seconds between steps of a volume/rate ramp
+CATCH_UP_SEEK_DELAY = 0.25   # Seconds a joining node plays before it seeks (VLC ignores seeks while opening)
+MAX_DATAGRAM = 65507
+
+OPS = ('load', 'play', 'pause', 'stop', 'volume', 'rate', 'ramp', 'seek')
+RAMP_PARAMS = ('volume', 'rate')
+
+log = get_log('sync')
+
+
+def now():
+    return time.monotonic()
+
+
+def _encode(message):
+    return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    host, _, port = text.rpartition(':')
+    if not host:
+        return text, default_port
+    return host, int(port)
+
+
+class Scheduler:
+    """Runs callbacks at precise local times on a dedicated thread.
+
+    The thread sleeps on a condition until shortly before the earliest
+    deadline and busy-waits the rest, so callbacks fire within well under a
+    millisecond of their deadline.
+    """
+
+    def __init__(self, name='sync-scheduler'):
+        self._heap = []
+        self._counter = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.lateness = deque(maxlen=256)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def schedule(self, at, fn, *args):
+        with self._cond:
+            # The counter keeps commands with the same deadline in submission order
+            heapq.heappush(self._heap, (at, self._counter, fn, args))
+            self._counter += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                at = self._heap[0][0]
+                remaining = at - now() - SPIN_MARGIN
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                _, _, fn, args = heapq.heappop(self._heap)
+            while now() < at:
+                time.sleep(0)
+            self.lateness.append(now() - at)
+            try:
+                fn(*args)
+            except Exception as e:
+                log.error(f"Scheduled command failed: {e}")
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify()
+
+
+class ClockSync:
+    """NTP-style estimate of ``offset = master_clock - local_clock``.
+
+    Each exchange gives an offset and a round-trip delay; the sample with the
+    smallest delay in the recent window is the least distorted by queueing.
+    """
+
+    def __init__(self, window=SYNC_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.offset = 0.0
+        self.delay = None
+
+    @property
+    def ready(self):
+        return bool(self.samples)
+
+    def add(self, t0, t1, t2, t3):
+        """t0/t3: local send/receive times, t1/t2: master receive/send times."""
+        delay = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2.0
+        self.samples.append((delay, offset))
+        self.delay, self.offset = min(self.samples)
+
+    def to_local(self, master_time):
+        return master_time - self.offset
+
+    def to_master(self, local_time):
+        return local_time + self.offset
+
+
+class SyncMaster:
+    """Broadcasts timestamped commands to every player node that keeps in touch.
+
+    Nodes register implicitly by sending clock-sync requests. ``send`` stamps
+    a command with an execution time ``lead`` seconds ahead on the master
+    clock; nodes convert it to their own clock and execute it then. Every
+    message carries a random session id, so nodes can tell a restarted
+    master (whose sequence numbers start over) from the one they knew.
+    ``on_join(addr)`` is called for a node that registers or comes back
+    after ``NODE_TIMEOUT``, to bring it up to date.
+    """
+
+    def __init__(self, port=DEFAULT_PORT, host='0.0.0.0', lead=DEFAULT_LEAD):
+        self.lead = lead
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.nodes = {}
+        self.acks = OrderedDict()
+        self.session = random.getrandbits(32)
+        self.on_join = None
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._receive_loop, name='sync-master', daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def live_nodes(self):
+        cutoff = now() - NODE_TIMEOUT
+        with self._lock:
+            return {addr: node for addr, node in self.nodes.items() if node['last_seen'] >= cutoff}
+
+    def send(self, op, args=None, lead=None, nodes=None):
+        """Sends ``op`` to ``nodes`` (all live nodes); returns (seq, master time of execution)."""
+        if op not in OPS:
+            raise ValueError(f"unknown sync command {op!r}")
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self.acks[seq] = {}
+            while len(self.acks) > 256:
+                self.acks.popitem(last=False)
+        at = now() + (self.lead if lead is None else lead)
+        payload = _encode({'type': 'cmd', 'session': self.session, 'seq': seq, 'at': at, 'op': op,
+                           'args': args or {}})
+        for addr in self.live_nodes() if nodes is None else nodes:
+            for _ in range(REDUNDANCY):
+                try:
+                    self.sock.sendto(payload, addr)
+                except OSError as e:
+                    log.error(f"Could not send to player node {addr}: {e}")
+                    break
+        return seq, at
+
+    def _receive_loop(self):
+        while not self._stopped.is_set():
+            try:
+                data, addr = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            t1 = now()
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            kind = message.get('type')
+            if kind == 'sync':
+                with self._lock:
+                    node = self.nodes.setdefault(addr, {'name': message.get('name', str(addr))})
+                    joined = node.get('last_seen', -NODE_TIMEOUT) < t1 - NODE_TIMEOUT
+                    node['last_seen'] = t1
+                reply = {'type': 'sync_reply', 'session': self.session, 't0': message['t0'], 't1': t1}
+                reply['t2'] = now()
+                try:
+                    self.sock.sendto(_encode(reply), addr)
+                except OSError:
+                    pass
+                if joined and self.on_join is not None:
+                    try:
+                        self.on_join(addr)
+                    except Exception as e:
+                        log.error(f"Could not bring player node {addr} up to date: {e}")
+            elif kind == 'ack':
+                with self._lock:
+                    acks = self.acks.get(message['seq'])
+                    if acks is not None:
+                        acks[message.get('name', str(addr))] = message['executed_at']
+
+    def spread(self, seq):
+        """Returns (executed times by node, max - min in seconds) for command ``seq``."""
+        with self._lock:
+            acks = dict(self.acks.get(seq, {}))
+        if not acks:
+            return acks, None
+        return acks, max(acks.values()) - min(acks.values())
+
+    def close(self):
+        self._stopped.set()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class LogTarget:
+    """Player target that only records what it was told to do (tests, headless nodes)."""
+
+    def __init__(self, name='node'):
+        self.name = name
+        self.applied = []
+
+    def apply(self, op, args):
+        self.applied.append((op, args))
+
+
+class VlcTarget:
+    """Applies sync commands to a local VLC player; tracks are found by file name.
+
+    Each node indexes its own copy of a track for seeking, since the copies
+    need not be byte-identical to the master's.
+    """
+
+    def __init__(self, player, instance, music_dir):
+        self.player = player
+        self.instance = instance
+        self.music_dir = music_dir
+        self.path = None
+        self.seek_index = SeekIndexCache()
+
+    def apply(self, op, args):
+        if op == 'load':
+            path = os.path.join(self.music_dir, args['name'])
+            if not os.path.exists(path):
+                log.error(f"{args['name']} not found in {self.music_dir}")
+                return
+            self.path = path
+            self.seek_index.submit([path])
+            self.player.set_media(self.instance.media_new(path))
+        elif op == 'play':
+            self.player.play()
+        elif op == 'pause':
+            self.player.set_pause(1)
+        elif op == 'stop':
+            self.player.stop()
+        elif op == 'volume':
+            self.player.audio_set_volume(int(args['value']))
+        elif op == 'rate':
+            self.player.set_rate(float(args['value']))
+        elif op == 'seek':
+            seek(self.player, self.seek_index.lookup(self.path) if self.path else None, args['ms'])
+
+
+class PlayerNode:
+    """Receives commands from a SyncMaster and executes them on ``target`` on time.
+
+    Only datagrams from ``master_addr`` are accepted. Commands are told apart
+    by (session, seq); a new master session starts a fresh clock estimate
+    and duplicate window.
+    """
+
+    def __init__(self, master_addr, target, name=None):
+        host, port = master_addr
+        # Replies come from the resolved address, so resolve a host name once
+        self.master_addr = (socket.gethostbyname(host), port)
+        self.target = target
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.clock = ClockSync()
+        self.scheduler = Scheduler('sync-node')
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('0.0.0.0', 0))
+        self.sock.settimeout(0.2)
+        self._session = None
+        self._seen = deque(maxlen=512)
+        self._owners = {}    # param -> (session, seq) of the command that set it last
+        self._stopped = threading.Event()
+        self._threads = [threading.Thread(target=self._receive_loop, name='sync-recv', daemon=True),
+                         threading.Thread(target=self._sync_loop, name='sync-clock', daemon=True)]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _sync_loop(self):
+        sent = 0
+        while not self._stopped.is_set():
+            try:
+                self.sock.sendto(_encode({'type': 'sync', 't0': now(), 'name': self.name}), self.master_addr)
+            except OSError as e:
+                log.error(f"Could not reach sync master {self.master_addr}: {e}")
+            sent += 1
+            self._stopped.wait(SYNC_FAST_INTERVAL if sent < SYNC_FAST_COUNT else SYNC_INTERVAL)
+
+    def _receive_loop(self):
+        while not self._stopped.is_set():
+            try:
+                data, addr = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            t3 = now()
+            if addr[:2] != self.master_addr:
+                continue
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            kind = message.get('type')
+            if kind in ('sync_reply', 'cmd') and message.get('session') != self._session:
+                # A (re)started master: its clock and sequence numbers are new
+                self._session = message.get('session')
+                self.clock = ClockSync()
+                self._seen.clear()
+            if kind == 'sync_reply':
+                self.clock.add(message['t0'], message['t1'], message['t2'], t3)
+            elif kind == 'cmd' and message['seq'] not in self._seen:
+                self._seen.append(message['seq'])
+                self._on_command(message)
+
+    def _on_command(self, message):
+        # Before the first sync reply the offset is unknown; execute right away.
+        local_at = self.clock.to_local(message['at']) if self.clock.ready else now()
+        args = message['args']
+        if message['op'] == 'ramp':
+            param = args['param']
+            start, end, duration = float(args['from']), float(args['to']), float(args['duration'])
+            steps = max(1, int(round(duration / RAMP_STEP)))
+            self.scheduler.schedule(local_at, self._apply, message, param, {'value': start})
+            for k in range(1, steps + 1):
+                value = start + (end - start) * k / steps
+                self.scheduler.schedule(local_at + duration * k / steps, self._ramp_step,
+                                        (message['session'], message['seq']), param, value)
+        else:
+            self.scheduler.schedule(local_at, self._apply, message, message['op'], args)
+
+    def _ramp_step(self, command, param, value):
+        # A later volume/rate command or ramp takes the parameter over
+        if self._owners.get(param) == command:
+            self.target.apply(param, {'value': value})
+
+    def _apply(self, message, op, args):
+        executed_at = self.clock.to_master(now())
+        if op in RAMP_PARAMS:
+            self._owners[op] = (message['session'], message['seq'])
+        self.target.apply(op, args)
+        ack = {'type': 'ack', 'seq': message['seq'], 'name': self.name, 'executed_at': executed_at}
+        try:
+            self.sock.sendto(_encode(ack), self.master_addr)
+        except OSError:
+            pass
+
+    def close(self):
+        self._stopped.set()
+        self.scheduler.close()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class SyncedPlayer:
+    """Stands in for the VLC MediaPlayer used by MusicControllerGUI.
+
+    Every state change is broadcast to the player nodes and applied to the
+    local player at the same master time, so all rooms change together.
+    Getters answer from the local player, or from the last commanded value
+    while a change is still scheduled. Volume and rate follow the latest
+    command: a new value or ramp cuts short a ramp still in progress.
+    """
+
+    def __init__(self, player, master, lead=None):
+        self.player = player
+        self.master = master
+        self.lead = master.lead if lead is None else lead
+        self.scheduler = Scheduler('sync-local')
+        self._volume = player.audio_get_volume()
+        self._rate = player.get_rate()
+        self._ramps = {}     # param -> (at, duration, start, end) of the latest ramp
+        self._owners = {}    # param -> token of the command that set it last
+        self._tokens = itertools.count()
+        self._media_name = None
+        self._state = 'stop'
+        master.on_join = self._catch_up
+
+    def _send(self, op, local_fn, *local_args, **params):
+        # The master clock is this process's monotonic clock
+        _, at = self.master.send(op, params, self.lead)
+        self.scheduler.schedule(at, local_fn, *local_args)
+        return 0
+
+    def set_media(self, media):
+        self.player.set_media(media)
+        name = os.path.basename(unquote(urlparse(media.get_mrl()).path))
+        self._media_name = name
+        self._state = 'stop'
+        self.master.send('load', {'name': name}, self.lead)
+
+    def play(self):
+        self._state = 'play'
+        return self._send('play', self.player.play)
+
+    def pause(self):
+        self._state = 'pause'
+        return self._send('pause', self.player.set_pause, 1)
+
+    def stop(self):
+        self._state = 'stop'
+        return self._send('stop', self.player.stop)
+
+    def _catch_up(self, addr):
+        """Sends a node that just joined the current track, volume, rate and position.
+
+        Runs on the master's receive thread. A paused track is played muted
+        until the seek has landed, then paused and unmuted.
+        """
+        if self._media_name is None:
+            return
+        nodes = [addr]
+        volume, rate = self.audio_get_volume(), self.get_rate()
+        self.master.send('load', {'name': self._media_name}, self.lead, nodes)
+        self.master.send('rate', {'value': rate}, self.lead, nodes)
+        if self._state == 'stop':
+            self.master.send('volume', {'value': volume}, self.lead, nodes)
+            return
+        self.master.send('volume', {'value': volume if self._state == 'play' else 0}, self.lead, nodes)
+        self.master.send('play', {}, self.lead, nodes)
+        # Where the local player will be when the node seeks
+        lead = self.lead + CATCH_UP_SEEK_DELAY
+        ms = self.player.get_time() + (lead * 1000 * rate if self._state == 'play' else 0)
+        self.master.send('seek', {'ms': int(ms)}, lead, nodes)
+        if self._state == 'pause':
+            self.master.send('pause', {}, lead, nodes)
+            self.master.send('volume', {'value': volume}, lead, nodes)
+
+    def _setter(self, param):
+        return self.player.audio_set_volume if param == 'volume' else self.player.set_rate
+
+    def _claim(self, param, token, value):
+        self._owners[param] = token
+        self._setter(param)(value)
+
+    def _ramp_step(self, param, token, value):
+        if self._owners.get(param) == token:
+            self._setter(param)(value)
+
+    def _current(self, param):
+        """Value of ``param`` once a command sent now executes, mid-ramp included."""
+        ramp = self._ramps.get(param)
+        if ramp is None:
+            return self._volume if param == 'volume' else self._rate
+        at, duration, start, end = ramp
+        done = min(1.0, max(0.0, (now() + self.lead - at) / duration)) if duration > 0 else 1.0
+        return start + (end - start) * done
+
+    def audio_set_volume(self, volume):
+        self._volume = volume
+        self._ramps.pop('volume', None)
+        return self._send('volume', self._claim, 'volume', next(self._tokens), volume, value=volume)
+
+    def audio_get_volume(self):
+        return int(round(self._current('volume')))
+
+    def set_rate(self, rate):
+        self._rate = rate
+        self._ramps.pop('rate', None)
+        return self._send('rate', self._claim, 'rate', next(self._tokens), rate, value=rate)
+
+    def get_rate(self):
+        return self._current('rate')
+
+    def set_time(self, ms, position=None):
+        """Seeks every node to ``ms``; ``position`` seeks the local player by position instead."""
+        if position is not None:
+            return self._send('seek', self.player.set_position, position, ms=ms)
+        return self._send('seek', self.player.set_time, ms, ms=ms)
+
+    def ramp(self, param, to, duration):
+        """Ramps 'volume' or 'rate' from its current value on every node at once."""
+        start = self._current(param)
+        _, at = self.master.send('ramp', {'param': param, 'from': start, 'to': to, 'duration': duration}, self.lead)
+        token = next(self._tokens)
+        steps = max(1, int(round(duration / RAMP_STEP)))
+        for k in range(steps + 1):
+            value = start + (to - start) * k / steps
+            value = int(value) if param == 'volume' else value
+            if k == 0:
+                self.scheduler.schedule(at, self._claim, param, token, value)
+            else:
+                self.scheduler.schedule(at + duration * k / steps, self._ramp_step, param, token, value)
+        self._ramps[param] = (at, duration, start, to)
+        if param == 'volume':
+            self._volume = int(to)
+        else:
+            self._rate = to
+
+    def close(self):
+        self.scheduler.close()
+        self.master.close()
+
+    def __getattr__(self, name):
+        return getattr(self.player, name)
+
+
+def run_node(args):
+    if args.log:
+        target = LogTarget()
+    else:
+        import vlc
+        instance = vlc.Instance('--audio-filter=scaletempo', '--quiet')
+        target = VlcTarget(instance.media_player_new(), instance, args.music_dir)
+    node = PlayerNode(parse_address(args.master), target, args.name).start()
+    print(f"INFO: Player node {node.name} following {args.master}")
+    try:
+        while True:
+            time.sleep(1.0)
+            if args.log and target.applied:
+                print(f"INFO: applied {len(target.applied)} commands, clock offset "
+                      f"{node.clock.offset * 1000:+.3f} ms, delay {(node.clock.delay or 0) * 1000:.3f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        node.close()
+
+
+def run_selftest(args):
+    """Starts a master and several node processes on localhost and measures skew."""
+    master = SyncMaster(port=0, host='127.0.0.1', lead=args.lead_ms / 1000.0)
+    host, port = master.address
+    script = os.path.realpath(__file__)
+    procs = [subprocess.Popen([sys.executable, script, 'node', '--master', f'{host}:{port}', '--log',
+                               '--name', f'node{i}'], stdout=subprocess.DEVNULL)
+             for i in range(args.nodes)]
+    try:
+        deadline = now() + 10.0
+        while len(master.live_nodes()) < args.nodes and now() < deadline:
+            time.sleep(0.05)
+        time.sleep(SYNC_FAST_INTERVAL * SYNC_FAST_COUNT)   # Let the clock estimates settle
+        nodes = len(master.live_nodes())
+        if nodes < args.nodes:
+            print(f"ERROR: only {nodes} of {args.nodes} nodes registered")
+            return 1
+
+        seqs = []
+        for i in range(args.commands):
+            seqs.append(master.send('volume', {'value': i % 100})[0])
+            time.sleep(0.05)
+        time.sleep(master.lead + 0.5)
+
+        spreads = []
+        for seq in seqs:
+            acks, spread = master.spread(seq)
+            if len(acks) == nodes:
+                spreads.append(spread * 1000.0)
+        if not spreads:
+            print("ERROR: no command was acknowledged by every node")
+            return 1
+        spreads.sort()
+        p95 = spreads[min(len(spreads) - 1, int(0.95 * len(spreads)))]
+        print(f"{nodes} nodes, {len(spreads)}/{len(seqs)} commands acknowledged by all; "
+              f"skew median {spreads[len(spreads) // 2]:.3f} ms, p95 {p95:.3f} ms, max {spreads[-1]:.3f} ms")
+        return 0 if p95 <= args.max_skew_ms else 1
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=5)
+        master.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MaestroBOT synchronized playback')
+    sub = parser.add_subparsers(dest='command', required=True)
+    node = sub.add_parser('node', help='run a player node that follows a controller')
+    node.add_argument('--master', required=True, help='controller address, host[:port]')
+    node.add_argument('--music-dir', default=os.getcwd(), help='folder with the same audio files as the controller')
+    node.add_argument('--name', help='node name shown in acknowledgements')
+    node.add_argument('--log', action='store_true', help='only log commands instead of playing audio')
+    test = sub.add_parser('selftest', help='measure command skew across local nodes')
+    test.add_argument('--nodes', type=int, default=3)
+    test.add_argument('--commands', type=int, default=40)
+    test.add_argument('--lead-ms', type=float, default=DEFAULT_LEAD * 1000)
+    test.add_argument('--max-skew-ms', type=float, default=5.0)
+    args = parser.parse_args()
+    if args.command == 'node':
+        run_node(args)
+        return 0
+    return run_selftest(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from dynamic_gestures import DynamicGestureRecognizer, _build_templates, dtw_distances, normalize, resample
+
+
+NAMES, TEMPLATES = _build_templates()
+
+
+def ranked(points):
+    distances = dtw_distances(normalize(resample(np.asarray(points, dtype=np.float64))), TEMPLATES)
+    return [NAMES[i] for i in np.argsort(distances)], distances
+
+
+@pytest.mark.parametrize('points, name', [
+    ([(x, 200 + 5 * np.sin(x / 20)) for x in np.linspace(100, 400, 40)], 'Swipe Right'),
+    ([(x, 200) for x in np.linspace(400, 100, 25)], 'Swipe Left'),
+    ([(300 + 100 * np.cos(a), 200 + 100 * np.sin(a)) for a in np.linspace(0, 2 * np.pi, 40)], 'Circle'),
+    ([(300, 100 + 150 * (1 - abs(2 * s - 1))) for s in np.linspace(0, 1, 30)], 'Beat'),
+])
+def test_template_distance_ordering(points, name):
+    order, distances = ranked(points)
+    assert order[0] == name
+    assert distances.min() < 0.02
+
+
+def test_speed_does_not_change_the_distance():
+    slow = [(x, 200) for x in np.linspace(100, 400, 60)]
+    fast = [(x, 200) for x in np.linspace(100, 400, 8)]
+    np.testing.assert_allclose(ranked(slow)[1], ranked(fast)[1], atol=1e-9)
+
+
+def test_abandons_when_no_template_can_match():
+    rng = np.random.default_rng(0)
+    query = normalize(resample(rng.uniform(0, 500, size=(40, 2))))
+    assert dtw_distances(query, TEMPLATES, abandon_above=1e-4) is None
+
+
+def test_recognizer_fires_once_per_swipe():
+    recognizer = DynamicGestureRecognizer()
+    fired = [recognizer.update('R', x, 240, now=100 + i / 30)
+             for i, x in enumerate(np.linspace(100, 450, 18))]
+    assert [f for f in fired if f] == ['Swipe Right']
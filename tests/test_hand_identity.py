@@ -0,0 +1,38 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from hand_identity import linear_assignment
+
+
+def brute_force(cost):
+    """Cheapest total over every way of matching the shorter side to the longer one."""
+    n, m = cost.shape
+    if n <= m:
+        return min(sum(cost[i, j] for i, j in enumerate(cols)) for cols in itertools.permutations(range(m), n))
+    return min(sum(cost[i, j] for j, i in enumerate(rows)) for rows in itertools.permutations(range(n), m))
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (3, 3), (5, 5), (2, 6), (6, 2), (4, 7), (7, 4)])
+def test_assignment_is_optimal(shape):
+    rng = np.random.default_rng(sum(shape))
+    for _ in range(20):
+        cost = rng.uniform(0, 100, size=shape).round(1)
+        pairs = linear_assignment(cost)
+
+        rows, cols = zip(*pairs)
+        assert len(pairs) == min(shape)
+        assert len(set(rows)) == len(rows) and len(set(cols)) == len(cols)
+        assert sum(cost[i, j] for i, j in pairs) == pytest.approx(brute_force(cost))
+
+
+def test_assignment_prefers_global_optimum_over_greedy():
+    # Greedy would take the 1 and be left with 100
+    cost = np.array([[1.0, 2.0],
+                     [3.0, 100.0]])
+    assert sorted(linear_assignment(cost)) == [(0, 1), (1, 0)]
+
+
+def test_empty_matrix():
+    assert linear_assignment(np.zeros((0, 3))) == []
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from seek_index import BITRATES, SeekIndex, build_index
+
+
+def mp3_frame(bitrate_index, padding=0, xing=False):
+    """One MPEG-1 Layer III frame at 44.1 kHz (joint stereo) with a silent body."""
+    header = bytes([0xFF, 0xFB, (bitrate_index << 4) | (padding << 1), 0x44])
+    length = 144 * BITRATES[(1, 3)][bitrate_index] * 1000 // 44100 + padding
+    body = bytearray(length - 4)
+    if xing:
+        body[32:36] = b'Xing'     # After the 32 bytes of stereo side info
+    return header + bytes(body)
+
+
+def id3_tag(payload):
+    size = len(payload)
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b'ID3\x03\x00\x00' + syncsafe + payload
+
+
+@pytest.fixture
+def write(tmp_path):
+    def write(data):
+        path = tmp_path / 'track.mp3'
+        path.write_bytes(data)
+        return str(path)
+    return write
+
+
+def frames(data, count, rng, expected):
+    for _ in range(count):
+        expected.append(len(data))
+        data += mp3_frame(rng.randint(1, 14), rng.randint(0, 1))
+    return data
+
+
+def test_skips_id3_tag_and_xing_frame(write):
+    rng = random.Random(1)
+    # Sync bytes inside the tag must not be taken for audio
+    tag = id3_tag(b'\xff\xfb\x90\x44' * 64)
+    expected = []
+    data = frames(bytearray(tag) + mp3_frame(9, xing=True), 200, rng, expected)
+    data += b'TAG' + bytes(125)      # ID3v1 trailer
+
+    index = build_index(write(bytes(data)), chunk_size=997)
+
+    assert index['audio_start'] == len(tag)
+    assert index['offsets'].tolist() == expected
+    assert index['duration'] == pytest.approx(200 * 1152 / 44100)
+
+
+def test_resynchronizes_after_damaged_data(write):
+    rng = random.Random(2)
+    expected = []
+    data = frames(bytearray(), 50, rng, expected)
+    # A stray header whose "next frame" is not a header is skipped with the junk
+    data += bytes(50) + b'\xff\xfb\x90\x44' + bytes(50)
+    data = frames(data, 50, rng, expected)
+
+    index = build_index(write(bytes(data)), chunk_size=1000)
+
+    assert index['offsets'].tolist() == expected
+    assert index['times'][50] == pytest.approx(50 * 1152 / 44100)
+
+
+def test_positions_map_back_to_frame_times(write):
+    rng = random.Random(3)
+    data = frames(bytearray(id3_tag(bytes(100))), 300, rng, [])
+    index = SeekIndex(build_index(write(bytes(data))))
+
+    for ms in (0, 1000, 2500, 7000):
+        offset, start_ms = index.frame_at(ms)
+        assert start_ms <= ms < start_ms + 27
+        assert index.time_at(index.position_for(ms)) == start_ms
@@ -0,0 +1,371 @@
+import os
+import sys
+import json
+import time
+import wave
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from event_log import get_log
+
+
+ANALYSIS_VERSION = 3
+DECODABLE_EXTENSIONS = ('.wav', '.mp3')   # WAV is read directly, the rest through VLC
+VLC_DECODE_TIMEOUT = 300.0  # Seconds allowed for VLC to transcode one file
+
+# Onset envelope / tempo defaults
+TARGET_RATE = 22050      # Audio is decimated to roughly this rate before analysis
+N_FFT = 1024
+HOP = 512
+BLOCK_FRAMES = 1024      # STFT frames processed per vectorized block (bounds memory)
+MIN_BPM = 60.0
+MAX_BPM = 180.0
+PRIOR_BPM = 120.0        # Centre of the log-normal tempo prior (reduces octave errors)
+PRIOR_WIDTH = 1.0        # Octaves
+WAVEFORM_COLUMNS = 1024  # Min/max pairs kept for the waveform overview
+
+log = get_log('controller')
+
+
+def default_cache_dir():
+    """Cache directory from $MAESTRO_CACHE_DIR, else ~/.cache/maestrobot."""
+    return os.environ.get('MAESTRO_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'maestrobot')
+
+
+def cache_key(path, st=None):
+    """Identifies a file version by real path, mtime and size."""
+    st = st or os.stat(path)
+    ident = f"{os.path.realpath(path)}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+
+def decode_wav(path, mono=True):
+    """Decodes a PCM WAV file to float32 in [-1, 1]. Returns (samples, rate).
+
+    Samples are mono, or shaped (frames, channels) when ``mono`` is False.
+    """
+    with wave.open(str(path), 'rb') as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        data = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"unsupported sample width {width} in {path}")
+
+    data = data[:len(data) - len(data) % channels].reshape(-1, channels)
+    return (data.mean(axis=1) if mono else data), rate
+
+
+def decode_with_vlc(path, rate=TARGET_RATE):
+    """Decodes any file VLC can play to mono float32 at ``rate``. Returns (samples, rate).
+
+    VLC transcodes the file to a temporary WAV through its stream output,
+    which runs as fast as it can decode rather than in real time.
+    """
+    import vlc
+    fd, tmp = tempfile.mkstemp(suffix='.wav')
+    os.close(fd)
+    try:
+        try:
+            instance = vlc.Instance('--quiet', '--no-video')
+        except Exception as e:
+            raise RuntimeError(f"libvlc is not available ({e})") from None
+        if instance is None:
+            raise RuntimeError("libvlc is not available")
+        try:
+            media = instance.media_new(str(path))
+            dst = tmp.replace('\\', '/')
+            media.add_option(f":sout=#transcode{{acodec=s16l,channels=1,samplerate={int(rate)}}}"
+                             f":std{{access=file,mux=wav,dst='{dst}'}}")
+            player = instance.media_player_new()
+            player.set_media(media)
+            player.play()
+            deadline = time.monotonic() + VLC_DECODE_TIMEOUT
+            while player.get_state() not in (vlc.State.Ended, vlc.State.Error):
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"VLC took more than {VLC_DECODE_TIMEOUT:.0f}s to decode {path}")
+                time.sleep(0.05)
+            failed = player.get_state() == vlc.State.Error
+            player.stop()
+            player.release()
+        finally:
+            instance.release()
+        if failed:
+            raise RuntimeError(f"VLC could not decode {path}")
+        return decode_wav(tmp)
+    finally:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def decimate(samples, rate, target=TARGET_RATE):
+    """Cheap integer-factor downsampling by block averaging."""
+    factor = max(1, int(rate // target))
+    if factor == 1:
+        return samples, rate
+    usable = len(samples) - len(samples) % factor
+    return samples[:usable].reshape(-1, factor).mean(axis=1), rate / factor
+
+
+def onset_envelope(samples, rate, n_fft=N_FFT, hop=HOP):
+    """Spectral flux of the log-magnitude STFT. Returns (envelope, frames_per_second)."""
+    if len(samples) < n_fft:
+        return np.zeros(0, dtype=np.float32), rate / hop
+    frames = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop]
+    window = np.hanning(n_fft).astype(np.float32)
+
+    env = np.empty(len(frames), dtype=np.float32)
+    prev = None
+    for start in range(0, len(frames), BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES] * window
+        mag = np.log1p(100.0 * np.abs(np.fft.rfft(block, axis=1)))
+        if prev is None:
+            prev = mag[:1]
+        diff = np.diff(np.concatenate([prev, mag]), axis=0)
+        env[start:start + len(block)] = np.maximum(diff, 0.0).sum(axis=1)
+        prev = mag[-1:]
+
+    env -= env.mean()
+    np.maximum(env, 0.0, out=env)
+    return env, rate / hop
+
+
+def estimate_tempo(env, fps, min_bpm=MIN_BPM, max_bpm=MAX_BPM):
+    """Tempo from the FFT autocorrelation of the onset envelope, weighted by a prior."""
+    if len(env) < 4 or not env.any():
+        return None
+    n = 1 << int(np.ceil(np.log2(2 * len(env))))
+    spec = np.fft.rfft(env, n)
+    acf = np.fft.irfft(spec * np.conj(spec), n)[:len(env)]
+
+    min_lag = max(1, int(np.floor(60.0 * fps / max_bpm)))
+    max_lag = min(len(acf) - 2, int(np.ceil(60.0 * fps / min_bpm)))
+    if max_lag <= min_lag:
+        return None
+    lags = np.arange(min_lag, max_lag + 1)
+    bpms = 60.0 * fps / lags
+    prior = np.exp(-0.5 * (np.log2(bpms / PRIOR_BPM) / PRIOR_WIDTH) ** 2)
+    scores = acf[lags] * prior
+    k = int(np.argmax(scores))
+
+    lag = float(lags[k])
+    if 0 < k < len(scores) - 1:
+        left, mid, right = scores[k - 1], scores[k], scores[k + 1]
+        denom = left - 2 * mid + right
+        if denom < 0:
+            lag += 0.5 * (left - right) / denom
+    return float(60.0 * fps / lag)
+
+
+def beat_grid(env, fps, bpm, search=0.03, steps=61, offset=0.0):
+    """Refines the tempo and places a constant-tempo beat grid on the onsets.
+
+    Every candidate period within +-``search`` of ``bpm`` is scored over all
+    phases at once; the (period, phase) whose comb hits the most onset energy
+    wins. ``offset`` (seconds) is added to every beat: envelope frame k
+    starts at ``k / fps`` but is centred half an FFT window later. Returns
+    (refined_bpm, beat_times_in_seconds).
+    """
+    best_score, best_period, best_positions = -1.0, None, None
+    for period in 60.0 * fps / (bpm * np.linspace(1.0 - search, 1.0 + search, steps)):
+        n_beats = int((len(env) - 1) // period)
+        if n_beats < 1:
+            continue
+        phases = np.arange(int(np.ceil(period)))
+        positions = phases[:, None] + np.arange(n_beats)[None, :] * period
+        idx = np.clip(np.rint(positions).astype(np.int64), 0, len(env) - 1)
+        scores = env[idx].sum(axis=1) / n_beats
+        k = int(np.argmax(scores))
+        if scores[k] > best_score:
+            best_score, best_period, best_positions = scores[k], period, positions[k]
+    if best_period is None:
+        return bpm, []
+    return float(60.0 * fps / best_period), (best_positions / fps + offset).round(3).tolist()
+
+
+def waveform_peaks(samples, columns=WAVEFORM_COLUMNS):
+    """Min and max of ``samples`` over ``columns`` equal slices. Returns (mins, maxs)."""
+    columns = min(columns, len(samples))
+    if columns == 0:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    starts = (np.arange(columns) * len(samples)) // columns
+    return np.minimum.reduceat(samples, starts), np.maximum.reduceat(samples, starts)
+
+
+def resample_peaks(mins, maxs, width):
+    """Fits stored peaks to ``width`` pixel columns, keeping the extremes when shrinking."""
+    mins, maxs = np.asarray(mins, dtype=np.float32), np.asarray(maxs, dtype=np.float32)
+    if width <= 0 or len(mins) == 0:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    if width >= len(mins):
+        index = (np.arange(width) * len(mins)) // width
+        return mins[index], maxs[index]
+    starts = (np.arange(width) * len(mins)) // width
+    return np.minimum.reduceat(mins, starts), np.maximum.reduceat(maxs, starts)
+
+
+def analyze(path):
+    """Full analysis of one file. Runs in a worker process."""
+    st = os.stat(path)
+    if str(path).lower().endswith('.wav'):
+        samples, rate = decode_wav(path)
+    else:
+        samples, rate = decode_with_vlc(path)
+    duration = len(samples) / rate if rate else 0.0
+    mins, maxs = waveform_peaks(samples)
+    samples, rate = decimate(samples, rate)
+    env, fps = onset_envelope(samples, rate)
+    bpm = estimate_tempo(env, fps)
+    beats = []
+    if bpm:
+        bpm, beats = beat_grid(env, fps, bpm, offset=N_FFT / 2 / rate)
+    return {
+        'version': ANALYSIS_VERSION,
+        'path': os.path.realpath(path),
+        'key': cache_key(path, st),
+        'duration': round(duration, 3),
+        'bpm': round(bpm, 2) if bpm else None,
+        'beats': beats,
+        'peaks': [mins.round(3).tolist(), maxs.round(3).tolist()],
+    }
+
+
+class TrackAnalysisCache:
+    """On-disk cache of track analyses, filled by a background process pool.
+
+    ``lookup`` costs one ``stat`` plus a dict lookup (or a single small file
+    read the first time a key is seen; a missing one is remembered until the
+    analysis arrives), so it is safe to call on every UI tick. ``submit``
+    queues files that have no analysis yet.
+    """
+
+    def __init__(self, cache_dir=None, max_workers=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self._results = {}
+        self._pending = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _file_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def unavailable(self, path):
+        """True when ``path`` will get no analysis: it cannot be decoded, or its analysis failed."""
+        if not str(path).lower().endswith(DECODABLE_EXTENSIONS):
+            return True
+        try:
+            key = cache_key(path)
+        except OSError:
+            return True
+        with self._lock:
+            return key in self._failed
+
+    def lookup(self, path):
+        """Returns the cached analysis for the current version of ``path``, or None."""
+        try:
+            key = cache_key(path)
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+        try:
+            with open(self._file_for(key), 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            if result.get('version') != ANALYSIS_VERSION:
+                result = None
+        except (OSError, ValueError):
+            result = None
+        with self._lock:
+            # None marks "not analyzed yet" until store() fills the key in
+            self._results.setdefault(key, result)
+            return self._results[key]
+
+    def submit(self, paths):
+        """Schedules analysis for decodable files that are not cached yet."""
+        for path in paths:
+            if not str(path).lower().endswith(DECODABLE_EXTENSIONS):
+                continue
+            if self.lookup(path) is not None:
+                continue
+            try:
+                key = cache_key(path)
+            except OSError:
+                continue
+            with self._lock:
+                if key in self._pending:
+                    continue
+                self._pending.add(key)
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                future = self._executor.submit(analyze, str(path))
+            future.add_done_callback(lambda f, key=key, path=path: self._on_done(key, path, f))
+
+    def _on_done(self, key, path, future):
+        with self._lock:
+            self._pending.discard(key)
+        try:
+            result = future.result()
+        except Exception as e:
+            log.error(f"Track analysis failed for {path}: {e}")
+            with self._lock:
+                self._failed.add(key)
+            return
+        self.store(result)
+
+    def store(self, result):
+        """Writes an ``analyze`` result to the cache under its key."""
+        key = result['key']
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._file_for(key) + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp, self._file_for(key))
+        except OSError as e:
+            log.error(f"Could not write analysis cache for {result['path']}: {e}")
+        with self._lock:
+            self._results[key] = result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    """Analyzes the given files (filling the cache) and prints tempo and beat count."""
+    cache = TrackAnalysisCache()
+    for path in sys.argv[1:]:
+        result = cache.lookup(path)
+        if result is None:
+            result = analyze(path)
+            cache.store(result)
+        print(f"{os.path.basename(path)}: {result['bpm']} BPM, {len(result['beats'])} beats, "
+              f"{result['duration']:.1f}s")
+
+
+if __name__ == '__main__':
+    main()